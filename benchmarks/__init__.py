@@ -0,0 +1 @@
+# 离线性能基准：本地 FDA MCP 替身服务器和测量工具
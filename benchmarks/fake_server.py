@@ -0,0 +1,148 @@
+"""
+本地 FDA MCP 替身服务器
+
+同时提供 SSE（/sse）和 StreamableHTTP（/mcp）两种传输，模拟
+search_drug_labels、get_drug_*、ae_pipeline_rag 等工具，返回结构与
+OpenFDA 相同的合成数据。延迟和返回数据大小可配置，基准测试不需要
+访问真实的 kaleido.guru 服务器。
+
+运行:
+    python -m benchmarks.fake_server --sse-port 8765 --http-port 8766 --latency 0.05
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import random
+from typing import Any, Dict, List
+
+import uvicorn
+from mcp.server.fastmcp import FastMCP
+
+_BRANDS = ["Bayer", "Advil", "Motrin", "Aleve", "Tylenol", "Excedrin", "Ecotrin", "Midol"]
+_MANUFACTURERS = ["Bayer HealthCare", "Pfizer", "Johnson & Johnson", "Haleon", "Perrigo"]
+_WORDS = (
+    "take with food do not exceed the recommended dose stomach bleeding warning "
+    "allergy alert heart attack and stroke risk ask a doctor before use if you have "
+    "high blood pressure kidney disease liver disease or asthma"
+).split()
+
+
+class FakeFDA:
+    """合成 OpenFDA 数据和工具实现"""
+
+    def __init__(self, latency: float = 0.05, jitter: float = 0.0, payload_bytes: int = 4096,
+                 total: int = 1000, seed: int = 0):
+        self.latency = latency
+        self.jitter = jitter
+        self.payload_bytes = payload_bytes
+        self.total = total
+        self._random = random.Random(seed)
+
+    async def delay(self) -> None:
+        extra = self._random.uniform(0, self.jitter) if self.jitter else 0.0
+        await asyncio.sleep(self.latency + extra)
+
+    @staticmethod
+    def _text(length: int, offset: int) -> str:
+        words = itertools.islice(itertools.cycle(_WORDS), offset % len(_WORDS), None)
+        parts: List[str] = []
+        size = 0
+        for word in words:
+            if size >= length:
+                break
+            parts.append(word)
+            size += len(word) + 1
+        return " ".join(parts)[:length]
+
+    def label(self, drug: str, index: int, field_size: int) -> Dict[str, Any]:
+        return {
+            "id": f"{drug}-{index:06d}",
+            "openfda": {
+                "brand_name": [_BRANDS[(index + i) % len(_BRANDS)] for i in range(3)],
+                "generic_name": [drug.upper()],
+                "manufacturer_name": [_MANUFACTURERS[index % len(_MANUFACTURERS)]],
+            },
+            "indications_and_usage": [self._text(field_size, index)],
+            "warnings": [self._text(field_size, index + 1)],
+            "adverse_reactions": [self._text(field_size, index + 2)],
+        }
+
+    def page(self, drug: str, limit: int, skip: int) -> str:
+        count = max(0, min(limit, self.total - skip))
+        field_size = max(16, self.payload_bytes // max(1, count) // 3)
+        return json.dumps({
+            "meta": {"results": {"skip": skip, "limit": limit, "total": self.total}},
+            "results": [self.label(drug, skip + i, field_size) for i in range(count)],
+        })
+
+
+def build_server(fake: FakeFDA) -> FastMCP:
+    """注册与 FDA 服务器同名的工具"""
+    server = FastMCP("fake-openfda", log_level="WARNING")
+
+    @server.tool()
+    async def search_drug_labels(search: str, limit: int = 10, skip: int = 0) -> str:
+        """搜索 FDA 药品标签信息"""
+        await fake.delay()
+        return fake.page(search, limit, skip)
+
+    @server.tool()
+    async def get_drug_adverse_reactions(drug_name: str, limit: int = 1) -> str:
+        """查询药品不良反应"""
+        await fake.delay()
+        return fake.page(drug_name, limit, 0)
+
+    @server.tool()
+    async def get_drug_warnings(drug_name: str, limit: int = 1) -> str:
+        """获取药品警告信息"""
+        await fake.delay()
+        return fake.page(drug_name, limit, 0)
+
+    @server.tool()
+    async def get_drug_indications(drug_name: str, limit: int = 1) -> str:
+        """获取药品适应症"""
+        await fake.delay()
+        return fake.page(drug_name, limit, 0)
+
+    @server.tool()
+    async def ae_pipeline_rag(drug: str, query: str, top_k: int = 3) -> str:
+        """RAG 药品安全分析"""
+        await fake.delay()
+        return f"[{drug}] {query}\n" + fake._text(fake.payload_bytes, top_k)
+
+    return server
+
+
+async def serve(host: str, sse_port: int, http_port: int, fake: FakeFDA) -> None:
+    """在两个端口上分别提供 SSE 和 StreamableHTTP"""
+    server = build_server(fake)
+    servers = [
+        uvicorn.Server(uvicorn.Config(server.sse_app(), host=host, port=sse_port, log_level="warning")),
+        uvicorn.Server(uvicorn.Config(server.streamable_http_app(), host=host, port=http_port, log_level="warning")),
+    ]
+    await asyncio.gather(*(s.serve() for s in servers))
+
+
+def main():
+    """启动替身服务器"""
+    parser = argparse.ArgumentParser(description="本地 FDA MCP 替身服务器")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--sse-port", type=int, default=8765)
+    parser.add_argument("--http-port", type=int, default=8766)
+    parser.add_argument("--latency", type=float, default=0.05, help="每次工具调用的基础延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="额外随机延迟上限（秒）")
+    parser.add_argument("--payload-bytes", type=int, default=4096, help="每页结果文本的近似字节数")
+    parser.add_argument("--total", type=int, default=1000, help="search_drug_labels 的总记录数")
+    args = parser.parse_args()
+
+    fake = FakeFDA(args.latency, args.jitter, args.payload_bytes, args.total)
+    try:
+        asyncio.run(serve(args.host, args.sse_port, args.http_port, fake))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+"""
+MCP 客户端基准测试
+
+启动本地替身服务器（子进程），按 src/ 中三个示例的调用方式测量：
+    - handshake: 打开传输 + initialize 的耗时
+    - sse_client_example / streamable_http_demo: 目录获取 + 顺序工具调用延迟
+    - openfda_demo: 在一个会话上并发批量调用的吞吐量
+以及客户端进程的 RSS，命令行启动耗时（墙钟时间与 -X importtime
+统计的导入耗时），和结果解析（lazy_json / records 与 json.loads 的耗时和
+峰值内存，离线计算）。结果写成 JSON，可以与之前的结果对比。
+
+运行:
+    python -m benchmarks.harness --output bench.json
+    python -m benchmarks.harness --compare bench.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from importlib import metadata
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from mcp import ClientSession
+
+from benchmarks.fake_server import FakeFDA
+from src.catalog import discover
+from src.http_pool import run_with_http_pool
+from src.lazy_json import extract, first_record
+from src.records import iter_label_records
+from src.tool_batch import call_tools_concurrently
+from src.transports import SSE, STREAMABLE_HTTP, ServerConfig, open_transport
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_port(port: int, timeout: float = 15.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=0.2):
+                return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f"替身服务器端口 {port} 未就绪")
+
+
+@contextmanager
+def fake_server(latency: float, payload_bytes: int, jitter: float = 0.0) -> Iterator[Dict[str, ServerConfig]]:
+    """在子进程中启动替身服务器，返回两种传输的配置"""
+    sse_port, http_port = free_port(), free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "benchmarks.fake_server",
+        "--sse-port", str(sse_port), "--http-port", str(http_port),
+        "--latency", str(latency), "--jitter", str(jitter),
+        "--payload-bytes", str(payload_bytes),
+    ])
+    try:
+        wait_for_port(sse_port)
+        wait_for_port(http_port)
+        yield {
+            SSE: ServerConfig(url=f"http://127.0.0.1:{sse_port}/sse", transport=SSE),
+            STREAMABLE_HTTP: ServerConfig(
+                url=f"http://127.0.0.1:{http_port}/mcp", transport=STREAMABLE_HTTP
+            ),
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """延迟样本的 p50/p95/p99（毫秒）"""
+    if not samples:
+        return {}
+    ordered = sorted(samples)
+
+    def pick(q: float) -> float:
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000
+
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) * 1000,
+        "p50_ms": pick(0.50),
+        "p95_ms": pick(0.95),
+        "p99_ms": pick(0.99),
+    }
+
+
+def rss_mb() -> Optional[float]:
+    """客户端进程的峰值 RSS（MB）"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位是 KB，macOS 是字节
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+async def bench_handshake(config: ServerConfig, repeat: int) -> Dict[str, float]:
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        async with open_transport(config) as (read, write, _):
+            async with ClientSession(read, write) as session:
+                await session.initialize()
+                samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+
+async def bench_sequential(config: ServerConfig, calls: int) -> Dict[str, Any]:
+    """示例脚本的调用方式：一次连接，目录获取后顺序调用工具"""
+    async with open_transport(config) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            init_result = await session.initialize()
+            catalog = await discover(session, init_result.capabilities)
+            samples = []
+            for i in range(calls):
+                start = time.perf_counter()
+                await session.call_tool("search_drug_labels", {"search": f"drug{i % 10}", "limit": 2})
+                samples.append(time.perf_counter() - start)
+    report = summarize(samples)
+    report["discovery_ms"] = {kind: elapsed * 1000 for kind, elapsed in catalog.timings.items()}
+    return report
+
+
+async def bench_batch(config: ServerConfig, calls: int, concurrency: int) -> Dict[str, Any]:
+    """openfda_demo 示例 5 的批量查询方式"""
+    async with open_transport(config) as (read, write, _):
+        async with ClientSession(read, write) as session:
+            await session.initialize()
+            batch = [("get_drug_indications", {"drug_name": f"drug{i}", "limit": 1}) for i in range(calls)]
+            start = time.perf_counter()
+            items = await call_tools_concurrently(session, batch, max_in_flight=concurrency)
+            elapsed = time.perf_counter() - start
+    return {
+        "calls": calls,
+        "concurrency": concurrency,
+        "errors": sum(1 for item in items if not item.ok),
+        "elapsed_s": elapsed,
+        "throughput_per_s": calls / elapsed if elapsed else 0.0,
+    }
+
+
+def bench_parsing(records: int, runs: int) -> Dict[str, Any]:
+    """一页 search_drug_labels 结果（每条记录约 12 KB）的解析耗时和峰值内存"""
+    text = FakeFDA(payload_bytes=records * 12000).page("aspirin", records, 0)
+    cases: Dict[str, Callable[[], Any]] = {
+        "json_loads": lambda: json.loads(text),
+        "extract_brand_names": lambda: extract(text, ["results.*.openfda.brand_name"]),
+        "extract_total": lambda: extract(text, ["meta.results.total"]),
+        "first_record": lambda: first_record(text),
+        "label_records": lambda: list(iter_label_records(text)),
+    }
+    results: Dict[str, Any] = {"bytes": len(text)}
+    for name, func in cases.items():
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - start)
+        tracemalloc.start()
+        try:
+            func()
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        results[name] = {**summarize(samples), "peak_mb": peak / (1024 * 1024)}
+    return results
+
+
+def import_time(command: List[str], env: Dict[str, str]) -> Dict[str, float]:
+    """用 -X importtime 运行一次，返回导入总耗时（毫秒）和导入的模块数"""
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", *command],
+        env=env, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    modules = 0
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules += 1
+        # 只累加顶层导入，嵌套导入已经包含在 cumulative 中
+        if not name.startswith("  "):
+            total_us += int(cumulative)
+    return {"import_ms": total_us / 1000, "modules": modules}
+
+
+def bench_startup(config: ServerConfig, runs: int) -> Dict[str, Any]:
+    """短命令的启动耗时：--help、缓存命中的工具调用、需要连接的工具调用"""
+    call = ["-m", "src.cli", "call", "get_drug_indications", "drug_name=aspirin", "limit=1",
+            "--url", config.url, "--transport", config.transport]
+    commands = {
+        "cli_help": ["-m", "src.cli", "--help"],
+        "cli_call_cached": call,
+        "cli_call_uncached": call + ["--no-cache"],
+        "import_transports": ["-c", "import src.transports"],
+    }
+    results: Dict[str, Any] = {}
+    with tempfile.TemporaryDirectory() as home:
+        # 独立的 HOME，缓存从空开始；先调用一次填充磁盘缓存
+        env = dict(os.environ, HOME=home, USERPROFILE=home)
+        subprocess.run([sys.executable, *call], env=env, capture_output=True, check=True)
+        for name, command in commands.items():
+            samples = []
+            for _ in range(runs):
+                start = time.perf_counter()
+                subprocess.run([sys.executable, *command], env=env, capture_output=True, check=True)
+                samples.append(time.perf_counter() - start)
+            results[name] = {"wall": summarize(samples), **import_time(command, env)}
+    return results
+
+
+async def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    results: Dict[str, Any] = {}
+    with fake_server(args.latency, args.payload_bytes, args.jitter) as configs:
+        for transport, config in configs.items():
+            results[transport] = {
+                "handshake": await bench_handshake(config, args.handshakes),
+                "sequential": await bench_sequential(config, args.calls),
+                "batch": await bench_batch(config, args.calls, args.concurrency),
+            }
+        results["startup"] = bench_startup(configs[STREAMABLE_HTTP], args.startup_runs)
+    results["parsing"] = bench_parsing(args.parse_records, args.parse_runs)
+    results["client_peak_rss_mb"] = rss_mb()
+    return results
+
+
+def package_version(name: str) -> Optional[str]:
+    try:
+        return metadata.version(name)
+    except metadata.PackageNotFoundError:
+        return None
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], prefix: str = "") -> List[str]:
+    """逐项对比数值指标，返回变化描述"""
+    lines = []
+    for key, value in current.items():
+        path = f"{prefix}{key}"
+        base = baseline.get(key) if isinstance(baseline, dict) else None
+        if isinstance(value, dict):
+            lines.extend(compare(value, base or {}, f"{path}."))
+        elif isinstance(value, (int, float)) and isinstance(base, (int, float)) and base:
+            change = (value - base) / base * 100
+            lines.append(f"{path}: {base:.3f} → {value:.3f} ({change:+.1f}%)")
+    return lines
+
+
+def main():
+    """运行基准测试"""
+    parser = argparse.ArgumentParser(description="MCP 客户端离线基准测试")
+    parser.add_argument("--latency", type=float, default=0.02, help="替身服务器延迟（秒）")
+    parser.add_argument("--jitter", type=float, default=0.0, help="替身服务器随机延迟上限（秒）")
+    parser.add_argument("--payload-bytes", type=int, default=4096, help="每次结果的近似字节数")
+    parser.add_argument("--handshakes", type=int, default=5, help="握手测量次数")
+    parser.add_argument("--calls", type=int, default=50, help="每项测量的工具调用次数")
+    parser.add_argument("--concurrency", type=int, default=8, help="批量调用的并发数")
+    parser.add_argument("--startup-runs", type=int, default=5, help="命令行启动耗时的测量次数")
+    parser.add_argument("--parse-records", type=int, default=300, help="解析测量中一页结果的记录数")
+    parser.add_argument("--parse-runs", type=int, default=5, help="解析测量的次数")
+    parser.add_argument("--output", type=Path, help="写入 JSON 结果的路径")
+    parser.add_argument("--compare", type=Path, help="与之前的 JSON 结果对比")
+    args = parser.parse_args()
+
+    report = {
+        "meta": {
+            "timestamp": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "mcp": package_version("mcp"),
+            "config": {
+                "latency": args.latency,
+                "jitter": args.jitter,
+                "payload_bytes": args.payload_bytes,
+                "handshakes": args.handshakes,
+                "calls": args.calls,
+                "concurrency": args.concurrency,
+                "startup_runs": args.startup_runs,
+                "parse_records": args.parse_records,
+            },
+        },
+        "results": run_with_http_pool(run_suite(args)),
+    }
+
+    print(json.dumps(report["results"], ensure_ascii=False, indent=2))
+    if args.output:
+        args.output.write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8")
+        print(f"\n📄 结果已写入 {args.output}")
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding="utf-8"))
+        print(f"\n📊 与 {args.compare} 对比:")
+        for line in compare(report["results"], baseline.get("results", {})):
+            print(f"   {line}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""
+自适应并发限制
+
+根据观测到的服务器延迟动态调整在途请求数，不再需要手工指定并发度：
+    - 延迟保持平稳时逐步提高上限
+    - 延迟上升时按梯度（长期延迟 / 短期延迟）收缩上限
+    - 超时、连接失败或服务器过载时按比例削减（AIMD 的乘性减）；
+      其他异常（参数错误、调用方自己的异常）不影响上限
+每个服务器端点一个限流器，可以通过 stats() 查看当前状态。学到的上限在同一进程
+的多个事件循环（例如先后两次 asyncio.run）之间共享，等待队列属于当前的事件循环。
+"""
+
+import asyncio
+import math
+import time
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+from mcp.shared.exceptions import McpError
+from mcp.types import CallToolResult
+
+from .resilient import is_connection_error
+
+# 服务器过载或网关超时的 HTTP 状态码
+_OVERLOAD_STATUS = frozenset({429, 502, 503, 504})
+
+
+def is_overload_error(error: BaseException) -> bool:
+    """超时、连接失败或服务器过载：说明并发过高，需要削减上限"""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError)):
+        return True
+    if isinstance(error, McpError) and error.error.code == httpx.codes.REQUEST_TIMEOUT:
+        # ClientSession 的 read_timeout_seconds 到期
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code in _OVERLOAD_STATUS
+    return is_connection_error(error)
+
+
+class AdaptiveLimiter:
+    """
+    梯度并发限制器（参考 Netflix concurrency-limits 的 Gradient2）
+
+    short_rtt 跟踪最近的延迟，long_rtt 是缓慢变化的基线。
+    gradient = tolerance * long_rtt / short_rtt，限制在 [0.5, 1]：
+    延迟没有上升时 gradient 为 1，上限按 sqrt(limit) 的排队余量增长；
+    延迟上升时上限按比例下降。
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        tolerance: float = 1.2,
+        smoothing: float = 0.2,
+        backoff_ratio: float = 0.7,
+        long_window: int = 1000,
+    ):
+        if not min_limit <= initial_limit <= max_limit:
+            raise ValueError("需要 min_limit <= initial_limit <= max_limit")
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.smoothing = smoothing
+        self.backoff_ratio = backoff_ratio
+        self.long_window = long_window
+        self._limit = float(initial_limit)
+        self.in_flight = 0
+        self.short_rtt: Optional[float] = None
+        self.long_rtt: Optional[float] = None
+        self.samples = 0
+        self.drops = 0
+        self.max_in_flight = 0
+        self._condition: Optional[asyncio.Condition] = None
+        self._loop: Optional["weakref.ReferenceType[asyncio.AbstractEventLoop]"] = None
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    def _waiters(self) -> asyncio.Condition:
+        """当前事件循环的 Condition（asyncio.Condition 绑定在第一次使用它的事件循环上）"""
+        loop = asyncio.get_running_loop()
+        if self._condition is None or self._loop is None or self._loop() is not loop:
+            self._condition = asyncio.Condition()
+            self._loop = weakref.ref(loop)
+            # 上一个事件循环中没有释放的名额不会再释放
+            self.in_flight = 0
+        return self._condition
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        """占用一个并发名额；块内的超时和过载异常计为一次失败"""
+        condition = self._waiters()
+        async with condition:
+            await condition.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        in_flight = self.in_flight
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            if is_overload_error(e):
+                self.on_drop()
+            raise
+        else:
+            self.on_sample(time.perf_counter() - start, in_flight)
+        finally:
+            async with condition:
+                self.in_flight -= 1
+                condition.notify_all()
+
+    def on_sample(self, rtt: float, in_flight: int) -> None:
+        """记录一次成功调用的延迟并调整上限"""
+        self.samples += 1
+        if self.short_rtt is None:
+            self.short_rtt = self.long_rtt = rtt
+            return
+        self.short_rtt = 0.5 * self.short_rtt + 0.5 * rtt
+        # 基线随延迟下降立即跟上，随延迟上升只缓慢跟上，排队造成的延迟增长不会被基线吸收
+        if self.short_rtt < self.long_rtt:
+            self.long_rtt = self.short_rtt
+        else:
+            self.long_rtt += (rtt - self.long_rtt) / self.long_window
+        # 请求数不足上限的一半时，延迟不能说明上限够不够，不再增长
+        if in_flight < self._limit / 2:
+            return
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / self.short_rtt))
+        target = self._limit * gradient + math.sqrt(self._limit)
+        self._set_limit(self._limit * (1 - self.smoothing) + target * self.smoothing)
+
+    def on_drop(self) -> None:
+        """超时或过载：乘性减小上限"""
+        self.drops += 1
+        self._set_limit(self._limit * self.backoff_ratio)
+
+    def _set_limit(self, value: float) -> None:
+        self._limit = max(float(self.min_limit), min(float(self.max_limit), value))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "short_rtt_ms": self.short_rtt * 1000 if self.short_rtt is not None else None,
+            "long_rtt_ms": self.long_rtt * 1000 if self.long_rtt is not None else None,
+            "samples": self.samples,
+            "drops": self.drops,
+        }
+
+
+_limiters: Dict[str, AdaptiveLimiter] = {}
+
+
+def adaptive_limiter(url: str) -> AdaptiveLimiter:
+    """进程内每个端点共享同一个限流器"""
+    if url not in _limiters:
+        _limiters[url] = AdaptiveLimiter()
+    return _limiters[url]
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    """所有端点限流器的状态"""
+    return {url: limiter.stats() for url, limiter in _limiters.items()}
+
+
+class AdaptiveSession:
+    """
+    自适应限流的会话包装
+
+    用法:
+        session = AdaptiveSession(raw_session, adaptive_limiter(server_url), timeout=30)
+        items = await call_tools_concurrently(session, calls, max_in_flight=64)
+    """
+
+    def __init__(self, session: Any, limiter: Optional[AdaptiveLimiter] = None,
+                 timeout: Optional[float] = None):
+        self.session = session
+        self.limiter = limiter if limiter is not None else AdaptiveLimiter()
+        self.timeout = timeout
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                        **kwargs: Any) -> CallToolResult:
+        async with self.limiter.acquire():
+            return await asyncio.wait_for(
+                self.session.call_tool(name, arguments=arguments, **kwargs), self.timeout
+            )
@@ -0,0 +1,400 @@
+"""
+工具参数的预编译校验和构造
+
+每个工具的 inputSchema 只编译一次，按 (工具名称, schema 哈希) 做 LRU 缓存，
+同一个 schema 对象再次查询时不重新计算哈希：
+    - 校验器是一组闭包，调用时不再遍历 schema，本地几微秒即可拒绝
+      类型错误、缺少必填参数、超出范围等无效调用，不必等服务器返回错误
+    - 参数构造器预先计算好默认值，填入用户没有提供的参数
+    - sample() 为必填参数生成示例值，替代示例程序里按参数名拼接的 if 链
+
+支持的关键字：type、enum、const、required、properties、
+additionalProperties、items（含元组形式）、prefixItems、additionalItems、
+minimum/maximum、exclusiveMinimum/Maximum、
+minLength/maxLength、pattern、minItems/maxItems、anyOf/oneOf/allOf、
+本地 $ref（#/$defs/...、#/definitions/...）。其他关键字忽略。
+
+用法:
+    spec = tool_arguments(tool)
+    arguments = spec.build({"drug_name": "aspirin"})   # 填充默认值并校验
+    session = ValidatingSession(raw_session, catalog.tools)
+"""
+
+import copy
+import hashlib
+import json
+import re
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+# (值, 路径, 错误列表) -> None，错误追加到列表中
+Check = Callable[[Any, str, List[str]], None]
+
+
+class ArgumentError(ValueError):
+    """参数不符合工具的 inputSchema"""
+
+    def __init__(self, tool: str, errors: List[str]):
+        self.tool = tool
+        self.errors = errors
+        super().__init__(f"{tool} 参数无效: " + "; ".join(errors))
+
+
+def _is_integer(value: Any) -> bool:
+    return isinstance(value, int) and not isinstance(value, bool) or (
+        isinstance(value, float) and value.is_integer()
+    )
+
+
+_TYPE_CHECKS: Dict[str, Callable[[Any], bool]] = {
+    "string": lambda v: isinstance(v, str),
+    "integer": _is_integer,
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "array": lambda v: isinstance(v, list),
+    "object": lambda v: isinstance(v, dict),
+    "null": lambda v: v is None,
+}
+
+
+def _json_equal(a: Any, b: Any) -> bool:
+    """JSON 意义上的相等：True 不等于 1，1 等于 1.0"""
+    if isinstance(a, bool) or isinstance(b, bool):
+        return type(a) is type(b) and a == b
+    if isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        return a == b
+    if isinstance(a, list) and isinstance(b, list):
+        return len(a) == len(b) and all(_json_equal(x, y) for x, y in zip(a, b))
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(_json_equal(a[key], b[key]) for key in a)
+    return type(a) is type(b) and a == b
+
+
+def schema_hash(schema: Dict[str, Any]) -> str:
+    canonical = json.dumps(schema, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+class _Compiler:
+    """把 schema 编译成检查函数，$ref 按引用缓存（支持递归引用）"""
+
+    def __init__(self, root: Dict[str, Any]):
+        self.root = root
+        self._refs: Dict[str, Check] = {}
+
+    def resolve(self, ref: str) -> Dict[str, Any]:
+        if not ref.startswith("#/"):
+            raise ValueError(f"不支持的 $ref: {ref}")
+        node: Any = self.root
+        for part in ref[2:].split("/"):
+            node = node[part.replace("~1", "/").replace("~0", "~")]
+        return node
+
+    def compile_ref(self, ref: str) -> Check:
+        if ref not in self._refs:
+            target: List[Check] = []
+            # 先放入转发函数，递归引用时直接使用
+            self._refs[ref] = lambda value, path, errors: target[0](value, path, errors)
+            target.append(self.compile(self.resolve(ref)))
+        return self._refs[ref]
+
+    def compile(self, schema: Any) -> Check:
+        if schema is True or schema == {}:
+            return lambda value, path, errors: None
+        if schema is False:
+            return lambda value, path, errors: errors.append(f"{path}: 不允许出现")
+        checks: List[Check] = []
+        if "$ref" in schema:
+            checks.append(self.compile_ref(schema["$ref"]))
+        if "type" in schema:
+            checks.append(self._type(schema["type"]))
+        if "enum" in schema:
+            checks.append(self._enum(schema["enum"]))
+        if "const" in schema:
+            checks.append(self._enum([schema["const"]]))
+        checks.extend(self._bounds(schema))
+        if "pattern" in schema:
+            checks.append(self._pattern(schema["pattern"]))
+        if any(key in schema for key in ("properties", "required", "additionalProperties")):
+            checks.append(self._object(schema))
+        if "items" in schema or "prefixItems" in schema:
+            checks.append(self._items(schema))
+        for key in ("anyOf", "oneOf"):
+            if key in schema:
+                checks.append(self._any_of([self.compile(s) for s in schema[key]], key == "oneOf"))
+        for sub in schema.get("allOf", ()):
+            checks.append(self.compile(sub))
+        if len(checks) == 1:
+            return checks[0]
+
+        def check_all(value: Any, path: str, errors: List[str]) -> None:
+            for check in checks:
+                check(value, path, errors)
+
+        return check_all
+
+    @staticmethod
+    def _type(expected: Any) -> Check:
+        names = [expected] if isinstance(expected, str) else list(expected)
+        predicates = [_TYPE_CHECKS[name] for name in names if name in _TYPE_CHECKS]
+        label = "/".join(names)
+
+        def check_type(value: Any, path: str, errors: List[str]) -> None:
+            for predicate in predicates:
+                if predicate(value):
+                    return
+            errors.append(f"{path}: 期望 {label}，实际为 {type(value).__name__}")
+
+        return check_type
+
+    @staticmethod
+    def _enum(options: List[Any]) -> Check:
+        def check_enum(value: Any, path: str, errors: List[str]) -> None:
+            if not any(_json_equal(value, option) for option in options):
+                errors.append(f"{path}: 取值必须是 {options} 之一")
+
+        return check_enum
+
+    @staticmethod
+    def _bounds(schema: Dict[str, Any]) -> List[Check]:
+        checks: List[Check] = []
+        numeric = lambda v: isinstance(v, (int, float)) and not isinstance(v, bool)
+        rules = (
+            ("minimum", numeric, lambda v, b: v >= b, "不能小于"),
+            ("maximum", numeric, lambda v, b: v <= b, "不能大于"),
+            ("exclusiveMinimum", numeric, lambda v, b: v > b, "必须大于"),
+            ("exclusiveMaximum", numeric, lambda v, b: v < b, "必须小于"),
+            ("minLength", lambda v: isinstance(v, str), lambda v, b: len(v) >= b, "长度不能小于"),
+            ("maxLength", lambda v: isinstance(v, str), lambda v, b: len(v) <= b, "长度不能大于"),
+            ("minItems", lambda v: isinstance(v, list), lambda v, b: len(v) >= b, "元素数不能小于"),
+            ("maxItems", lambda v: isinstance(v, list), lambda v, b: len(v) <= b, "元素数不能大于"),
+        )
+        for key, applies, ok, message in rules:
+            bound = schema.get(key)
+            # draft-04 中 exclusiveMinimum/Maximum 是布尔值，不处理
+            if bound is None or isinstance(bound, bool):
+                continue
+
+            def check_bound(value: Any, path: str, errors: List[str],
+                            bound=bound, applies=applies, ok=ok, message=message) -> None:
+                if applies(value) and not ok(value, bound):
+                    errors.append(f"{path}: {message} {bound}")
+
+            checks.append(check_bound)
+        return checks
+
+    @staticmethod
+    def _pattern(pattern: str) -> Check:
+        regex = re.compile(pattern)
+
+        def check_pattern(value: Any, path: str, errors: List[str]) -> None:
+            if isinstance(value, str) and regex.search(value) is None:
+                errors.append(f"{path}: 不匹配 {pattern}")
+
+        return check_pattern
+
+    def _object(self, schema: Dict[str, Any]) -> Check:
+        properties = {name: self.compile(sub) for name, sub in schema.get("properties", {}).items()}
+        required = tuple(schema.get("required", ()))
+        additional = schema.get("additionalProperties", True)
+        extra: Optional[Check] = None if additional is True else self.compile(additional)
+
+        def check_object(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, dict):
+                return
+            for name in required:
+                if name not in value:
+                    errors.append(f"{path}.{name}: 缺少必填参数")
+            for name, item in value.items():
+                check = properties.get(name)
+                if check is not None:
+                    check(item, f"{path}.{name}", errors)
+                elif extra is not None:
+                    extra(item, f"{path}.{name}", errors)
+
+        return check_object
+
+    def _items(self, schema: Dict[str, Any]) -> Check:
+        items = schema.get("items", True)
+        if isinstance(items, list):
+            # draft-04 ~ 2019-09 的元组形式：items 按位置校验，additionalItems 校验其余元素
+            prefix, rest = items, schema.get("additionalItems", True)
+        else:
+            prefix, rest = schema.get("prefixItems", ()), items
+        positional = [self.compile(sub) for sub in prefix]
+        check_rest = None if rest is True or rest == {} else self.compile(rest)
+
+        def check_items(value: Any, path: str, errors: List[str]) -> None:
+            if not isinstance(value, list):
+                return
+            for index, item in enumerate(value):
+                if index < len(positional):
+                    positional[index](item, f"{path}[{index}]", errors)
+                elif check_rest is not None:
+                    check_rest(item, f"{path}[{index}]", errors)
+
+        return check_items
+
+    @staticmethod
+    def _any_of(options: List[Check], exactly_one: bool) -> Check:
+        def check_any_of(value: Any, path: str, errors: List[str]) -> None:
+            matched = 0
+            for option in options:
+                option_errors: List[str] = []
+                option(value, path, option_errors)
+                if not option_errors:
+                    matched += 1
+                    if not exactly_one:
+                        return
+            if matched == 0:
+                errors.append(f"{path}: 不符合任何一个候选 schema")
+            elif exactly_one and matched > 1:
+                errors.append(f"{path}: 同时符合多个 oneOf 候选 schema")
+
+        return check_any_of
+
+
+def _sample_value(name: str, schema: Dict[str, Any], root: Dict[str, Any]) -> Any:
+    """为必填参数挑一个示例值"""
+    while "$ref" in schema:
+        schema = _Compiler(root).resolve(schema["$ref"])
+    if "default" in schema:
+        return schema["default"]
+    if schema.get("enum"):
+        return schema["enum"][0]
+    if "const" in schema:
+        return schema["const"]
+    kind = schema.get("type", "string")
+    if isinstance(kind, list):
+        kind = next((k for k in kind if k != "null"), "string")
+    lowered = name.lower()
+    if kind == "string":
+        if any(word in lowered for word in ("search", "query", "drug", "name")):
+            return "aspirin"
+        return "示例文本"
+    if kind in ("integer", "number"):
+        if "limit" in lowered:
+            return 3
+        return schema.get("minimum", 1)
+    if kind == "boolean":
+        return True
+    if kind == "array":
+        return []
+    if kind == "object":
+        return {}
+    return None
+
+
+class ToolArguments:
+    """一个工具的编译结果：校验器、默认值和示例参数"""
+
+    def __init__(self, name: str, schema: Optional[Dict[str, Any]], digest: Optional[str] = None):
+        self.name = name
+        self.schema = schema or {"type": "object"}
+        self.hash = digest if digest is not None else schema_hash(self.schema)
+        self._check = _Compiler(self.schema).compile(self.schema)
+        properties = self.schema.get("properties", {})
+        self.required: Tuple[str, ...] = tuple(self.schema.get("required", ()))
+        # default 为 None 的参数（Optional）交给服务器处理，不填入
+        self.defaults: Dict[str, Any] = {
+            name: sub["default"] for name, sub in properties.items()
+            if isinstance(sub, dict) and sub.get("default") is not None
+        }
+        self._mutable_defaults = any(isinstance(v, (dict, list)) for v in self.defaults.values())
+        self._sample = {
+            name: _sample_value(name, properties.get(name, {}), self.schema) for name in self.required
+        }
+
+    def errors(self, arguments: Any) -> List[str]:
+        errors: List[str] = []
+        self._check(arguments, "arguments", errors)
+        return errors
+
+    def validate(self, arguments: Any) -> None:
+        """参数无效时抛出 ArgumentError"""
+        errors: List[str] = []
+        self._check(arguments, "arguments", errors)
+        if errors:
+            raise ArgumentError(self.name, errors)
+
+    def build(self, values: Optional[Dict[str, Any]] = None, fill_defaults: bool = True) -> Dict[str, Any]:
+        """默认值 + values，校验后返回"""
+        if fill_defaults:
+            arguments = copy.deepcopy(self.defaults) if self._mutable_defaults else dict(self.defaults)
+            if values:
+                arguments.update(values)
+        else:
+            arguments = dict(values or {})
+        self.validate(arguments)
+        return arguments
+
+    def sample(self, values: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """只包含必填参数的示例调用参数"""
+        arguments = copy.deepcopy(self._sample)
+        if values:
+            arguments.update(values)
+        return arguments
+
+
+# 编译结果的 LRU 缓存：按 (工具名称, schema 哈希)，以及按 schema 对象本身
+# （保存对象引用，id 不会被复用）
+MAX_COMPILED = 256
+_compiled: "OrderedDict[Tuple[str, str], ToolArguments]" = OrderedDict()
+_by_identity: "OrderedDict[Tuple[str, int], Tuple[Any, ToolArguments]]" = OrderedDict()
+
+
+def _remember(cache: "OrderedDict[Any, Any]", key: Any, value: Any) -> None:
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > MAX_COMPILED:
+        cache.popitem(last=False)
+
+
+def tool_arguments(tool: Any, schema: Optional[Dict[str, Any]] = None) -> ToolArguments:
+    """
+    返回工具的编译结果（按工具名称和 schema 缓存）
+
+    tool 可以是 mcp Tool 对象，也可以是工具名称（此时需要提供 schema）。
+    同一个 schema 对象只在第一次查询时计算哈希；内容相同的新对象
+    （例如重新获取的工具列表）按哈希复用编译结果。
+    """
+    if isinstance(tool, str):
+        name = tool
+    else:
+        name, schema = tool.name, tool.inputSchema
+    identity = (name, id(schema))
+    entry = _by_identity.get(identity)
+    if entry is not None and entry[0] is schema:
+        _by_identity.move_to_end(identity)
+        return entry[1]
+    key = (name, schema_hash(schema or {"type": "object"}))
+    compiled = _compiled.get(key)
+    if compiled is None:
+        compiled = ToolArguments(name, schema, key[1])
+    _remember(_compiled, key, compiled)
+    _remember(_by_identity, identity, (schema, compiled))
+    return compiled
+
+
+class ValidatingSession:
+    """
+    调用前在本地校验参数的会话包装
+
+    用法:
+        session = ValidatingSession(raw_session, catalog.tools)
+        await session.call_tool("get_drug_warnings", {"drug_name": "aspirin"})
+    """
+
+    def __init__(self, session: Any, tools: Iterable[Any], fill_defaults: bool = False):
+        self.session = session
+        self.fill_defaults = fill_defaults
+        self.specs: Dict[str, ToolArguments] = {tool.name: tool_arguments(tool) for tool in tools}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None, **kwargs: Any) -> Any:
+        spec = self.specs.get(name)
+        if spec is not None:
+            arguments = spec.build(arguments, fill_defaults=self.fill_defaults)
+        return await self.session.call_tool(name, arguments=arguments, **kwargs)
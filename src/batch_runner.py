@@ -0,0 +1,476 @@
+"""
+批量工具调用命令行
+
+从 CSV 或 JSONL 文件读取 (工具, 参数) 行，通过会话池上的固定数量
+worker 并发调用，结果按完成顺序逐行写入 JSONL。
+
+输入格式：
+    JSONL: {"tool": "get_drug_warnings", "arguments": {"drug_name": "aspirin"}, "id": "可选"}
+    CSV:   必须有 tool 列；有 arguments 列时按 JSON 解析，否则其余非空列
+           作为参数（能按 JSON 解析的值按 JSON 解析，例如数字）
+
+断点续传：
+    检查点文件（默认为 输出文件.ckpt）定期记录已完成的行号和输出文件的
+    偏移量。中断后用相同的命令重新运行，会把输出文件截断到检查点位置，
+    并跳过已完成的行，输出中不会出现重复结果。
+
+列式导出：
+    --columnar labels.parquet 把成功结果中的标签记录同时写入 Parquet，
+    见 src/columnar.py。
+
+运行:
+    mcp-fda-batch drugs.csv -o results.jsonl --concurrency 16
+    python -m src.batch_runner drugs.jsonl -o results.jsonl --url http://127.0.0.1:8766/mcp --transport streamableHttp
+"""
+
+import argparse
+import asyncio
+import csv
+import json
+import os
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from .adaptive_limit import adaptive_limiter
+from .cli import add_server_arguments, server_config
+from .deadline import DeadlineExceeded, DeadlineSession, deadline
+from .http_pool import run_with_http_pool
+from .resilient import is_connection_error
+from .session_pool import SessionPool
+from .transports import ServerConfig
+
+CHECKPOINT_VERSION = 1
+
+
+@dataclass
+class Job:
+    """输入文件中的一行"""
+
+    index: int
+    id: Any
+    tool: str
+    arguments: Dict[str, Any]
+
+
+def detect_format(path: Path) -> str:
+    return "csv" if path.suffix.lower() in (".csv", ".tsv") else "jsonl"
+
+
+def _csv_value(value: str) -> Any:
+    try:
+        return json.loads(value)
+    except ValueError:
+        return value
+
+
+def read_jobs(path: Path, fmt: str) -> Iterator[Job]:
+    """逐行读取任务，不把整个文件读入内存"""
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if fmt == "csv":
+            delimiter = "\t" if path.suffix.lower() == ".tsv" else ","
+            for index, row in enumerate(csv.DictReader(f, delimiter=delimiter)):
+                tool = row.pop("tool", None)
+                if not tool:
+                    raise ValueError(f"第 {index + 1} 行缺少 tool 列")
+                row_id = row.pop("id", None) or index
+                if "arguments" in row:
+                    arguments = json.loads(row["arguments"] or "{}")
+                else:
+                    arguments = {key: _csv_value(value) for key, value in row.items() if value}
+                yield Job(index, row_id, tool, arguments)
+        else:
+            index = 0
+            for line in f:
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                tool = row.get("tool") or row.get("name")
+                if not tool:
+                    raise ValueError(f"第 {index + 1} 行缺少 tool 字段")
+                yield Job(index, row.get("id", index), tool, row.get("arguments") or {})
+                index += 1
+
+
+def count_jobs(path: Path, fmt: str) -> int:
+    """统计行数，用于计算进度和剩余时间（CSV 中带换行的字段会让结果偏大）"""
+    count = 0
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                count += 1
+    return count - 1 if fmt == "csv" and count else count
+
+
+class Checkpoint:
+    """
+    已完成行的记录
+
+    watermark 之前的行全部完成，done 保存 watermark 之后零散完成的行号，
+    百万行的任务也只需要保存很小的检查点。
+    """
+
+    def __init__(self, path: Path, input_path: Path):
+        self.path = path
+        self.input_path = str(input_path)
+        self.watermark = 0
+        self.done: Set[int] = set()
+        self.completed = 0
+        self.errors = 0
+        self.output_offset = 0
+        # 列式导出：已正常关闭的文件、它们覆盖到的输出偏移量、当前正在写入的文件
+        self.columnar_files: List[str] = []
+        self.columnar_offset = 0
+        self.columnar_open: Optional[str] = None
+
+    def load(self) -> bool:
+        """读取已有检查点；不存在时返回 False"""
+        if not self.path.exists():
+            return False
+        data = json.loads(self.path.read_text(encoding="utf-8"))
+        if data.get("input") != self.input_path:
+            raise ValueError(f"检查点 {self.path} 属于另一个输入文件: {data.get('input')}")
+        self.watermark = data["watermark"]
+        self.done = set(data["done"])
+        self.completed = data["completed"]
+        self.errors = data.get("errors", 0)
+        self.output_offset = data["output_offset"]
+        self.columnar_files = data.get("columnar_files", [])
+        self.columnar_offset = data.get("columnar_offset", 0)
+        self.columnar_open = data.get("columnar_open")
+        return True
+
+    def is_done(self, index: int) -> bool:
+        return index < self.watermark or index in self.done
+
+    def mark(self, index: int, ok: bool) -> None:
+        self.completed += 1
+        if not ok:
+            self.errors += 1
+        self.done.add(index)
+        while self.watermark in self.done:
+            self.done.remove(self.watermark)
+            self.watermark += 1
+
+    def save(self, output_offset: int) -> None:
+        """原子地写入检查点（先写临时文件再替换）"""
+        self.output_offset = output_offset
+        data = {
+            "version": CHECKPOINT_VERSION,
+            "input": self.input_path,
+            "watermark": self.watermark,
+            "done": sorted(self.done),
+            "completed": self.completed,
+            "errors": self.errors,
+            "output_offset": output_offset,
+            "columnar_files": self.columnar_files,
+            "columnar_offset": self.columnar_offset,
+            "columnar_open": self.columnar_open,
+        }
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps(data), encoding="utf-8")
+        os.replace(tmp_path, self.path)
+
+
+def unused_path(path: Path) -> Path:
+    """
+    返回不存在的文件路径
+
+    Parquet 文件不能像 JSONL 那样截断后续写，续跑时写入 name-1.parquet 等新文件，
+    下游按数据集（通配符）读取。没有正常关闭的文件在续跑时删除，其中已完成的行
+    从 JSONL 输出重放（见 BatchRunner._open_columnar），各文件之间没有重复的行。
+    """
+    candidate = path
+    number = 0
+    while candidate.exists():
+        number += 1
+        candidate = path.with_name(f"{path.stem}-{number}{path.suffix}")
+    return candidate
+
+
+def format_eta(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+
+class Progress:
+    """在 stderr 上显示吞吐量和剩余时间"""
+
+    def __init__(self, total: Optional[int], already_done: int = 0, already_failed: int = 0,
+                 interval: float = 0.5):
+        self.total = total
+        self.already_done = already_done
+        self.finished = 0
+        self.errors = already_failed
+        self.interval = interval
+        self.start = time.monotonic()
+        self._last_shown = 0.0
+
+    def line(self) -> str:
+        elapsed = max(time.monotonic() - self.start, 1e-9)
+        rate = self.finished / elapsed
+        done = self.already_done + self.finished
+        text = f"⏳ {done}"
+        if self.total:
+            remaining = max(0, self.total - done)
+            eta = format_eta(remaining / rate) if rate else "--:--:--"
+            text += f"/{self.total} ({done / self.total:.1%}) | ETA {eta}"
+        return text + f" | {rate:.1f} 次/秒 | 错误 {self.errors}"
+
+    def maybe_show(self) -> None:
+        if time.monotonic() - self._last_shown >= self.interval:
+            self.show()
+
+    def show(self) -> None:
+        self._last_shown = time.monotonic()
+        sys.stderr.write("\r" + self.line() + "  ")
+        sys.stderr.flush()
+
+
+def result_record(job: Job, result: Any, error: Optional[BaseException], elapsed: float) -> Dict[str, Any]:
+    record: Dict[str, Any] = {
+        "id": job.id,
+        "tool": job.tool,
+        "arguments": job.arguments,
+        "ok": error is None and not result.isError,
+        "elapsed_ms": round(elapsed * 1000, 3),
+    }
+    if result is not None:
+        record["result"] = result.model_dump(mode="json", by_alias=True, exclude_none=True)
+    if error is not None:
+        record["error"] = f"{type(error).__name__}: {error}"
+    return record
+
+
+def export_columnar(sink: Any, result: Any, tool: str, arguments: Dict[str, Any]) -> None:
+    try:
+        sink.add(result, tool=tool, arguments=arguments)
+    except ValueError:
+        # 不是 JSON 的结果（例如 ae_pipeline_rag 的文本）不导出
+        pass
+
+
+class BatchRunner:
+    """按检查点跳过已完成的行，用 concurrency 个 worker 调用工具"""
+
+    def __init__(
+        self,
+        config: ServerConfig,
+        input_path: Path,
+        output_path: Path,
+        checkpoint_path: Optional[Path] = None,
+        fmt: Optional[str] = None,
+        concurrency: int = 8,
+        retries: int = 2,
+        adaptive: bool = False,
+        checkpoint_interval: float = 2.0,
+        show_progress: bool = True,
+        columnar_path: Optional[Path] = None,
+        deadline: Optional[float] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency 必须大于 0")
+        self.config = config
+        self.input_path = input_path
+        self.output_path = output_path
+        self.fmt = fmt or detect_format(input_path)
+        self.checkpoint = Checkpoint(
+            checkpoint_path or output_path.with_name(output_path.name + ".ckpt"), input_path
+        )
+        self.concurrency = concurrency
+        self.retries = retries
+        self.limiter = adaptive_limiter(config.url) if adaptive else None
+        self.checkpoint_interval = checkpoint_interval
+        self.show_progress = show_progress
+        self.columnar_path = columnar_path
+        self.deadline = deadline
+
+    def _open_output(self, resume: bool):
+        if resume and self.checkpoint.load():
+            size = self.output_path.stat().st_size if self.output_path.exists() else 0
+            if size < self.checkpoint.output_offset:
+                # 截断会用 NUL 填充缺少的部分，已完成行的结果也找不回来
+                raise ValueError(
+                    f"输出文件 {self.output_path} 只有 {size} 字节，短于检查点记录的 "
+                    f"{self.checkpoint.output_offset} 字节，无法续传；使用 --restart 从头开始"
+                )
+            # 截掉检查点之后写入的结果，这些行会重新执行
+            output = open(self.output_path, "r+b")
+            output.truncate(self.checkpoint.output_offset)
+            output.seek(self.checkpoint.output_offset)
+            return output
+        return open(self.output_path, "wb")
+
+    def _open_columnar(self) -> Any:
+        """打开本次运行的列式文件，并补上已完成但不在已关闭文件中的行"""
+        # 只在需要时导入，不导出列式文件时不加载 pyarrow
+        from .columnar import open_sink
+        from mcp.types import CallToolResult
+
+        checkpoint = self.checkpoint
+        if checkpoint.columnar_open:
+            # 上次没有正常关闭：Parquet 文件没有 footer，Arrow 流可能包含检查点之后的行
+            Path(checkpoint.columnar_open).unlink(missing_ok=True)
+        path = unused_path(self.columnar_path)
+        sink = open_sink(path)
+        checkpoint.columnar_open = str(path)
+        if checkpoint.output_offset > checkpoint.columnar_offset:
+            with open(self.output_path, "rb") as f:
+                f.seek(checkpoint.columnar_offset)
+                while f.tell() < checkpoint.output_offset:
+                    line = f.readline()
+                    if not line:
+                        break
+                    record = json.loads(line)
+                    if record["ok"]:
+                        export_columnar(sink, CallToolResult.model_validate(record["result"]),
+                                        record["tool"], record["arguments"])
+        return sink
+
+    def _close_columnar(self, sink: Any) -> None:
+        """关闭列式文件，记录它覆盖到的输出偏移量"""
+        sink.close()
+        checkpoint = self.checkpoint
+        checkpoint.columnar_files.append(checkpoint.columnar_open)
+        checkpoint.columnar_open = None
+        checkpoint.columnar_offset = checkpoint.output_offset
+        checkpoint.save(checkpoint.output_offset)
+
+    async def _call(self, session: Any, job: Job) -> Any:
+        if self.deadline is not None:
+            session = DeadlineSession(session)
+        if self.limiter is None:
+            return await session.call_tool(job.tool, arguments=job.arguments)
+        async with self.limiter.acquire():
+            return await session.call_tool(job.tool, arguments=job.arguments)
+
+    async def _run_job(self, pool: SessionPool, job: Job) -> Tuple[Dict[str, Any], Any]:
+        start = time.perf_counter()
+        error: Optional[BaseException] = None
+        result = None
+        # 重试共用同一个截止时间
+        with deadline(self.deadline):
+            for attempt in range(self.retries + 1):
+                try:
+                    async with pool.session(self.config) as session:
+                        result = await self._call(session, job)
+                    error = None
+                    break
+                except Exception as e:
+                    error = e
+                    # 服务器拒绝了请求或超过截止时间，重试没有意义；连接问题由会话池替换损坏的会话后重试
+                    if not is_connection_error(e) or isinstance(e, DeadlineExceeded):
+                        break
+                    if attempt < self.retries:
+                        await asyncio.sleep(min(2.0, 0.2 * 2 ** attempt))
+        return result_record(job, result, error, time.perf_counter() - start), result
+
+    async def run(self, resume: bool = True) -> Checkpoint:
+        output = self._open_output(resume)
+        checkpoint = self.checkpoint
+        sink = self._open_columnar() if self.columnar_path else None
+        total = count_jobs(self.input_path, self.fmt) if self.show_progress else None
+        progress = Progress(total, checkpoint.completed, checkpoint.errors)
+        queue: "asyncio.Queue[Optional[Job]]" = asyncio.Queue(maxsize=self.concurrency * 4)
+        last_save = time.monotonic()
+
+        def save() -> None:
+            output.flush()
+            os.fsync(output.fileno())
+            checkpoint.save(output.tell())
+
+        async def feed() -> None:
+            for job in read_jobs(self.input_path, self.fmt):
+                if not checkpoint.is_done(job.index):
+                    await queue.put(job)
+            for _ in range(self.concurrency):
+                await queue.put(None)
+
+        async def worker(pool: SessionPool) -> None:
+            nonlocal last_save
+            while True:
+                job = await queue.get()
+                if job is None:
+                    return
+                record, result = await self._run_job(pool, job)
+                output.write(json.dumps(record, ensure_ascii=False).encode("utf-8") + b"\n")
+                if sink is not None and record["ok"]:
+                    export_columnar(sink, result, job.tool, job.arguments)
+                checkpoint.mark(job.index, record["ok"])
+                progress.finished += 1
+                if not record["ok"]:
+                    progress.errors += 1
+                if time.monotonic() - last_save >= self.checkpoint_interval:
+                    last_save = time.monotonic()
+                    save()
+                if self.show_progress:
+                    progress.maybe_show()
+
+        try:
+            async with SessionPool(max_size=self.concurrency) as pool:
+                await pool.warm(self.config, min(self.concurrency, 4))
+                tasks = [asyncio.ensure_future(feed())]
+                tasks += [asyncio.ensure_future(worker(pool)) for _ in range(self.concurrency)]
+                try:
+                    await asyncio.gather(*tasks)
+                finally:
+                    # 读取输入或某个 worker 出错时取消其余任务，等它们结束后再关闭会话池
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            # 正常结束、出错或被中断时都保存进度
+            save()
+            if sink is not None:
+                self._close_columnar(sink)
+            output.close()
+            if self.show_progress:
+                progress.show()
+                sys.stderr.write("\n")
+        return checkpoint
+
+
+def main():
+    """批量调用 MCP 工具"""
+    parser = argparse.ArgumentParser(description="从 CSV/JSONL 批量调用 MCP 工具，结果写入 JSONL")
+    parser.add_argument("input", type=Path, help="输入文件（.csv / .tsv / .jsonl）")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="输出 JSONL 文件")
+    parser.add_argument("--format", choices=("csv", "jsonl"), help="输入格式（默认按扩展名判断）")
+    parser.add_argument("--checkpoint", type=Path, help="检查点文件（默认为 输出文件.ckpt）")
+    parser.add_argument("--restart", action="store_true", help="忽略检查点，从头开始")
+    add_server_arguments(parser)
+    parser.add_argument("--concurrency", type=int, default=8, help="worker 数（也是会话池大小）")
+    parser.add_argument("--adaptive", action="store_true", help="按延迟自适应限制在途请求数")
+    parser.add_argument("--columnar", type=Path, metavar="PATH",
+                        help="同时把标签记录导出为 Parquet（.parquet）或 Arrow 流（.arrow），需要 pyarrow")
+    parser.add_argument("--retries", type=int, default=2, help="连接错误的重试次数")
+    parser.add_argument("--deadline", type=float, metavar="SECONDS",
+                        help="每行（包括重试）的截止时间，超时后通知服务器取消请求")
+    parser.add_argument("--quiet", action="store_true", help="不显示进度")
+    args = parser.parse_args()
+
+    runner = BatchRunner(
+        server_config(args),
+        args.input,
+        args.output,
+        checkpoint_path=args.checkpoint,
+        fmt=args.format,
+        concurrency=args.concurrency,
+        retries=args.retries,
+        adaptive=args.adaptive,
+        show_progress=not args.quiet,
+        columnar_path=args.columnar,
+        deadline=args.deadline,
+    )
+    try:
+        checkpoint = run_with_http_pool(runner.run(resume=not args.restart))
+    except KeyboardInterrupt:
+        print(f"\n⏸️  已中断，进度保存在 {runner.checkpoint.path}，重新运行相同命令即可继续")
+        sys.exit(130)
+    print(f"✅ 完成 {checkpoint.completed} 行（错误 {checkpoint.errors}），结果: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
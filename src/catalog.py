@@ -0,0 +1,247 @@
+"""
+工具 / 资源 / 提示词目录
+
+discover() 根据 initialize 返回的服务器能力跳过不支持的列表，
+并发获取其余列表（跟随分页游标），返回带每项耗时的 ServerCatalog。
+
+每次连接都重新列出目录会给启动增加额外往返。CatalogCache 按服务器 URL
+和 serverInfo 版本缓存完整目录，只有在服务器发送 list_changed 通知或
+TTL 过期时才重新获取；可选持久化到磁盘，重启后启动只需要 initialize
+一次往返。
+"""
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from mcp import types
+from mcp.types import InitializeResult, Prompt, Resource, ServerCapabilities, Tool
+
+DEFAULT_CATALOG_PATH = Path.home() / ".cache" / "python-mcp-client" / "catalog.json"
+
+TOOLS = "tools"
+RESOURCES = "resources"
+PROMPTS = "prompts"
+KINDS = (TOOLS, RESOURCES, PROMPTS)
+
+_MODELS = {TOOLS: Tool, RESOURCES: Resource, PROMPTS: Prompt}
+
+_LIST_CHANGED = {
+    types.ToolListChangedNotification: TOOLS,
+    types.ResourceListChangedNotification: RESOURCES,
+    types.PromptListChangedNotification: PROMPTS,
+}
+
+
+@dataclass
+class ServerCatalog:
+    """
+    服务器目录
+
+    某一类列表为 None 表示服务器不支持该功能或获取失败，
+    空列表表示服务器支持但没有条目。timings 记录本次获取每类列表的耗时（秒），
+    从缓存读取的列表没有耗时记录。
+    """
+
+    tools: Optional[List[Tool]] = None
+    resources: Optional[List[Resource]] = None
+    prompts: Optional[List[Prompt]] = None
+    fetched_at: Dict[str, float] = field(default_factory=dict)
+    timings: Dict[str, float] = field(default_factory=dict)
+    errors: Dict[str, BaseException] = field(default_factory=dict)
+
+    def get_tool(self, name: str) -> Optional[Tool]:
+        for tool in self.tools or []:
+            if tool.name == name:
+                return tool
+        return None
+
+
+async def _list_all(fetch: Callable[[Optional[str]], Awaitable[Any]], attr: str) -> List[Any]:
+    """跟随 nextCursor 取回完整列表"""
+    items: List[Any] = []
+    cursor: Optional[str] = None
+    while True:
+        page = await fetch(cursor)
+        items.extend(getattr(page, attr))
+        cursor = page.nextCursor
+        if not cursor:
+            return items
+
+
+async def list_all_tools(session: Any) -> List[Tool]:
+    return await _list_all(session.list_tools, TOOLS)
+
+
+async def list_all_resources(session: Any) -> List[Resource]:
+    return await _list_all(session.list_resources, RESOURCES)
+
+
+async def list_all_prompts(session: Any) -> List[Prompt]:
+    return await _list_all(session.list_prompts, PROMPTS)
+
+
+_LISTERS = {
+    TOOLS: list_all_tools,
+    RESOURCES: list_all_resources,
+    PROMPTS: list_all_prompts,
+}
+
+
+def supported_kinds(capabilities: Optional[ServerCapabilities]) -> Tuple[str, ...]:
+    """服务器声明支持的列表类型；未知能力时假定全部支持"""
+    if capabilities is None:
+        return KINDS
+    return tuple(kind for kind in KINDS if getattr(capabilities, kind, None) is not None)
+
+
+async def discover(
+    session: Any,
+    capabilities: Optional[ServerCapabilities] = None,
+    kinds: Tuple[str, ...] = KINDS,
+) -> ServerCatalog:
+    """
+    并发获取服务器目录
+
+    Args:
+        session: 已初始化的 ClientSession
+        capabilities: initialize 返回的服务器能力；省略时尝试从会话读取
+        kinds: 需要获取的列表类型
+
+    Returns:
+        ServerCatalog，不支持的列表为 None，失败的列表记录在 errors 中
+    """
+    if capabilities is None and hasattr(session, "get_server_capabilities"):
+        capabilities = session.get_server_capabilities()
+    wanted = [kind for kind in kinds if kind in supported_kinds(capabilities)]
+
+    async def timed(kind: str) -> Tuple[str, Any, float]:
+        start = time.perf_counter()
+        try:
+            items: Any = await _LISTERS[kind](session)
+        except Exception as e:
+            items = e
+        return kind, items, time.perf_counter() - start
+
+    catalog = ServerCatalog()
+    for kind, items, elapsed in await asyncio.gather(*(timed(kind) for kind in wanted)):
+        catalog.timings[kind] = elapsed
+        catalog.fetched_at[kind] = time.time()
+        if isinstance(items, Exception):
+            catalog.errors[kind] = items
+        else:
+            setattr(catalog, kind, items)
+    return catalog
+
+
+def catalog_key(url: str, init_result: InitializeResult) -> str:
+    """服务器 URL + serverInfo 名称和版本"""
+    info = init_result.serverInfo
+    return f"{url}|{info.name}|{info.version}"
+
+
+class CatalogCache:
+    """
+    目录缓存
+
+    用法:
+        cache = CatalogCache(path=DEFAULT_CATALOG_PATH)
+        async with ClientSession(read, write,
+                                 message_handler=cache.message_handler(url)) as session:
+            init_result = await session.initialize()
+            catalog = await cache.get(session, url, init_result)
+    """
+
+    def __init__(self, ttl: float = 3600.0, path: Optional[Path] = None):
+        self.ttl = ttl
+        self.path = Path(path) if path is not None else None
+        # key -> kind -> {"fetched_at": 时间戳, "items": JSON 列表或 None}
+        self._entries: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        if self.path is None:
+            return
+        try:
+            self._entries = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            self._entries = {}
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self._entries, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def _is_fresh(self, slot: Optional[Dict[str, Any]]) -> bool:
+        return slot is not None and time.time() - slot["fetched_at"] < self.ttl
+
+    async def get(self, session: Any, url: str, init_result: InitializeResult) -> ServerCatalog:
+        """返回完整目录，只重新获取过期或被通知失效的列表"""
+        key = catalog_key(url, init_result)
+        entry = self._entries.setdefault(key, {})
+        stale = tuple(kind for kind in KINDS if not self._is_fresh(entry.get(kind)))
+        fresh = ServerCatalog()
+        if stale:
+            fresh = await discover(session, init_result.capabilities, stale)
+            for kind in stale:
+                if kind in fresh.errors:
+                    # 获取失败不等于不支持：不写入缓存，下次调用重新获取
+                    entry.pop(kind, None)
+                    continue
+                items = getattr(fresh, kind)
+                dumped = None
+                if items is not None:
+                    dumped = [item.model_dump(mode="json", by_alias=True, exclude_none=True) for item in items]
+                entry[kind] = {"fetched_at": time.time(), "items": dumped}
+            self._save()
+        return self._build(entry, fresh.timings, fresh.errors)
+
+    @staticmethod
+    def _build(
+        entry: Dict[str, Dict[str, Any]],
+        timings: Dict[str, float],
+        errors: Optional[Dict[str, BaseException]] = None,
+    ) -> ServerCatalog:
+        catalog = ServerCatalog(timings=dict(timings), errors=dict(errors or {}))
+        for kind in KINDS:
+            slot = entry.get(kind)
+            if slot is None:
+                continue
+            items = slot["items"]
+            if items is not None:
+                model = _MODELS[kind]
+                setattr(catalog, kind, [model.model_validate(item) for item in items])
+            catalog.fetched_at[kind] = slot["fetched_at"]
+        return catalog
+
+    def invalidate(self, url: str, kind: Optional[str] = None) -> None:
+        """让某个服务器的某类列表（或全部）失效"""
+        prefix = f"{url}|"
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            if kind is None:
+                del self._entries[key]
+            else:
+                self._entries[key].pop(kind, None)
+        self._save()
+
+    def message_handler(self, url: str) -> Callable[[Any], Awaitable[None]]:
+        """
+        ClientSession 的 message_handler
+
+        收到 notifications/*/list_changed 时让对应列表失效。
+        """
+
+        async def handle(message: Any) -> None:
+            if isinstance(message, types.ServerNotification):
+                kind = _LIST_CHANGED.get(type(message.root))
+                if kind is not None:
+                    self.invalidate(url, kind)
+
+        return handle
@@ -0,0 +1,304 @@
+"""
+统一命令行
+
+    mcp-fda tools                       列出服务器工具（目录缓存新鲜时不连接服务器）
+    mcp-fda call get_drug_warnings drug_name=aspirin
+                                        调用工具（磁盘缓存命中时不连接服务器）
+    mcp-fda call ae_pipeline_rag drug=aspirin query=... -o answer.txt
+                                        把内容流式写入文件
+    mcp-fda batch drugs.csv -o out.jsonl
+                                        批量调用，参数同 mcp-fda-batch
+    mcp-fda cache stats                 磁盘缓存管理，参数同 python -m src.disk_cache
+    mcp-fda demo sse|streamable|openfda 运行示例程序
+
+启动速度：本模块顶层只导入标准库。mcp、httpx、anyio、pydantic 的导入
+需要几百毫秒，只有真正打开传输时才在函数内部导入；--help 和缓存命中的
+调用不会加载它们。用 python -m benchmarks.harness 查看 -X importtime 数据。
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+# 与 streamable_http_demo.FDA_SERVER 和 catalog.DEFAULT_CATALOG_PATH 相同；
+# 这里重复定义，查目录缓存时就不必导入会加载 mcp 的模块
+DEFAULT_SERVER_URL = "http://fda.sitmcp.kaleido.guru/mcp"
+DEFAULT_SERVER_HEADERS = {
+    "emcp-key": "ovgTH2LxJozKlpmGNmeHOOUtYm71NMZJ",
+    "emcp-usercode": "2DebiJQI",
+}
+DEFAULT_CATALOG_PATH = Path.home() / ".cache" / "python-mcp-client" / "catalog.json"
+
+DEMOS = {
+    "sse": "src.sse_client_example",
+    "streamable": "src.streamable_http_demo",
+    "openfda": "src.openfda_demo",
+}
+# 这些子命令把其余参数原样交给对应模块的 main()
+PASSTHROUGH = {
+    "batch": "src.batch_runner",
+    "cache": "src.disk_cache",
+}
+
+
+def add_server_arguments(parser: argparse.ArgumentParser) -> None:
+    """--config/--server、--url/--transport、--header 参数"""
+    parser.add_argument("--config", help="Cursor/Claude Desktop 风格的服务器配置 JSON")
+    parser.add_argument("--server", help="配置文件中的服务器名称（默认第一个）")
+    parser.add_argument("--url", help="服务器地址（默认 FDA StreamableHTTP 服务器）")
+    parser.add_argument("--transport", choices=("sse", "streamableHttp"), default="streamableHttp")
+    parser.add_argument("--header", action="append", default=[], metavar="KEY=VALUE", help="附加请求头")
+
+
+def server_dict(args: argparse.Namespace) -> Dict[str, Any]:
+    """解析成配置字典；没有指定服务器时使用默认 FDA StreamableHTTP 服务器"""
+    if args.config:
+        servers = json.loads(Path(args.config).read_text(encoding="utf-8"))
+        servers = servers.get("mcpServers", servers)
+        config = dict(servers[args.server or next(iter(servers))])
+    elif args.url:
+        config = {"url": args.url, "type": args.transport}
+    else:
+        config = {"url": DEFAULT_SERVER_URL, "type": "streamableHttp", "headers": DEFAULT_SERVER_HEADERS}
+    if args.header:
+        config["headers"] = {**config.get("headers", {}), **dict(h.split("=", 1) for h in args.header)}
+    return config
+
+
+def server_id(args: argparse.Namespace) -> str:
+    """缓存键中的服务器标识，与 result_cache.server_cache_id(server_config(args)) 相同，但不导入 mcp"""
+    # result_cache 只在类型注解中引用 mcp
+    from .result_cache import server_identity
+
+    config = server_dict(args)
+    return server_identity(config.get("type", "sse"), config["url"], config.get("headers"))
+
+
+def server_config(args: argparse.Namespace) -> Any:
+    """构造 ServerConfig（会导入传输层）"""
+    from .transports import ServerConfig
+
+    return ServerConfig.from_dict(server_dict(args))
+
+
+def parse_arguments(pairs: List[str], raw_json: Optional[str]) -> Dict[str, Any]:
+    """KEY=VALUE 参数；值能按 JSON 解析时按 JSON 解析（数字、布尔值等）"""
+    arguments: Dict[str, Any] = json.loads(raw_json) if raw_json else {}
+    for pair in pairs:
+        key, sep, value = pair.partition("=")
+        if not sep:
+            raise SystemExit(f"参数格式应为 KEY=VALUE: {pair}")
+        try:
+            arguments[key] = json.loads(value)
+        except ValueError:
+            arguments[key] = value
+    return arguments
+
+
+def print_result(data: Dict[str, Any], raw: bool) -> None:
+    """输出 CallToolResult 的 JSON 字典"""
+    if raw:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+        return
+    for content in data.get("content", []):
+        if content.get("type") == "text":
+            print(content["text"])
+        else:
+            print(json.dumps(content, ensure_ascii=False))
+    if data.get("isError"):
+        sys.exit(1)
+
+
+# ----------------------------------------------------------------------
+# tools
+# ----------------------------------------------------------------------
+
+
+def cached_tools(server: str, ttl: float) -> Optional[List[Dict[str, Any]]]:
+    """
+    直接读取 CatalogCache 的持久化文件，取该服务器最新的新鲜工具列表
+
+    server 是 server_id：同一 URL 的不同传输类型或请求头分开缓存。
+    """
+    try:
+        entries = json.loads(DEFAULT_CATALOG_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    best = None
+    for key, entry in entries.items():
+        slot = entry.get("tools")
+        if not key.startswith(f"{server}|") or not slot or slot.get("items") is None:
+            continue
+        if time.time() - slot["fetched_at"] < ttl and (best is None or slot["fetched_at"] > best["fetched_at"]):
+            best = slot
+    return best["items"] if best is not None else None
+
+
+async def fetch_tools(config: Any, refresh: bool, ttl: float) -> List[Dict[str, Any]]:
+    from .catalog import TOOLS, CatalogCache
+    from .result_cache import server_cache_id
+    from .session_pool import PooledSession
+
+    # 目录缓存按 server_cache_id 而不是 URL 区分服务器，见 cached_tools
+    server = server_cache_id(config)
+    cache = CatalogCache(ttl=ttl, path=DEFAULT_CATALOG_PATH)
+    if refresh:
+        cache.invalidate(server, TOOLS)
+    conn = PooledSession(config)
+    await conn.start()
+    try:
+        catalog = await cache.get(conn.session, server, conn.init_result)
+    finally:
+        await conn.close()
+    if TOOLS in catalog.errors:
+        raise catalog.errors[TOOLS]
+    return [tool.model_dump(mode="json", exclude_none=True) for tool in catalog.tools or []]
+
+
+def command_tools(args: argparse.Namespace) -> None:
+    tools = None if args.refresh else cached_tools(server_id(args), args.ttl)
+    if tools is None:
+        from .http_pool import run_with_http_pool
+
+        tools = run_with_http_pool(fetch_tools(server_config(args), args.refresh, args.ttl))
+    if args.json:
+        print(json.dumps(tools, ensure_ascii=False, indent=2))
+        return
+    for tool in tools:
+        description = (tool.get("description") or "").strip().splitlines()
+        print(f"{tool['name']}\t{description[0] if description else ''}")
+
+
+# ----------------------------------------------------------------------
+# call
+# ----------------------------------------------------------------------
+
+
+async def fetch_result(config: Any, name: str, arguments: Dict[str, Any], store: Any) -> Dict[str, Any]:
+    from .result_cache import CachedSession, server_cache_id
+    from .session_pool import PooledSession
+
+    conn = PooledSession(config)
+    await conn.start()
+    try:
+        if store is not None:
+            session = CachedSession(conn.session, store=store, server=server_cache_id(config))
+        else:
+            session = conn.session
+        result = await session.call_tool(name, arguments=arguments)
+    finally:
+        await conn.close()
+    return result.model_dump(mode="json", exclude_none=True)
+
+
+async def stream_result(config: Any, name: str, arguments: Dict[str, Any], path: str, max_buffer: int) -> Any:
+    from .content_stream import ContentStreamer, FileSink
+    from .session_pool import PooledSession
+
+    conn = PooledSession(config)
+    await conn.start()
+    try:
+        async with ContentStreamer.for_connection(conn, max_buffer=max_buffer) as streamer:
+            with FileSink(path) as sink:
+                return await streamer.call_tool(name, arguments, sink)
+    finally:
+        await conn.close()
+
+
+def command_call(args: argparse.Namespace) -> None:
+    from .disk_cache import DiskCache
+    from .result_cache import DEFAULT_TOOL_TTLS, cache_key
+
+    arguments = parse_arguments(args.arguments, args.json_arguments)
+    if args.output:
+        # 内容边接收边写入文件，不经过缓存
+        from .http_pool import run_with_http_pool
+
+        result = run_with_http_pool(stream_result(server_config(args), args.tool, arguments, args.output, args.max_buffer))
+        for part in result.parts:
+            print(f"{part.type}\t{part.size}\t{part.preview[:80]!r}", file=sys.stderr)
+        if result.is_error:
+            sys.exit(1)
+        return
+    use_cache = not args.no_cache and args.tool in DEFAULT_TOOL_TTLS
+    store = DiskCache() if use_cache else None
+    try:
+        if store is not None:
+            # 缓存键包含服务器，不同服务器的结果互不混用
+            cached = store.get_bytes(cache_key(args.tool, arguments, server_id(args)))
+            if cached is not None:
+                print_result(json.loads(cached), args.raw)
+                return
+        from .http_pool import run_with_http_pool
+
+        data = run_with_http_pool(fetch_result(server_config(args), args.tool, arguments, store))
+    finally:
+        if store is not None:
+            store.close()
+    print_result(data, args.raw)
+
+
+# ----------------------------------------------------------------------
+# demo / 透传子命令
+# ----------------------------------------------------------------------
+
+
+def command_demo(args: argparse.Namespace) -> None:
+    import importlib
+
+    importlib.import_module(DEMOS[args.name]).main()
+
+
+def run_passthrough(command: str, argv: List[str]) -> None:
+    import importlib
+
+    sys.argv = [f"mcp-fda {command}"] + argv
+    importlib.import_module(PASSTHROUGH[command]).main()
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="mcp-fda", description="FDA MCP 客户端命令行")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    tools = sub.add_parser("tools", help="列出工具")
+    add_server_arguments(tools)
+    tools.add_argument("--refresh", action="store_true", help="忽略目录缓存")
+    tools.add_argument("--ttl", type=float, default=3600.0, help="目录缓存有效期（秒）")
+    tools.add_argument("--json", action="store_true", help="输出完整的工具定义 JSON")
+    tools.set_defaults(handler=command_tools)
+
+    call = sub.add_parser("call", help="调用一个工具")
+    call.add_argument("tool", help="工具名称")
+    call.add_argument("arguments", nargs="*", metavar="KEY=VALUE", help="工具参数")
+    call.add_argument("--json", dest="json_arguments", metavar="JSON", help="JSON 格式的参数")
+    call.add_argument("--no-cache", action="store_true", help="不读写磁盘缓存")
+    call.add_argument("--raw", action="store_true", help="输出完整的 CallToolResult JSON")
+    call.add_argument("--output", "-o", metavar="PATH", help="把内容流式写入文件（不缓存，内存占用与结果大小无关）")
+    call.add_argument("--max-buffer", type=int, default=1 << 20, help="--output 时不写入文件的单个字段上限（字符）")
+    add_server_arguments(call)
+    call.set_defaults(handler=command_call)
+
+    demo = sub.add_parser("demo", help="运行示例程序")
+    demo.add_argument("name", choices=sorted(DEMOS))
+    demo.set_defaults(handler=command_demo)
+
+    for name, module in PASSTHROUGH.items():
+        sub.add_parser(name, help=f"参数同 python -m {module}", add_help=False)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    """mcp-fda 命令行入口"""
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] in PASSTHROUGH:
+        run_passthrough(argv[0], argv[1:])
+        return
+    args = build_parser().parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+"""
+FDA 结果的列式导出
+
+把 search_drug_labels / get_drug_* 结果中的 results 记录展开成固定
+schema 的 Arrow RecordBatch：
+    - openfda.* 的常用字段作为字符串列表列，品牌名和制造商名用字典编码
+    - indications_and_usage、warnings、adverse_reactions 的段落合并为一个字符串列
+    - 每行附带来源工具名和调用参数
+记录通过 lazy_json 逐条读取，攒够 batch_rows 行就写出一个批次，
+工具调用还在进行时就能增量写入 Parquet（或 Arrow IPC 流）文件，内存占用
+只与批次大小有关。
+
+pyarrow 是可选依赖：
+    pip install "python-mcp-client-example[parquet]"
+
+用法:
+    with ParquetSink("labels.parquet") as sink:
+        result = await session.call_tool("search_drug_labels", {...})
+        sink.add(result, tool="search_drug_labels", arguments={...})
+"""
+
+import json
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Union
+
+from .lazy_json import Source, iter_records
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+# openfda 中导出的字段；其余字段忽略，保证 schema 固定
+OPENFDA_FIELDS = (
+    "brand_name",
+    "generic_name",
+    "manufacturer_name",
+    "substance_name",
+    "product_type",
+    "route",
+    "application_number",
+    "product_ndc",
+    "spl_id",
+    "spl_set_id",
+    "rxcui",
+    "unii",
+)
+# 重复值很多的字段用字典编码
+DICTIONARY_FIELDS = frozenset({"brand_name", "manufacturer_name"})
+TEXT_FIELDS = ("indications_and_usage", "warnings", "adverse_reactions")
+SCALAR_FIELDS = ("id", "set_id", "effective_time")
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError('列式导出需要 pyarrow: pip install "python-mcp-client-example[parquet]"')
+
+
+def label_schema() -> "pa.Schema":
+    """药品标签记录的固定 schema"""
+    _require_pyarrow()
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    fields = [
+        pa.field("tool", dictionary),
+        pa.field("arguments", pa.string()),
+    ]
+    fields += [pa.field(name, pa.string()) for name in SCALAR_FIELDS]
+    fields += [
+        pa.field(f"openfda_{name}", pa.list_(dictionary if name in DICTIONARY_FIELDS else pa.string()))
+        for name in OPENFDA_FIELDS
+    ]
+    fields += [pa.field(name, pa.string()) for name in TEXT_FIELDS]
+    return pa.schema(fields)
+
+
+def _text(value: Any) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return "\n".join(str(item) for item in value)
+    return str(value)
+
+
+def _string_list(value: Any) -> Optional[List[str]]:
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return [str(item) for item in value]
+    return [str(value)]
+
+
+class RecordBatchBuilder:
+    """按列缓冲记录，flush() 产出一个 RecordBatch"""
+
+    def __init__(self):
+        self.schema = label_schema()
+        self._columns: Dict[str, List[Any]] = {name: [] for name in self.schema.names}
+        self.rows = 0
+
+    def append(self, record: Dict[str, Any], tool: Optional[str], arguments: Optional[str]) -> None:
+        columns = self._columns
+        columns["tool"].append(tool)
+        columns["arguments"].append(arguments)
+        for name in SCALAR_FIELDS:
+            columns[name].append(_text(record.get(name)))
+        openfda = record.get("openfda") or {}
+        for name in OPENFDA_FIELDS:
+            columns[f"openfda_{name}"].append(_string_list(openfda.get(name)))
+        for name in TEXT_FIELDS:
+            columns[name].append(_text(record.get(name)))
+        self.rows += 1
+
+    def flush(self) -> "pa.RecordBatch":
+        arrays = [
+            pa.array(self._columns[field.name], type=field.type) for field in self.schema
+        ]
+        for values in self._columns.values():
+            values.clear()
+        self.rows = 0
+        return pa.RecordBatch.from_arrays(arrays, schema=self.schema)
+
+
+class _BatchSink(ABC):
+    """攒够 batch_rows 行就交给 _write_batch"""
+
+    def __init__(self, batch_rows: int = 1024):
+        if batch_rows < 1:
+            raise ValueError("batch_rows 必须大于 0")
+        self.batch_rows = batch_rows
+        self.builder = RecordBatchBuilder()
+        self.schema = self.builder.schema
+        self.rows_written = 0
+        self.batches_written = 0
+
+    def add(self, result: Source, tool: Optional[str] = None,
+            arguments: Optional[Dict[str, Any]] = None) -> int:
+        """展开一个工具结果中的 results 记录，返回写入的行数"""
+        arguments_json = json.dumps(arguments, ensure_ascii=False, sort_keys=True) if arguments is not None else None
+        count = 0
+        for record in iter_records(result, "results"):
+            if not isinstance(record, dict):
+                continue
+            self.builder.append(record, tool, arguments_json)
+            count += 1
+            if self.builder.rows >= self.batch_rows:
+                self.flush()
+        return count
+
+    def flush(self) -> None:
+        if self.builder.rows:
+            batch = self.builder.flush()
+            self._write_batch(batch)
+            self.rows_written += batch.num_rows
+            self.batches_written += 1
+
+    @abstractmethod
+    def _write_batch(self, batch: "pa.RecordBatch") -> None:
+        """写出一个批次"""
+
+    @abstractmethod
+    def _close_writer(self) -> None:
+        """关闭底层写入器"""
+
+    def close(self) -> None:
+        self.flush()
+        self._close_writer()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class ParquetSink(_BatchSink):
+    """增量写入 Parquet 文件，每个批次一个 row group"""
+
+    def __init__(self, path: Union[str, Path], batch_rows: int = 1024, compression: str = "zstd"):
+        super().__init__(batch_rows)
+        self.path = Path(path)
+        self._writer = pq.ParquetWriter(str(self.path), self.schema, compression=compression)
+
+    def _write_batch(self, batch: "pa.RecordBatch") -> None:
+        self._writer.write_batch(batch)
+
+    def _close_writer(self) -> None:
+        self._writer.close()
+
+
+class ArrowSink(_BatchSink):
+    """
+    增量写入 Arrow IPC 流
+
+    IPC 文件格式要求整个文件共用一份字典，而每个批次的字典不同，
+    所以使用流格式，读取时用 pyarrow.ipc.open_stream。
+    """
+
+    def __init__(self, path: Union[str, Path], batch_rows: int = 1024):
+        super().__init__(batch_rows)
+        self.path = Path(path)
+        self._sink = pa.OSFile(str(self.path), "wb")
+        self._writer = pa.ipc.new_stream(self._sink, self.schema)
+
+    def _write_batch(self, batch: "pa.RecordBatch") -> None:
+        self._writer.write_batch(batch)
+
+    def _close_writer(self) -> None:
+        self._writer.close()
+        self._sink.close()
+
+
+def open_sink(path: Union[str, Path], batch_rows: int = 1024) -> _BatchSink:
+    """按扩展名选择 Parquet 或 Arrow IPC 流（.arrow / .arrows）"""
+    path = Path(path)
+    if path.suffix.lower() in (".arrow", ".arrows"):
+        return ArrowSink(path, batch_rows)
+    return ParquetSink(path, batch_rows)
@@ -0,0 +1,605 @@
+"""
+工具结果内容的流式写出
+
+ClientSession 要把整个响应读进内存、解析成 CallToolResult 后才交给调用方；
+ae_pipeline_rag 或 limit 很大的标签搜索会返回很大的文本，几个并发的大响应
+就能撑爆小容器的内存。ContentStreamer 直接 POST tools/call（带同一个
+mcp-session-id），边接收边增量解析 JSON-RPC 响应：
+    - result.content[i].text 按块写入 sink
+    - result.content[i].data（base64）按块解码后写入 sink
+    - structuredContent 只扫描不保留（FastMCP 会在其中重复一份文本）
+    - 其余字段照常保留，单个值超过 max_buffer 时抛出 ContentTooLarge
+每次只读取 chunk_size 字节，sink 写完才读下一块，单个响应占用的内存
+与响应大小无关。
+
+SSE 传输的响应从共享的 GET 流返回，无法单独接管，此时退回 ClientSession
+读取完整结果后再分块写入 sink（不限制内存）。
+
+用法:
+    async with ContentStreamer.for_connection(conn) as streamer:
+        with FileSink("answer.txt") as sink:
+            result = await streamer.call_tool("ae_pipeline_rag", {...}, sink)
+        print(result.parts[0].size, result.parts[0].preview)
+"""
+
+import base64
+import codecs
+import inspect
+import itertools
+import re
+from abc import ABC, abstractmethod
+from json.decoder import scanstring
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+import httpx
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+
+from .http_pool import http_pool
+from .lazy_json import string_body_end
+from .transports import STREAMABLE_HTTP, ServerConfig, request_headers
+
+Chunk = Union[str, bytes]
+JsonPath = Tuple[Union[str, int], ...]
+
+STREAM = "stream"
+SKIP = "skip"
+
+_WHITESPACE = " \t\n\r"
+_SCALAR = re.compile(r"[-+.0-9a-zA-Z]*")
+_SCALARS = {"true": True, "false": False, "null": None}
+
+
+class ContentTooLarge(ValueError):
+    """不写入 sink 的字段超过了 max_buffer"""
+
+
+def classify_content_path(path: JsonPath) -> Optional[str]:
+    """content 的 text/data 流式写出，structuredContent 跳过，其余保留"""
+    if len(path) == 4 and path[:2] == ("result", "content") and path[3] in ("text", "data"):
+        return STREAM
+    if path[:2] == ("result", "structuredContent"):
+        return SKIP
+    return None
+
+
+class StreamingJsonDecoder:
+    """
+    增量 JSON 解析器
+
+    feed() 接收任意切分的文本片段。classify(path) 返回 STREAM 的字符串值
+    不保留，以 (path, 片段) 的形式从 feed() 返回，字符串结束时返回 (path, None)；
+    返回 SKIP 的值只扫描结构；其余值构造成 Python 对象，close() 返回整个文档。
+    """
+
+    def __init__(self, classify: Callable[[JsonPath], Optional[str]], max_buffer: int = 1 << 20):
+        self.classify = classify
+        self.max_buffer = max_buffer
+        # 每层: [容器（跳过时为 None）, 路径, 下一个键或下标, 状态]
+        self._stack: List[list] = []
+        self._root: Any = None
+        self._done = False
+        self._pending = ""
+        # 字符串状态：None 表示不在字符串中
+        self._string: Optional[str] = None  # "key" / STREAM / SKIP / "value"
+        self._string_path: JsonPath = ()
+        self._high_surrogate = ""
+        self._parts: List[str] = []
+        self._size = 0
+        self._scalar: Optional[str] = None
+        self._out: List[Tuple[JsonPath, Optional[str]]] = []
+
+    # ------------------------------------------------------------------
+    # 值的插入
+    # ------------------------------------------------------------------
+
+    def _value_path(self) -> JsonPath:
+        if not self._stack:
+            return ()
+        frame = self._stack[-1]
+        return frame[1] + (frame[2],)
+
+    def _mode(self, path: JsonPath) -> Optional[str]:
+        if self._stack and self._stack[-1][0] is None:
+            return SKIP
+        return self.classify(path)
+
+    def _emit(self, value: Any) -> None:
+        """一个值结束：放入父容器"""
+        if not self._stack:
+            self._root = value
+            self._done = True
+            return
+        frame = self._stack[-1]
+        container = frame[0]
+        if isinstance(container, dict):
+            container[frame[2]] = value
+        elif isinstance(container, list):
+            container.append(value)
+        frame[3] = "after_value"
+
+    def _end_value(self, mode: Optional[str], value: Any) -> None:
+        if mode is None:
+            self._emit(value)
+        elif self._stack:
+            self._stack[-1][3] = "after_value"
+        else:
+            self._done = True
+
+    # ------------------------------------------------------------------
+    # 词法
+    # ------------------------------------------------------------------
+
+    def _start_string(self) -> None:
+        frame = self._stack[-1] if self._stack else None
+        if frame is not None and frame[3] == "key":
+            self._string = "key"
+        else:
+            path = self._value_path()
+            self._string = self._mode(path) or "value"
+            self._string_path = path
+        self._parts = []
+        self._size = 0
+
+    def _append_string(self, piece: str) -> None:
+        if not piece or self._string == SKIP:
+            return
+        if self._string == STREAM:
+            self._out.append((self._string_path, piece))
+            return
+        self._size += len(piece)
+        if self._size > self.max_buffer:
+            raise ContentTooLarge(f"字段 {'.'.join(map(str, self._value_path()))} 超过 {self.max_buffer} 字符")
+        self._parts.append(piece)
+
+    def _end_string(self) -> None:
+        kind, self._string = self._string, None
+        text = "".join(self._parts)
+        self._parts = []
+        if kind == "key":
+            frame = self._stack[-1]
+            frame[2] = text
+            frame[3] = "colon"
+        elif kind == STREAM:
+            self._out.append((self._string_path, None))
+            self._end_value(STREAM, None)
+        else:
+            self._end_value(SKIP if kind == SKIP else None, text)
+
+    def _scan_string(self, text: str, i: int) -> int:
+        """
+        在字符串内部扫描，返回处理到的位置
+
+        用 lazy_json.string_body_end 找到未转义的引号，转义序列交给 C 实现的 scanstring 解码；
+        片段末尾可能不完整的转义序列留到下次，被切开的代理对由 _append_decoded 拼接。
+        """
+        end = string_body_end(text, i)
+        closed = end < len(text) and text[end] == '"'
+        segment = text[i:end]
+        if not closed:
+            # 末尾 6 个字符内的反斜杠（连同它之前连续的反斜杠）留到下次
+            k = segment.find("\\", max(0, len(segment) - 6))
+            if k < 0:
+                k = len(segment)
+            while k > 0 and segment[k - 1] == "\\":
+                k -= 1
+            self._pending = segment[k:] + text[end:]
+            segment = segment[:k]
+            end = len(text)
+        if segment:
+            self._append_decoded(scanstring(segment + '"', 0, False)[0] if "\\" in segment else segment)
+        if closed:
+            if self._high_surrogate:
+                self._append_string(self._high_surrogate)
+                self._high_surrogate = ""
+            self._end_string()
+            return end + 1
+        return end
+
+    def _append_decoded(self, piece: str) -> None:
+        """拼接跨片段的代理对（\\uD83D 与 \\uDE00 分别落在两个片段中）"""
+        if self._high_surrogate:
+            if "\udc00" <= piece[0] <= "\udfff":
+                piece = (self._high_surrogate + piece[0]).encode("utf-16", "surrogatepass").decode("utf-16") + piece[1:]
+            else:
+                piece = self._high_surrogate + piece
+            self._high_surrogate = ""
+        if "\ud800" <= piece[-1] <= "\udbff":
+            self._high_surrogate, piece = piece[-1], piece[:-1]
+        self._append_string(piece)
+
+    def _end_scalar(self) -> None:
+        token, self._scalar = self._scalar, None
+        if token in _SCALARS:
+            value: Any = _SCALARS[token]
+        elif any(c in token for c in ".eE"):
+            value = float(token)
+        else:
+            value = int(token)
+        path = self._value_path()
+        self._end_value(self._mode(path), value)
+
+    def _open(self, kind: str) -> None:
+        path = self._value_path()
+        mode = self._mode(path)
+        if mode == STREAM:
+            raise ValueError(f"{'.'.join(map(str, path))} 应为字符串")
+        container = ({} if kind == "{" else []) if mode is None else None
+        self._stack.append([container, path, 0 if kind == "[" else None, "key_or_end" if kind == "{" else "value_or_end"])
+
+    def _close(self) -> None:
+        container, path, _, _ = self._stack.pop()
+        if container is not None:
+            self._emit(container)
+        elif self._stack:
+            self._stack[-1][3] = "after_value"
+        else:
+            self._done = True
+
+    def feed(self, text: str) -> List[Tuple[JsonPath, Optional[str]]]:
+        """解析一个片段，返回期间产生的 (path, 片段) 列表"""
+        if self._pending:
+            text, self._pending = self._pending + text, ""
+        self._out = []
+        i, n = 0, len(text)
+        while i < n:
+            if self._string is not None:
+                i = self._scan_string(text, i)
+                continue
+            if self._scalar is not None:
+                match = _SCALAR.match(text, i)
+                self._scalar += match.group()
+                i = match.end()
+                if i < n:
+                    self._end_scalar()
+                continue
+            c = text[i]
+            i += 1
+            if c in _WHITESPACE:
+                continue
+            if self._done:
+                raise ValueError("JSON 文档结束后还有多余内容")
+            frame = self._stack[-1] if self._stack else None
+            state = frame[3] if frame is not None else "value"
+            if c == '"' and state in ("key", "key_or_end", "value", "value_or_end"):
+                if state == "key_or_end":
+                    frame[3] = "key"
+                elif state == "value_or_end":
+                    frame[3] = "value"
+                self._start_string()
+            elif c in "{[" and state in ("value", "value_or_end"):
+                if frame is not None:
+                    frame[3] = "value"
+                self._open(c)
+            elif c in "}]" and (state in ("key_or_end", "value_or_end", "after_value")):
+                if (c == "]") != isinstance(frame[2], int):
+                    raise ValueError(f"括号不匹配: {c}")
+                self._close()
+            elif c == ":" and state == "colon":
+                frame[3] = "value"
+            elif c == "," and state == "after_value":
+                if isinstance(frame[2], int):
+                    frame[2] += 1
+                    frame[3] = "value"
+                else:
+                    frame[3] = "key"
+            elif state in ("value", "value_or_end") and (c == "-" or c.isalnum()):
+                if frame is not None:
+                    frame[3] = "value"
+                self._scalar = c
+            else:
+                raise ValueError(f"意外的字符: {c!r}")
+        return self._out
+
+    def close(self) -> Any:
+        """输入结束，返回解析出的文档（STREAM/SKIP 的值不在其中）"""
+        if self._scalar is not None:
+            self._end_scalar()
+        if not self._done or self._string is not None or self._pending:
+            raise ValueError("JSON 文档不完整")
+        return self._root
+
+
+class SseDataReader:
+    """把 SSE 字节流拆成 data 字段片段；事件结束时产出 None"""
+
+    def __init__(self):
+        self._name: Optional[str] = ""
+        self._field: Optional[str] = None
+        self._strip_space = False
+        self._has_data = False
+
+    def feed(self, text: str) -> List[Optional[str]]:
+        out: List[Optional[str]] = []
+        text = text.replace("\r", "")
+        i, n = 0, len(text)
+        while i < n:
+            if self._field is None:
+                newline = text.find("\n", i)
+                colon = text.find(":", i, newline if newline >= 0 else n)
+                if colon < 0 and newline < 0:
+                    self._name += text[i:]
+                    break
+                if colon < 0:
+                    name = self._name + text[i:newline]
+                    self._name = ""
+                    i = newline + 1
+                    if not name:
+                        if self._has_data:
+                            out.append(None)
+                        self._has_data = False
+                    continue
+                self._field = self._name + text[i:colon]
+                self._name = ""
+                self._strip_space = True
+                if self._field == "data" and self._has_data:
+                    out.append("\n")
+                i = colon + 1
+                continue
+            newline = text.find("\n", i)
+            value = text[i:] if newline < 0 else text[i:newline]
+            if self._strip_space and value:
+                self._strip_space = False
+                if value[0] == " ":
+                    value = value[1:]
+            if self._field == "data":
+                self._has_data = True
+                if value:
+                    out.append(value)
+            if newline < 0:
+                break
+            self._field = None
+            i = newline + 1
+        return out
+
+    def close(self) -> List[Optional[str]]:
+        return [None] if self._has_data else []
+
+
+# ----------------------------------------------------------------------
+# sink
+# ----------------------------------------------------------------------
+
+
+class ContentSink(ABC):
+    """流式内容的接收端；index 是内容在 result.content 中的下标"""
+
+    @abstractmethod
+    async def write(self, index: int, chunk: Chunk) -> None:
+        """写入一块内容（文本为 str，二进制为 bytes）"""
+
+    async def end_part(self, index: int) -> None:
+        pass
+
+
+class FileSink(ContentSink):
+    """按到达顺序把所有内容写入一个文件（文本按 UTF-8 编码）"""
+
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._file = open(self.path, "wb")
+        self.bytes_written = 0
+
+    async def write(self, index: int, chunk: Chunk) -> None:
+        data = chunk.encode("utf-8", "surrogatepass") if isinstance(chunk, str) else chunk
+        self._file.write(data)
+        self.bytes_written += len(data)
+
+    def close(self) -> None:
+        self._file.close()
+
+    def __enter__(self) -> "FileSink":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+class CallbackSink(ContentSink):
+    """把每个块交给回调（普通函数或协程函数均可）"""
+
+    def __init__(self, callback: Callable[[int, Chunk], Union[None, Awaitable[None]]]):
+        self.callback = callback
+
+    async def write(self, index: int, chunk: Chunk) -> None:
+        result = self.callback(index, chunk)
+        if inspect.isawaitable(result):
+            await result
+
+
+# ----------------------------------------------------------------------
+# 结果
+# ----------------------------------------------------------------------
+
+
+@dataclass
+class StreamedPart:
+    """一个已写入 sink 的内容项"""
+
+    index: int
+    type: str
+    # 文本为字符数，二进制为字节数
+    size: int = 0
+    mime_type: Optional[str] = None
+    preview: str = ""
+
+
+@dataclass
+class StreamedResult:
+    """流式调用的结果：内容已写入 sink，这里只保留元数据"""
+
+    is_error: bool
+    parts: List[StreamedPart] = field(default_factory=list)
+    meta: Optional[Dict[str, Any]] = None
+    streamed: bool = True
+
+
+class _PartWriter:
+    """把解析出的片段转换成 sink 写入，统计大小并保留预览"""
+
+    def __init__(self, sink: ContentSink, preview_chars: int):
+        self.sink = sink
+        self.preview_chars = preview_chars
+        self.sizes: Dict[int, int] = {}
+        self.previews: Dict[int, str] = {}
+        self._base64: Dict[int, str] = {}
+
+    async def write(self, path: JsonPath, piece: Optional[str]) -> None:
+        index, key = path[2], path[3]
+        if key == "data":
+            buffered = self._base64.pop(index, "") + (piece or "")
+            cut = len(buffered) if piece is None else len(buffered) // 4 * 4
+            if piece is not None and cut < len(buffered):
+                self._base64[index] = buffered[cut:]
+            chunk: Chunk = base64.b64decode(buffered[:cut]) if cut else b""
+        else:
+            chunk = piece or ""
+            preview = self.previews.get(index, "")
+            if len(preview) < self.preview_chars:
+                self.previews[index] = preview + chunk[: self.preview_chars - len(preview)]
+        if chunk:
+            self.sizes[index] = self.sizes.get(index, 0) + len(chunk)
+            await self.sink.write(index, chunk)
+        if piece is None:
+            await self.sink.end_part(index)
+
+    def result(self, message: Dict[str, Any], streamed: bool = True) -> StreamedResult:
+        result = message.get("result") or {}
+        parts = []
+        for index, content in enumerate(result.get("content") or []):
+            parts.append(StreamedPart(
+                index=index,
+                type=content.get("type", ""),
+                size=self.sizes.get(index, 0),
+                mime_type=content.get("mimeType"),
+                preview=self.previews.get(index, ""),
+            ))
+        return StreamedResult(
+            is_error=bool(result.get("isError")),
+            parts=parts,
+            meta=result.get("_meta"),
+            streamed=streamed,
+        )
+
+
+class ContentStreamer:
+    """
+    把 tools/call 的内容流式写入 sink
+
+    max_buffer 限制不写入 sink 的单个字段大小（字符数），chunk_size 是每次
+    从网络读取的字节数；preview_chars 为每个文本内容保留的前缀长度。
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        config: ServerConfig,
+        get_session_id: Callable[[], Optional[str]],
+        protocol_version: Optional[str] = None,
+        max_buffer: int = 1 << 20,
+        chunk_size: int = 64 * 1024,
+        preview_chars: int = 1000,
+    ):
+        self.session = session
+        self.config = config
+        self.get_session_id = get_session_id
+        self.protocol_version = protocol_version
+        self.max_buffer = max_buffer
+        self.chunk_size = chunk_size
+        self.preview_chars = preview_chars
+        self._ids = itertools.count(1)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def for_connection(cls, conn: Any, **kwargs: Any) -> "ContentStreamer":
+        """包装 PooledSession（已完成 initialize）"""
+        version = conn.init_result.protocolVersion if conn.init_result is not None else None
+        return cls(conn.session, conn.config, conn.get_session_id, version, **kwargs)
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]],
+                        sink: ContentSink) -> StreamedResult:
+        writer = _PartWriter(sink, self.preview_chars)
+        if self.config.transport != STREAMABLE_HTTP:
+            return await self._call_buffered(name, arguments, writer)
+        if self._client is None:
+            self._client = http_pool().client(timeout=httpx.Timeout(self.config.timeout,
+                                                                     read=self.config.sse_read_timeout))
+        request_id = f"stream-{next(self._ids)}"
+        body = {
+            "jsonrpc": "2.0",
+            "id": request_id,
+            "method": "tools/call",
+            "params": {"name": name, "arguments": arguments or {}},
+        }
+        headers = request_headers(self.config, self.get_session_id(), self.protocol_version)
+        async with self._client.stream("POST", self.config.url, json=body, headers=headers) as response:
+            response.raise_for_status()
+            sse = response.headers.get("content-type", "").startswith("text/event-stream")
+            message = await self._read_response(response, sse, request_id, writer)
+        if message is None:
+            raise ValueError("响应中没有 tools/call 的结果")
+        if "error" in message:
+            raise McpError(ErrorData.model_validate(message["error"]))
+        return writer.result(message)
+
+    async def _read_response(self, response: httpx.Response, sse: bool, request_id: str,
+                             writer: _PartWriter) -> Optional[Dict[str, Any]]:
+        """逐块解析响应；SSE 中的通知等其他消息被忽略"""
+        utf8 = codecs.getincrementaldecoder("utf-8")()
+        reader = SseDataReader() if sse else None
+        decoder: Optional[StreamingJsonDecoder] = None
+
+        async def handle(pieces: List[Optional[str]]) -> Optional[Dict[str, Any]]:
+            nonlocal decoder
+            for piece in pieces:
+                if piece is None:
+                    if decoder is None:
+                        continue
+                    message, decoder = decoder.close(), None
+                    if isinstance(message, dict) and message.get("id") == request_id:
+                        return message
+                    continue
+                if decoder is None:
+                    decoder = StreamingJsonDecoder(classify_content_path, self.max_buffer)
+                # 只有响应带 result，通知和服务器请求不会命中内容路径
+                for path, chunk in decoder.feed(piece):
+                    await writer.write(path, chunk)
+            return None
+
+        async for raw in response.aiter_bytes(self.chunk_size):
+            text = utf8.decode(raw)
+            message = await handle(reader.feed(text) if reader is not None else [text])
+            if message is not None:
+                return message
+        tail = utf8.decode(b"", final=True)
+        if reader is not None:
+            return await handle(reader.feed(tail) + reader.close())
+        return await handle([tail, None])
+
+    async def _call_buffered(self, name: str, arguments: Optional[Dict[str, Any]],
+                             writer: _PartWriter) -> StreamedResult:
+        """SSE 传输：读取完整结果后分块写入"""
+        result = await self.session.call_tool(name, arguments=arguments)
+        message = {"result": result.model_dump(mode="json", by_alias=True, exclude={"structuredContent"})}
+        for index, content in enumerate(message["result"].get("content") or []):
+            for key in ("text", "data"):
+                value = content.pop(key, None)
+                if value is None:
+                    continue
+                for start in range(0, len(value), self.chunk_size):
+                    await writer.write(("result", "content", index, key), value[start:start + self.chunk_size])
+                await writer.write(("result", "content", index, key), None)
+        return writer.result(message, streamed=False)
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "ContentStreamer":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
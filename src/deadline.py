@@ -0,0 +1,150 @@
+"""
+单次调用的截止时间与取消
+
+连接级的 timeout / sse_read_timeout 管不住单个慢调用：一个 ae_pipeline_rag
+可以占住 worker 五分钟。DeadlineSession 为每次 call_tool 设置截止时间：
+    - deadline(秒) 上下文中的调用共享同一个截止时间（嵌套时取更早的），
+      重试和后续调用只能使用剩余的时间
+    - 超时后立即取消本地等待、释放调用方，并在后台向服务器发送
+      notifications/cancelled（带被放弃的请求 id），服务器据此停止处理
+    - 调用方自己被取消时同样通知服务器
+    - 迟到的响应找不到等待者，ClientSession 直接丢弃，不再构造 CallToolResult
+
+MCP 没有标准的截止时间字段，截止时间只在客户端生效，通过取消通知传达给服务器。
+DeadlineSession 必须直接包装 ClientSession（缓存、限流等包装放在它外面），
+这样才能取得请求 id。SDK 没有公开下一个请求的 id，这里读取 BaseSession 的
+_request_id（mcp 1.x 中一直存在，依赖版本限制为 <2），构造时检查它是否存在。
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+from mcp.types import (
+    CallToolResult,
+    CancelledNotification,
+    CancelledNotificationParams,
+    ClientNotification,
+)
+
+# 当前上下文的截止时间（time.monotonic() 时间点）
+_deadline: ContextVar[Optional[float]] = ContextVar("mcp_call_deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """调用超过了截止时间"""
+
+
+@contextmanager
+def deadline(seconds: Optional[float]) -> Iterator[None]:
+    """
+    在此范围内的调用共享一个截止时间
+
+    用法:
+        with deadline(10):
+            result = await session.call_tool(...)
+    """
+    if seconds is None:
+        yield
+        return
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    token = _deadline.set(at if current is None else min(current, at))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining(timeout: Optional[float] = None) -> Optional[float]:
+    """当前上下文剩余的时间（秒），与 timeout 取较小值；都没有时返回 None"""
+    at = _deadline.get()
+    left = None if at is None else at - time.monotonic()
+    if timeout is not None:
+        left = timeout if left is None else min(left, timeout)
+    return left
+
+
+class DeadlineSession:
+    """
+    带截止时间的会话包装
+
+    call_tool 的 timeout 参数、default_timeout 和 deadline() 上下文三者取最早的截止时间。
+    """
+
+    def __init__(self, session: Any, default_timeout: Optional[float] = None):
+        if not isinstance(getattr(session, "_request_id", None), int):
+            raise TypeError(
+                f"DeadlineSession 需要直接包装 ClientSession，{type(session).__name__} 没有 _request_id"
+            )
+        self.session = session
+        self.default_timeout = default_timeout
+        self.calls = 0
+        self.expired = 0
+        self.cancelled_sent = 0
+        self._background: set = set()
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None,
+        **kwargs: Any,
+    ) -> CallToolResult:
+        budget = remaining(timeout if timeout is not None else self.default_timeout)
+        if budget is None:
+            return await self.session.call_tool(name, arguments=arguments, **kwargs)
+        self.calls += 1
+        if budget <= 0:
+            self.expired += 1
+            raise DeadlineExceeded(f"{name}: 截止时间已过，未发送请求")
+
+        request_ids = []
+
+        async def send() -> CallToolResult:
+            # call_tool 在 send_request 分配请求 id 之前没有 await，这里读到的就是本次请求的 id
+            request_ids.append(self.session._request_id)
+            return await self.session.call_tool(name, arguments=arguments, **kwargs)
+
+        task = asyncio.ensure_future(send())
+        try:
+            done, _ = await asyncio.wait({task}, timeout=budget)
+        except asyncio.CancelledError:
+            self._abandon(task, request_ids, "调用方已取消")
+            raise
+        if task in done:
+            return task.result()
+        self.expired += 1
+        self._abandon(task, request_ids, f"超过截止时间 ({budget:.1f}s)")
+        raise DeadlineExceeded(f"{name}: 超过截止时间 ({budget:.1f}s)")
+
+    def _abandon(self, task: asyncio.Task, request_ids: list, reason: str) -> None:
+        """取消本地等待并在后台通知服务器"""
+        task.cancel()
+        if request_ids:
+            notify = asyncio.ensure_future(self._send_cancelled(request_ids[0], reason))
+            self._background.add(notify)
+            notify.add_done_callback(self._background.discard)
+
+    async def _send_cancelled(self, request_id: int, reason: str) -> None:
+        try:
+            await self.session.send_notification(
+                ClientNotification(
+                    CancelledNotification(
+                        method="notifications/cancelled",
+                        params=CancelledNotificationParams(requestId=request_id, reason=reason),
+                    )
+                )
+            )
+            self.cancelled_sent += 1
+        except Exception:
+            # 连接已经断开时服务器也不会再处理这个请求
+            pass
+
+    def stats(self) -> Dict[str, int]:
+        return {"calls": self.calls, "expired": self.expired, "cancelled_sent": self.cancelled_sent}
@@ -0,0 +1,328 @@
+"""
+持久化工具结果缓存
+
+把 CallToolResult 以 JSON 形式追加写入本地段文件（segment.dat），
+并用索引文件（index.json）记录每个键的偏移量。进程重启后只需加载
+索引，结果本身通过 mmap 按需读取和解析。
+
+段文件记录格式：
+    头部 (魔数, 键长度, 值长度, 过期时间) + 键 + 值
+值长度为 0 的记录是删除标记。索引文件丢失或落后时，通过扫描
+段文件头部恢复，不需要解析任何结果内容。
+
+命令行：
+    python -m src.disk_cache stats
+    python -m src.disk_cache list --tool search_drug_labels
+    python -m src.disk_cache purge --tool get_drug_warnings
+    python -m src.disk_cache compact
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from mcp.types import CallToolResult
+
+DEFAULT_CACHE_DIR = Path.home() / ".cache" / "python-mcp-client" / "results"
+
+_MAGIC = b"MCPR"
+_HEADER = struct.Struct("<4sIId")
+_SEGMENT = "segment.dat"
+_INDEX = "index.json"
+_INDEX_VERSION = 1
+
+# key -> [偏移量, 记录总长度, 过期时间（Unix 时间戳）]
+IndexEntry = List[float]
+
+
+def tool_of(key: str) -> str:
+    """从缓存键中取出工具名称"""
+    return key.split("\x00", 1)[0]
+
+
+class DiskCache:
+    """
+    追加写入的磁盘缓存
+
+    max_bytes 限制段文件大小：超出时先压缩（丢弃过期和被覆盖的记录），
+    仍然超出时按写入顺序淘汰最旧的条目。
+    """
+
+    def __init__(self, path: Path = DEFAULT_CACHE_DIR, max_bytes: int = 256 * 1024 * 1024):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.path.mkdir(parents=True, exist_ok=True)
+        self._segment_path = self.path / _SEGMENT
+        self._index_path = self.path / _INDEX
+        self._segment_path.touch(exist_ok=True)
+        self._index: Dict[str, IndexEntry] = {}
+        self._writer = open(self._segment_path, "ab")
+        self._reader = open(self._segment_path, "rb")
+        self._map: Optional[mmap.mmap] = None
+        self._dirty = False
+        self._load_index()
+
+    # ------------------------------------------------------------------
+    # 索引
+    # ------------------------------------------------------------------
+
+    def _load_index(self) -> None:
+        indexed_end = 0
+        try:
+            data = json.loads(self._index_path.read_text(encoding="utf-8"))
+            if data.get("version") == _INDEX_VERSION:
+                self._index = data["entries"]
+                indexed_end = data["segment_end"]
+        except (OSError, ValueError, KeyError):
+            self._index = {}
+        segment_size = self._segment_path.stat().st_size
+        if indexed_end > segment_size:
+            # 段文件被截断或替换，索引不可信
+            self._index = {}
+            indexed_end = 0
+        if indexed_end < segment_size:
+            self._scan(indexed_end)
+            self._dirty = True
+
+    def _scan(self, start: int) -> None:
+        """从 start 开始扫描段文件头部，补全索引"""
+        segment_size = self._segment_path.stat().st_size
+        with open(self._segment_path, "rb") as f:
+            f.seek(start)
+            offset = start
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    break
+                magic, key_len, value_len, expires_at = _HEADER.unpack(header)
+                if magic != _MAGIC:
+                    break
+                key_bytes = f.read(key_len)
+                if len(key_bytes) < key_len:
+                    break
+                length = _HEADER.size + key_len + value_len
+                if offset + length > segment_size:
+                    # 值没有写完
+                    break
+                key = key_bytes.decode("utf-8")
+                if value_len == 0:
+                    self._index.pop(key, None)
+                else:
+                    self._index[key] = [offset, length, expires_at]
+                f.seek(value_len, os.SEEK_CUR)
+                offset += length
+        # 截掉末尾不完整的记录，保证后续追加从记录边界开始
+        if offset < segment_size:
+            self._writer.truncate(offset)
+            # truncate 不移动文件位置，_append 用 tell() 计算偏移量
+            self._writer.seek(offset)
+
+    def flush(self) -> None:
+        """把索引写回磁盘"""
+        if not self._dirty:
+            return
+        self._writer.flush()
+        data = {
+            "version": _INDEX_VERSION,
+            "segment_end": self._writer.tell(),
+            "entries": self._index,
+        }
+        tmp = self._index_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(data, ensure_ascii=False), encoding="utf-8")
+        os.replace(tmp, self._index_path)
+        self._dirty = False
+
+    # ------------------------------------------------------------------
+    # 读写
+    # ------------------------------------------------------------------
+
+    def _view(self, end: int) -> mmap.mmap:
+        """返回覆盖到 end 的只读映射，段文件增长后重新映射"""
+        if self._map is None or len(self._map) < end:
+            if self._map is not None:
+                self._map.close()
+            self._map = mmap.mmap(self._reader.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._map
+
+    def _append(self, key: str, value: bytes, expires_at: float) -> IndexEntry:
+        key_bytes = key.encode("utf-8")
+        offset = self._writer.tell()
+        self._writer.write(_HEADER.pack(_MAGIC, len(key_bytes), len(value), expires_at))
+        self._writer.write(key_bytes)
+        self._writer.write(value)
+        self._writer.flush()
+        self._dirty = True
+        return [offset, self._writer.tell() - offset, expires_at]
+
+    def get_bytes(self, key: str) -> Optional[bytes]:
+        """结果的 JSON 原文，不构造 CallToolResult"""
+        entry = self._index.get(key)
+        if entry is None:
+            return None
+        offset, length, expires_at = entry
+        if expires_at <= time.time():
+            del self._index[key]
+            self._dirty = True
+            return None
+        offset, length = int(offset), int(length)
+        view = self._view(offset + length)
+        value_start = offset + _HEADER.size + len(key.encode("utf-8"))
+        return view[value_start:offset + length]
+
+    def get(self, key: str) -> Optional["CallToolResult"]:
+        value = self.get_bytes(key)
+        if value is None:
+            return None
+        # mcp.types 的 pydantic 模型导入较慢，到需要构造结果时才导入
+        from mcp.types import CallToolResult
+        return CallToolResult.model_validate_json(value)
+
+    def remaining_ttl(self, key: str) -> float:
+        """条目剩余的有效时间（秒），不存在时返回 0"""
+        entry = self._index.get(key)
+        if entry is None:
+            return 0.0
+        return max(0.0, entry[2] - time.time())
+
+    def put(self, key: str, result: "CallToolResult", ttl: float) -> None:
+        if ttl <= 0:
+            return
+        # by_alias 保留 _meta 等带别名的字段；exclude_none 去掉 null，记录也更小
+        value = result.model_dump_json(by_alias=True, exclude_none=True).encode("utf-8")
+        self._index[key] = self._append(key, value, time.time() + ttl)
+        if self._writer.tell() > self.max_bytes:
+            self.compact()
+
+    def _delete(self, key: str) -> None:
+        del self._index[key]
+        self._append(key, b"", 0.0)
+
+    def purge(self, tool: Optional[str] = None) -> int:
+        """删除指定工具（或全部）的条目，返回删除数量"""
+        keys = [k for k in self._index if tool is None or tool_of(k) == tool]
+        for key in keys:
+            self._delete(key)
+        self.flush()
+        return len(keys)
+
+    def entries(self, tool: Optional[str] = None) -> Iterator[Tuple[str, str, int, float]]:
+        """遍历 (工具名称, 参数 JSON, 记录大小, 过期时间)"""
+        for key, (_, length, expires_at) in self._index.items():
+            # 键为 工具\x00[服务器\x00]参数，JSON 中的控制字符都已转义
+            name = tool_of(key)
+            arguments = key.rpartition("\x00")[2]
+            if tool is None or name == tool:
+                yield name, arguments, int(length), expires_at
+
+    # ------------------------------------------------------------------
+    # 压缩
+    # ------------------------------------------------------------------
+
+    def compact(self) -> Tuple[int, int]:
+        """
+        重写段文件，只保留未过期的最新记录
+
+        Returns:
+            (压缩前大小, 压缩后大小)
+        """
+        self._writer.flush()
+        before = self._writer.tell()
+        now = time.time()
+        live = sorted(
+            ((k, e) for k, e in self._index.items() if e[2] > now),
+            key=lambda item: item[1][0],
+        )
+        # 超出容量时按写入顺序淘汰，压缩后保留 3/4 的余量
+        budget = self.max_bytes * 3 // 4
+        total = sum(int(e[1]) for _, e in live)
+        while live and total > budget:
+            total -= int(live.pop(0)[1][1])
+
+        tmp_path = self._segment_path.with_suffix(".compact")
+        new_index: Dict[str, IndexEntry] = {}
+        view = self._view(before) if before else None
+        with open(tmp_path, "wb") as out:
+            for key, (offset, length, expires_at) in live:
+                offset, length = int(offset), int(length)
+                new_index[key] = [out.tell(), length, expires_at]
+                out.write(view[offset:offset + length])
+
+        self._close_files()
+        os.replace(tmp_path, self._segment_path)
+        self._writer = open(self._segment_path, "ab")
+        self._reader = open(self._segment_path, "rb")
+        self._index = new_index
+        self._dirty = True
+        self.flush()
+        return before, self._writer.tell()
+
+    def _close_files(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._writer.close()
+        self._reader.close()
+
+    @property
+    def size_bytes(self) -> int:
+        self._writer.flush()
+        return self._writer.tell()
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def close(self) -> None:
+        self.flush()
+        self._close_files()
+
+    def __enter__(self) -> "DiskCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def main():
+    """查看或清理磁盘缓存"""
+    parser = argparse.ArgumentParser(description="MCP 工具结果磁盘缓存管理")
+    parser.add_argument("--path", type=Path, default=DEFAULT_CACHE_DIR, help="缓存目录")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("stats", help="显示缓存统计")
+    list_parser = sub.add_parser("list", help="列出缓存条目")
+    list_parser.add_argument("--tool", help="只列出指定工具")
+    purge_parser = sub.add_parser("purge", help="删除缓存条目")
+    purge_parser.add_argument("--tool", help="只删除指定工具（默认全部）")
+    sub.add_parser("compact", help="压缩段文件")
+    args = parser.parse_args()
+
+    with DiskCache(args.path) as cache:
+        if args.command == "stats":
+            per_tool: Dict[str, int] = {}
+            for name, _, _, _ in cache.entries():
+                per_tool[name] = per_tool.get(name, 0) + 1
+            print(f"📁 缓存目录: {cache.path}")
+            print(f"   条目数: {len(cache)}")
+            print(f"   段文件大小: {cache.size_bytes} 字节")
+            for name, count in sorted(per_tool.items()):
+                print(f"   • {name}: {count}")
+        elif args.command == "list":
+            now = time.time()
+            for name, arguments, size, expires_at in cache.entries(args.tool):
+                remaining = max(0, int(expires_at - now))
+                print(f"{name}\t{arguments}\t{size} 字节\t剩余 {remaining} 秒")
+        elif args.command == "purge":
+            removed = cache.purge(args.tool)
+            print(f"🗑️  已删除 {removed} 个条目")
+        elif args.command == "compact":
+            before, after = cache.compact()
+            print(f"🧹 压缩完成: {before} → {after} 字节")
+
+
+if __name__ == "__main__":
+    main()
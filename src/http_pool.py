@@ -0,0 +1,360 @@
+"""
+共享 HTTP 连接池
+
+sse_client 和 streamablehttp_client 默认各自创建 httpx 客户端，同一进程中的
+多个会话、多个服务器之间不复用 TCP/TLS 连接。HttpPool 作为
+httpx_client_factory 传给两种传输：
+    - 每个主机一个 httpcore 连接池，所有会话共享，限制连接数和空闲连接保活时间
+    - 安装了 h2 时对 HTTPS 服务器启用 HTTP/2，多个请求复用一个连接
+      （明文 http:// 仍使用 HTTP/1.1）
+    - DNS 解析结果按 TTL 缓存，新建连接时不重复解析
+    - set_host_headers() 为某个主机的所有请求附加请求头（如 emcp-key / emcp-usercode）
+
+SDK 在传输关闭时会关闭工厂返回的 AsyncClient，所以每个会话拿到的是一个
+独立的轻量 AsyncClient，它的传输只转发到共享连接池，关闭时不关闭连接池。
+环境变量中配置了代理（HTTP_PROXY / HTTPS_PROXY / ALL_PROXY）时不使用共享
+连接池，由 httpx 按 trust_env 的规则自行连接代理。
+
+连接绑定在创建它的事件循环上，http_pool() 为每个事件循环返回一个连接池，
+事件循环结束前用 close_http_pool() 关闭（或用 run_with_http_pool() 代替
+asyncio.run()）；DNS 缓存在整个进程中共享。
+
+HTTP/2 是可选依赖：
+    pip install "python-mcp-client-example[http2]"
+"""
+
+import asyncio
+import ipaddress
+import socket
+import time
+import urllib.request
+import weakref
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Awaitable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+import anyio
+import httpcore
+import httpx
+
+try:
+    import h2
+except ImportError:
+    h2 = None
+
+# (scheme, host, port)
+Origin = Tuple[str, str, int]
+T = TypeVar("T")
+
+
+def _require_h2() -> None:
+    if h2 is None:
+        raise ImportError('HTTP/2 需要 h2: pip install "python-mcp-client-example[http2]"')
+
+
+class DnsCache:
+    """按 TTL 缓存 getaddrinfo 的结果"""
+
+    def __init__(self, ttl: float = 300.0):
+        self.ttl = ttl
+        self._entries: Dict[Tuple[str, int], Tuple[float, List[str]]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    async def resolve(self, host: str, port: int) -> List[str]:
+        """返回地址列表；IP 字面量原样返回"""
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+        key = (host, port)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        self.misses += 1
+        infos = await anyio.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        self._entries[key] = (time.monotonic() + self.ttl, addresses)
+        return addresses
+
+    def forget(self, host: str, port: int) -> None:
+        self._entries.pop((host, port), None)
+
+
+# 进程内共享的 DNS 缓存
+_dns_cache = DnsCache()
+
+
+class _CachingBackend(httpcore.AsyncNetworkBackend):
+    """建立 TCP 连接前先查 DNS 缓存；TLS 的 SNI 和证书校验仍使用原主机名"""
+
+    def __init__(self, dns: DnsCache):
+        self.dns = dns
+        self._backend = httpcore.AnyIOBackend()
+
+    async def connect_tcp(self, host: str, port: int, timeout: Optional[float] = None,
+                          local_address: Optional[str] = None, socket_options: Any = None):
+        addresses = await self.dns.resolve(host, port)
+        error: Optional[Exception] = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(address, port, timeout, local_address, socket_options)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+        # 所有地址都连不上：缓存可能过期，下次重新解析
+        self.dns.forget(host, port)
+        raise error
+
+    async def connect_unix_socket(self, path: str, timeout: Optional[float] = None, socket_options: Any = None):
+        return await self._backend.connect_unix_socket(path, timeout, socket_options)
+
+    async def sleep(self, seconds: float) -> None:
+        await self._backend.sleep(seconds)
+
+
+# httpcore 异常对应的 httpx 异常（与 httpx 自带的传输相同）
+_EXCEPTIONS = {
+    httpcore.TimeoutException: httpx.TimeoutException,
+    httpcore.ConnectTimeout: httpx.ConnectTimeout,
+    httpcore.ReadTimeout: httpx.ReadTimeout,
+    httpcore.WriteTimeout: httpx.WriteTimeout,
+    httpcore.PoolTimeout: httpx.PoolTimeout,
+    httpcore.NetworkError: httpx.NetworkError,
+    httpcore.ConnectError: httpx.ConnectError,
+    httpcore.ReadError: httpx.ReadError,
+    httpcore.WriteError: httpx.WriteError,
+    httpcore.ProxyError: httpx.ProxyError,
+    httpcore.UnsupportedProtocol: httpx.UnsupportedProtocol,
+    httpcore.ProtocolError: httpx.ProtocolError,
+    httpcore.LocalProtocolError: httpx.LocalProtocolError,
+    httpcore.RemoteProtocolError: httpx.RemoteProtocolError,
+}
+
+
+@contextmanager
+def _map_exceptions() -> Iterator[None]:
+    try:
+        yield
+    except Exception as e:
+        # 取最具体的异常类型，例如 ReadTimeout 而不是 TimeoutException
+        mapped = None
+        for source, target in _EXCEPTIONS.items():
+            if isinstance(e, source) and (mapped is None or issubclass(target, mapped)):
+                mapped = target
+        if mapped is None:
+            raise
+        raise mapped(str(e)) from e
+
+
+class _ResponseStream(httpx.AsyncByteStream):
+    def __init__(self, stream: Any):
+        self._stream = stream
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        with _map_exceptions():
+            async for part in self._stream:
+                yield part
+
+    async def aclose(self) -> None:
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+
+class _PoolTransport(httpx.AsyncBaseTransport):
+    """
+    使用 DNS 缓存的 httpcore 连接池
+
+    httpx.AsyncHTTPTransport 不接受 network_backend 参数，这里直接持有
+    httpcore.AsyncConnectionPool，请求和响应的转换与 httpx 自带的传输相同。
+    """
+
+    def __init__(self, pool: httpcore.AsyncConnectionPool):
+        self.pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path,
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions,
+        )
+        with _map_exceptions():
+            response = await self.pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=_ResponseStream(response.stream),
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.pool.aclose()
+
+
+class _SharedTransport(httpx.AsyncBaseTransport):
+    """按请求的主机转发到 HttpPool 中的连接池；aclose() 不关闭连接池"""
+
+    def __init__(self, pool: "HttpPool"):
+        self.pool = pool
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        origin = (request.url.scheme, request.url.host, request.url.port or (443 if request.url.scheme == "https" else 80))
+        for key, value in self.pool.host_headers.get(request.url.host, {}).items():
+            request.headers.setdefault(key, value)
+        return await self.pool.transport(origin).handle_async_request(request)
+
+    async def aclose(self) -> None:
+        pass
+
+
+class HttpPool:
+    """
+    按主机划分的共享连接池
+
+    用法:
+        pool = http_pool()
+        pool.set_host_headers("fda.sitmcp.kaleido.guru", {"emcp-key": "...", "emcp-usercode": "..."})
+        async with streamablehttp_client(url, httpx_client_factory=pool.client) as (...):
+            ...
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = 100,
+        max_keepalive_connections: Optional[int] = 20,
+        keepalive_expiry: float = 30.0,
+        http2: Optional[bool] = None,
+        dns: Optional[DnsCache] = None,
+    ):
+        if http2:
+            _require_h2()
+        self.http2 = h2 is not None if http2 is None else http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.dns = dns if dns is not None else _dns_cache
+        self.host_headers: Dict[str, Dict[str, str]] = {}
+        self._transports: Dict[Origin, _PoolTransport] = {}
+        self._ssl_context = httpx.create_ssl_context()
+        self.clients_created = 0
+
+    def set_host_headers(self, host: str, headers: Dict[str, str]) -> None:
+        """为发往 host 的所有请求附加请求头（请求自带的同名头优先）"""
+        self.host_headers[host] = dict(headers)
+
+    def transport(self, origin: Origin) -> _PoolTransport:
+        transport = self._transports.get(origin)
+        if transport is None:
+            transport = self._transports[origin] = _PoolTransport(httpcore.AsyncConnectionPool(
+                ssl_context=self._ssl_context,
+                max_connections=self.limits.max_connections,
+                max_keepalive_connections=self.limits.max_keepalive_connections,
+                keepalive_expiry=self.limits.keepalive_expiry,
+                http1=True,
+                http2=self.http2,
+                network_backend=_CachingBackend(self.dns),
+            ))
+        return transport
+
+    def client(
+        self,
+        headers: Optional[Dict[str, str]] = None,
+        timeout: Optional[httpx.Timeout] = None,
+        auth: Optional[httpx.Auth] = None,
+    ) -> httpx.AsyncClient:
+        """httpx_client_factory：与 mcp.shared._httpx_utils.create_mcp_http_client 参数相同"""
+        self.clients_created += 1
+        # 传入 transport 时 httpx 不读取代理环境变量，配置了代理就交给 httpx 自己的传输
+        transport = None if _environment_proxies() else _SharedTransport(self)
+        return httpx.AsyncClient(
+            headers=headers,
+            timeout=timeout if timeout is not None else httpx.Timeout(30.0),
+            auth=auth,
+            follow_redirects=True,
+            transport=transport,
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        hosts = {}
+        for (scheme, host, port), transport in self._transports.items():
+            connections = transport.pool.connections
+            hosts[f"{scheme}://{host}:{port}"] = {
+                "connections": len(connections),
+                "idle": sum(1 for connection in connections if connection.is_idle()),
+                "http2": sum(1 for connection in connections if "HTTP/2" in connection.info()),
+            }
+        return {
+            "http2_enabled": self.http2,
+            "clients_created": self.clients_created,
+            "dns_hits": self.dns.hits,
+            "dns_misses": self.dns.misses,
+            "hosts": hosts,
+        }
+
+    async def aclose(self) -> None:
+        transports, self._transports = self._transports, {}
+        for transport in transports.values():
+            await transport.aclose()
+
+
+def _environment_proxies() -> bool:
+    proxies = urllib.request.getproxies()
+    return any(proxies.get(scheme) for scheme in ("http", "https", "all"))
+
+
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, HttpPool]" = weakref.WeakKeyDictionary()
+_host_headers: Dict[str, Dict[str, str]] = {}
+
+
+def http_pool() -> HttpPool:
+    """当前事件循环的共享连接池（首次调用时创建）"""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = HttpPool()
+        pool.host_headers.update(_host_headers)
+    return pool
+
+
+async def close_http_pool() -> None:
+    """关闭当前事件循环的共享连接池（没有创建过时什么也不做）"""
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.aclose()
+
+
+def run_with_http_pool(main: Awaitable[T]) -> T:
+    """asyncio.run(main)，事件循环结束前关闭它的共享连接池"""
+
+    async def run() -> T:
+        try:
+            return await main
+        finally:
+            await close_http_pool()
+
+    return asyncio.run(run())
+
+
+def set_host_headers(host: str, headers: Dict[str, str]) -> None:
+    """为所有事件循环（包括之后创建的）的共享连接池设置主机请求头"""
+    _host_headers[host] = dict(headers)
+    for pool in list(_pools.values()):
+        pool.set_host_headers(host, headers)
+
+
+def shared_client_factory(
+    headers: Optional[Dict[str, str]] = None,
+    timeout: Optional[httpx.Timeout] = None,
+    auth: Optional[httpx.Auth] = None,
+) -> httpx.AsyncClient:
+    """作为 httpx_client_factory 传给 sse_client / streamablehttp_client"""
+    return http_pool().client(headers=headers, timeout=timeout, auth=auth)
@@ -0,0 +1,395 @@
+"""
+会话调用埋点
+
+InstrumentedSession 包装 ClientSession，为 initialize、list_*、call_tool
+等方法记录：
+    - 每个方法的延迟直方图
+    - 请求和响应的大小（字节）
+    - 按异常类型统计的错误数
+    - 当前在途请求数
+并把每次调用作为 OTLP 结构的 span 交给可插拔的 sink。
+Metrics.timer() 还可以测量 JSON 解析等客户端阶段，用来区分
+服务器、传输和解析各自的耗时。LoopLagMonitor 记录事件循环延迟
+（定时器实际触发比预定晚多少），用来发现阻塞事件循环的 CPU 密集操作。
+
+导出方式：
+    - Metrics.summary(): 内存中的汇总字典
+    - PrometheusExporter: Prometheus 文本格式，可选启动 /metrics 端点
+    - SpanBuffer: 保存最近的 OTLP span 字典
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .result_cache import result_size
+
+LATENCY_BUCKETS: Tuple[float, ...] = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0,
+)
+SIZE_BUCKETS: Tuple[float, ...] = tuple(float(256 * 4 ** i) for i in range(10))
+LAG_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+)
+
+INSTRUMENTED_METHODS = (
+    "initialize",
+    "send_ping",
+    "list_tools",
+    "list_resources",
+    "list_resource_templates",
+    "list_prompts",
+    "call_tool",
+    "read_resource",
+    "get_prompt",
+)
+
+Span = Dict[str, Any]
+SpanSink = Callable[[Span], None]
+
+
+class Histogram:
+    """固定桶直方图（与 Prometheus 的 histogram 语义一致）"""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> Optional[float]:
+        """按桶上界估算分位数"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return float("inf")
+
+
+class Metrics:
+    """按方法名汇总的指标"""
+
+    def __init__(self):
+        self.latency: Dict[str, Histogram] = defaultdict(lambda: Histogram(LATENCY_BUCKETS))
+        self.request_bytes: Dict[str, Histogram] = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.response_bytes: Dict[str, Histogram] = defaultdict(lambda: Histogram(SIZE_BUCKETS))
+        self.errors: Dict[Tuple[str, str], int] = defaultdict(int)
+        self.in_flight: Dict[str, int] = defaultdict(int)
+        self.loop_lag = Histogram(LAG_BUCKETS)
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        """测量任意代码段（例如 JSON 解析）的耗时"""
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception as e:
+            self.errors[(name, type(e).__name__)] += 1
+            raise
+        finally:
+            self.latency[name].observe(time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """每个方法的调用数、延迟分位数、平均大小、错误数和在途数"""
+        names = set(self.latency) | set(self.in_flight)
+        report: Dict[str, Dict[str, Any]] = {}
+        for name in sorted(names):
+            latency = self.latency.get(name) or Histogram(LATENCY_BUCKETS)
+            requests = self.request_bytes.get(name)
+            responses = self.response_bytes.get(name)
+            report[name] = {
+                "count": latency.count,
+                "mean_s": latency.sum / latency.count if latency.count else None,
+                "p50_s": latency.quantile(0.50),
+                "p95_s": latency.quantile(0.95),
+                "p99_s": latency.quantile(0.99),
+                "request_bytes_mean": requests.sum / requests.count if requests and requests.count else None,
+                "response_bytes_mean": responses.sum / responses.count if responses and responses.count else None,
+                "errors": {exc: n for (method, exc), n in self.errors.items() if method == name},
+                "in_flight": self.in_flight.get(name, 0),
+            }
+        return report
+
+    def loop_lag_summary(self) -> Dict[str, Any]:
+        """事件循环延迟的采样数、平均值和分位数"""
+        lag = self.loop_lag
+        return {
+            "samples": lag.count,
+            "mean_s": lag.sum / lag.count if lag.count else None,
+            "p50_s": lag.quantile(0.50),
+            "p99_s": lag.quantile(0.99),
+        }
+
+
+class LoopLagMonitor:
+    """
+    事件循环延迟监控
+
+    每 interval 秒调度一次定时器，把实际唤醒时间比预定时间晚的部分记入
+    metrics.loop_lag。延迟持续偏高说明有 CPU 密集的操作（例如解析大结果）
+    占住了事件循环，其他会话的 I/O 也被推迟。
+
+    用法:
+        async with LoopLagMonitor(metrics):
+            ...
+        print(metrics.loop_lag_summary())
+    """
+
+    def __init__(self, metrics: Optional[Metrics] = None, interval: float = 0.05):
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.interval = interval
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.metrics.loop_lag.observe(lag)
+            self.max_lag = max(self.max_lag, lag)
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    async def __aenter__(self) -> "LoopLagMonitor":
+        self.start()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.stop()
+
+
+def _payload_size(value: Any) -> int:
+    if value is None:
+        return 0
+    if hasattr(value, "content") and hasattr(value, "isError"):
+        return result_size(value)
+    if hasattr(value, "model_dump_json"):
+        return len(value.model_dump_json())
+    return len(json.dumps(value, ensure_ascii=False, default=str))
+
+
+def _attribute(key: str, value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class InstrumentedSession:
+    """
+    带埋点的会话包装
+
+    用法:
+        metrics = Metrics()
+        session = InstrumentedSession(raw_session, metrics, sinks=[SpanBuffer()])
+        await session.initialize()
+        await session.call_tool(...)
+        print(metrics.summary())
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        metrics: Optional[Metrics] = None,
+        sinks: Sequence[SpanSink] = (),
+        attributes: Optional[Dict[str, Any]] = None,
+    ):
+        self.session = session
+        self.metrics = metrics if metrics is not None else Metrics()
+        self.sinks = list(sinks)
+        self.attributes = dict(attributes or {})
+        self.trace_id = os.urandom(16).hex()
+
+    def __getattr__(self, name: str) -> Any:
+        target = getattr(self.session, name)
+        if name not in INSTRUMENTED_METHODS:
+            return target
+
+        async def instrumented(*args: Any, **kwargs: Any) -> Any:
+            return await self._observe(name, target, args, kwargs)
+
+        return instrumented
+
+    async def _observe(self, method: str, target: Callable, args: tuple, kwargs: dict) -> Any:
+        arguments = kwargs.get("arguments", args[1] if method == "call_tool" and len(args) > 1 else None)
+        request_size = _payload_size(arguments)
+        self.metrics.request_bytes[method].observe(request_size)
+        self.metrics.in_flight[method] += 1
+        start_ns = time.time_ns()
+        start = time.perf_counter()
+        error: Optional[BaseException] = None
+        result: Any = None
+        try:
+            result = await target(*args, **kwargs)
+            return result
+        except BaseException as e:
+            error = e
+            self.metrics.errors[(method, type(e).__name__)] += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.in_flight[method] -= 1
+            self.metrics.latency[method].observe(elapsed)
+            response_size = _payload_size(result) if error is None else 0
+            if error is None:
+                self.metrics.response_bytes[method].observe(response_size)
+            if self.sinks:
+                self._emit(method, args, kwargs, start_ns, request_size, response_size, result, error)
+
+    def _emit(self, method: str, args: tuple, kwargs: dict, start_ns: int,
+              request_size: int, response_size: int, result: Any,
+              error: Optional[BaseException]) -> None:
+        attributes = dict(self.attributes)
+        attributes["rpc.system"] = "mcp"
+        attributes["rpc.method"] = method
+        attributes["mcp.request.bytes"] = request_size
+        attributes["mcp.response.bytes"] = response_size
+        if method == "call_tool":
+            attributes["mcp.tool.name"] = kwargs.get("name", args[0] if args else "")
+            if result is not None:
+                attributes["mcp.tool.is_error"] = bool(result.isError)
+        status = {"code": "STATUS_CODE_OK"}
+        if error is not None:
+            attributes["exception.type"] = type(error).__name__
+            status = {"code": "STATUS_CODE_ERROR", "message": str(error)}
+        span = {
+            "traceId": self.trace_id,
+            "spanId": os.urandom(8).hex(),
+            "name": f"mcp.{method}",
+            "kind": "SPAN_KIND_CLIENT",
+            "startTimeUnixNano": str(start_ns),
+            "endTimeUnixNano": str(time.time_ns()),
+            "attributes": [_attribute(key, value) for key, value in attributes.items()],
+            "status": status,
+        }
+        for sink in self.sinks:
+            sink(span)
+
+
+class SpanBuffer:
+    """保存最近 maxlen 个 span 的 sink"""
+
+    def __init__(self, maxlen: int = 10000):
+        self.spans: Deque[Span] = deque(maxlen=maxlen)
+
+    def __call__(self, span: Span) -> None:
+        self.spans.append(span)
+
+    def export(self, service_name: str = "python-mcp-client") -> Dict[str, Any]:
+        """OTLP/JSON 的 ExportTraceServiceRequest 结构"""
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [_attribute("service.name", service_name)]},
+                "scopeSpans": [{
+                    "scope": {"name": "src.instrumentation"},
+                    "spans": list(self.spans),
+                }],
+            }]
+        }
+
+
+class PrometheusExporter:
+    """把 Metrics 渲染成 Prometheus 文本格式"""
+
+    def __init__(self, metrics: Metrics, prefix: str = "mcp_client"):
+        self.metrics = metrics
+        self.prefix = prefix
+        self._server: Optional[asyncio.base_events.Server] = None
+
+    def _histogram(self, name: str, help_text: str, histograms: Dict[str, Histogram]) -> List[str]:
+        metric = f"{self.prefix}_{name}"
+        lines = [f"# HELP {metric} {help_text}", f"# TYPE {metric} histogram"]
+        for method, hist in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{method="{method}",le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{method="{method}",le="+Inf"}} {hist.count}')
+            lines.append(f'{metric}_sum{{method="{method}"}} {hist.sum}')
+            lines.append(f'{metric}_count{{method="{method}"}} {hist.count}')
+        return lines
+
+    def render(self) -> str:
+        m = self.metrics
+        lines = self._histogram("latency_seconds", "MCP 方法调用延迟", m.latency)
+        lines += self._histogram("request_bytes", "请求参数大小", m.request_bytes)
+        lines += self._histogram("response_bytes", "响应内容大小", m.response_bytes)
+        errors = f"{self.prefix}_errors_total"
+        lines += [f"# HELP {errors} 按异常类型统计的错误数", f"# TYPE {errors} counter"]
+        for (method, exc), count in sorted(m.errors.items()):
+            lines.append(f'{errors}{{method="{method}",exception="{exc}"}} {count}')
+        in_flight = f"{self.prefix}_in_flight"
+        lines += [f"# HELP {in_flight} 当前在途请求数", f"# TYPE {in_flight} gauge"]
+        for method, count in sorted(m.in_flight.items()):
+            lines.append(f'{in_flight}{{method="{method}"}} {count}')
+        if m.loop_lag.count:
+            lag = f"{self.prefix}_event_loop_lag_seconds"
+            lines += [f"# HELP {lag} 事件循环定时器的唤醒延迟", f"# TYPE {lag} histogram"]
+            cumulative = 0
+            for bound, count in zip(m.loop_lag.buckets, m.loop_lag.counts):
+                cumulative += count
+                lines.append(f'{lag}_bucket{{le="{bound:g}"}} {cumulative}')
+            lines.append(f'{lag}_bucket{{le="+Inf"}} {m.loop_lag.count}')
+            lines.append(f"{lag}_sum {m.loop_lag.sum}")
+            lines.append(f"{lag}_count {m.loop_lag.count}")
+        return "\n".join(lines) + "\n"
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b"\r\n", b"\n", b""):
+                pass
+            parts = request_line.decode("latin-1").split()
+            if len(parts) >= 2 and parts[1].split("?")[0] == "/metrics":
+                body = self.render().encode("utf-8")
+                status = "200 OK"
+            else:
+                body = b"not found\n"
+                status = "404 Not Found"
+            writer.write(
+                f"HTTP/1.1 {status}\r\n"
+                "Content-Type: text/plain; version=0.0.4; charset=utf-8\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n\r\n".encode("latin-1") + body
+            )
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 9464) -> None:
+        """在 http://host:port/metrics 提供指标"""
+        self._server = await asyncio.start_server(self._handle, host, port)
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
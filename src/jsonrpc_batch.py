@@ -0,0 +1,265 @@
+"""
+JSON-RPC 批量请求
+
+把短时间窗口内（或攒够 max_batch 个）发出的 tools/call 请求合并成
+一个 JSON-RPC 批量 POST，每个调用方仍然拿到自己的结果。扇出大量小请求时，
+HTTP 请求数减少一个数量级。
+
+批量请求只在 StreamableHTTP 上发送：ClientSession 每条消息单独 POST，
+这里用独立的 httpx 客户端带上同一个 mcp-session-id 直接发送批量 POST。
+注意：mcp 1.10 起 ClientSession 协商 2025-06-18 或更新的协议版本，而这些版本的规范
+移除了批量请求，所以只有协商出更早版本（服务器只支持旧协议）时才会真正合并；
+否则 BatchingSession 只是透传，for_connection 会给出 RuntimeWarning。
+以下情况退回 ClientSession 逐个发送：
+    - SSE 传输，或协商的协议版本不支持批量（2025-06-18 起规范移除了批量请求）
+    - 服务器拒绝批量 POST（4xx 或无法解析的响应），之后不再尝试
+    - 批量响应中缺少某个 id 的结果，只对缺少的请求单独重发
+
+用法:
+    async with BatchingSession.for_connection(conn, window=0.01, max_batch=16) as session:
+        results = await asyncio.gather(*(session.call_tool(name, args) for name, args in calls))
+"""
+
+import asyncio
+import itertools
+import json
+import warnings
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import httpx
+from mcp.shared.exceptions import McpError
+from mcp.types import CallToolResult, ErrorData
+
+from .http_pool import http_pool
+from .transports import STREAMABLE_HTTP, ServerConfig, request_headers
+
+# 第一个不再支持 JSON-RPC 批量请求的协议版本
+BATCHLESS_PROTOCOL_VERSION = "2025-06-18"
+
+
+def supports_batching(config: ServerConfig, protocol_version: Optional[str]) -> bool:
+    """按传输类型和协商的协议版本判断能否发送批量请求"""
+    if config.transport != STREAMABLE_HTTP:
+        return False
+    return protocol_version is None or protocol_version < BATCHLESS_PROTOCOL_VERSION
+
+
+def parse_batch_response(response: httpx.Response) -> List[Dict[str, Any]]:
+    """
+    解析批量 POST 的响应
+
+    服务器可以返回 JSON 数组，也可以返回 SSE 流（每个事件一条消息或一个数组）。
+    """
+    content_type = response.headers.get("content-type", "")
+    if content_type.startswith("text/event-stream"):
+        messages: List[Any] = []
+        data: List[str] = []
+        for line in response.text.splitlines() + [""]:
+            if line.startswith("data:"):
+                data.append(line[5:].lstrip())
+            elif not line and data:
+                messages.append(json.loads("\n".join(data)))
+                data = []
+    else:
+        messages = [response.json()]
+    flat: List[Dict[str, Any]] = []
+    for message in messages:
+        flat.extend(message if isinstance(message, list) else [message])
+    return flat
+
+
+@dataclass
+class BatchStats:
+    """批量请求计数器"""
+
+    batches: int = 0
+    batched_calls: int = 0
+    single_calls: int = 0
+    fallback_calls: int = 0
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.batched_calls / self.batches if self.batches else 0.0
+
+
+class BatchingSession:
+    """
+    合并 tools/call 请求的会话包装
+
+    window 秒内或攒够 max_batch 个请求就发送一批；只有一个请求时直接由
+    ClientSession 发送。call_tool 带额外参数（如 read_timeout_seconds）时不参与合并。
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        config: ServerConfig,
+        get_session_id: Callable[[], Optional[str]],
+        protocol_version: Optional[str] = None,
+        window: float = 0.005,
+        max_batch: int = 16,
+    ):
+        if max_batch < 1:
+            raise ValueError("max_batch 必须大于 0")
+        self.session = session
+        self.config = config
+        self.get_session_id = get_session_id
+        self.protocol_version = protocol_version
+        self.window = window
+        self.max_batch = max_batch
+        self.supported = supports_batching(config, protocol_version)
+        self.stats = BatchStats()
+        self._pending: List[tuple] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self._ids = itertools.count(1)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @classmethod
+    def for_connection(cls, conn: Any, **kwargs: Any) -> "BatchingSession":
+        """
+        包装 PooledSession（已完成 initialize）
+
+        协商的协议版本不支持批量时（当前 SDK 的默认情况）所有调用逐个发送，并给出警告。
+        """
+        version = conn.init_result.protocolVersion if conn.init_result is not None else None
+        batching = cls(conn.session, conn.config, conn.get_session_id, version, **kwargs)
+        if not batching.supported:
+            warnings.warn(
+                f"{conn.config.url} 协商的协议版本 {version} 或传输类型 {conn.config.transport} "
+                "不支持 JSON-RPC 批量请求，调用将逐个发送",
+                RuntimeWarning,
+                stacklevel=2,
+            )
+        return batching
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                        **kwargs: Any) -> CallToolResult:
+        if kwargs or not self.supported:
+            self.stats.single_calls += 1
+            return await self.session.call_tool(name, arguments=arguments, **kwargs)
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((name, arguments, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        pending, self._pending = self._pending, []
+        if not pending:
+            return
+        task = asyncio.ensure_future(self._send(pending))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, pending: List[tuple]) -> None:
+        try:
+            await self._send_batch(pending)
+        except Exception as e:
+            # 兜底（例如批量响应中的消息格式不对）：没有结果的调用方都拿到异常
+            for _, _, future in pending:
+                if not future.done():
+                    future.set_exception(e)
+        except BaseException:
+            for _, _, future in pending:
+                future.cancel()
+            raise
+
+    async def _send_batch(self, pending: List[tuple]) -> None:
+        if len(pending) == 1 or not self.supported:
+            await self._send_individually(pending)
+            return
+        requests: Dict[str, tuple] = {}
+        for call in pending:
+            requests[f"batch-{next(self._ids)}"] = call
+        try:
+            messages = await self._post(requests)
+        except httpx.HTTPStatusError as e:
+            # 4xx: 服务器不接受批量请求，之后逐个发送；5xx 只影响这一批
+            if e.response.status_code < 500:
+                self.supported = False
+            messages = []
+        except ValueError:
+            self.supported = False
+            messages = []
+        except Exception:
+            # 网络错误或其他意外错误（例如参数无法编码成 JSON）：这一批逐个发送，
+            # 由 ClientSession 把错误交给各自的调用方，不能让等待者一直挂起
+            messages = []
+        else:
+            self.stats.batches += 1
+            self.stats.batched_calls += len(requests)
+            if not any(message.get("id") in requests for message in messages):
+                # 例如返回一个 id 为 null 的错误对象：同样视为不支持批量
+                self.supported = False
+        for message in messages:
+            call = requests.pop(message.get("id"), None)
+            if call is None or call[2].done():
+                continue
+            future = call[2]
+            if "error" in message:
+                future.set_exception(McpError(ErrorData.model_validate(message["error"])))
+            else:
+                try:
+                    future.set_result(CallToolResult.model_validate(message.get("result")))
+                except Exception as e:
+                    future.set_exception(e)
+        if requests:
+            self.stats.fallback_calls += len(requests)
+            await self._send_individually(list(requests.values()))
+
+    async def _send_individually(self, pending: List[tuple]) -> None:
+        async def run(name: str, arguments: Optional[Dict[str, Any]], future: asyncio.Future) -> None:
+            try:
+                result = await self.session.call_tool(name, arguments=arguments)
+            except Exception as e:
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                if not future.done():
+                    future.set_result(result)
+
+        self.stats.single_calls += len(pending)
+        await asyncio.gather(*(run(*call) for call in pending))
+
+    async def _post(self, requests: Dict[str, tuple]) -> List[Dict[str, Any]]:
+        if self._client is None:
+            self._client = http_pool().client(timeout=httpx.Timeout(self.config.timeout,
+                                                                     read=self.config.sse_read_timeout))
+        headers = request_headers(self.config, self.get_session_id(), self.protocol_version)
+        body = [
+            {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "method": "tools/call",
+                "params": {"name": name, "arguments": arguments or {}},
+            }
+            for request_id, (name, arguments, _) in requests.items()
+        ]
+        response = await self._client.post(self.config.url, json=body, headers=headers)
+        response.raise_for_status()
+        return parse_batch_response(response)
+
+    async def aclose(self) -> None:
+        """发送剩余请求并关闭 httpx 客户端"""
+        self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "BatchingSession":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
@@ -0,0 +1,294 @@
+"""
+按路径惰性解析工具结果 JSON
+
+FDA 标签结果经常有几 MB，但调用方通常只需要 results 中的少数字段。
+这里沿着路径逐层扫描 JSON 文本：
+    - 路径上的对象逐个成员扫描，不需要的成员跳过：字符串和字符串数组用
+      str.find 找结束的引号，不构造 Python 对象；其他值交给 C 实现的
+      raw_decode 解码后丢弃
+    - "*" 匹配的子值（例如 results 中的每条记录）用 raw_decode 整个解码，
+      在内存中匹配剩余路径后丢弃。逐个成员扫描每条记录的 Python 开销比
+      C 解码还大，所以 CPU 与 json.loads 相当，但峰值内存只有一条记录
+    - 路径只含具体的键和下标时，全部找到后立即停止，不再扫描剩余部分；
+      results 数组中的记录可以逐条产出，取到第一条即可停止
+跳过的字符串不检查控制字符等细节，不做完整的 JSON 校验。
+
+skip_ws、skip_value、iter_members 是 records 共用的扫描函数。
+python -m benchmarks.harness 的 parsing 一项对比 json.loads 的耗时和峰值内存。
+
+路径语法：用 "." 分隔，"*" 匹配任意键或数组下标，数字匹配数组下标，
+例如 "results.*.openfda.brand_name"。
+"""
+
+import json
+import re
+from json.decoder import scanstring
+from typing import Any, Dict, Generator, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from mcp.types import CallToolResult
+
+Source = Union[CallToolResult, str, bytes, bytearray, memoryview]
+
+_WS = re.compile(r"[ \t\n\r]*")
+# 成员键（不含转义时）连同冒号和空白
+_KEY = re.compile(r'"([^"\\]*)"[ \t\n\r]*:[ \t\n\r]*')
+# 成员值之后的分隔符连同空白
+_SEPARATOR = re.compile(r"[ \t\n\r]*([,}])[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+# (路径序号, 剩余路径段)
+_Paths = List[Tuple[int, Sequence[str]]]
+
+
+def result_text(source: Source) -> str:
+    """取出结果的 JSON 文本（CallToolResult 取第一个文本内容）"""
+    if isinstance(source, CallToolResult):
+        for content in source.content:
+            text = getattr(content, "text", None)
+            if text is not None:
+                return text
+        raise ValueError("结果中没有文本内容")
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source).decode("utf-8")
+    return source
+
+
+def _split(path: str) -> Tuple[str, ...]:
+    return tuple(path.split(".")) if path else ()
+
+
+def skip_ws(text: str, i: int) -> int:
+    return _WS.match(text, i).end()
+
+
+def string_body_end(text: str, i: int) -> int:
+    """
+    i 位于字符串内容中（开始的引号之后），返回第一个未转义的引号的位置；
+    text 中字符串没有结束时返回 len(text)（content_stream 按块扫描时使用）
+    """
+    j = text.find('"', i)
+    while j > i and text[j - 1] == "\\":
+        # 前面有奇数个反斜杠时这个引号是转义的
+        k = j - 1
+        while k > i and text[k - 1] == "\\":
+            k -= 1
+        if (j - k) % 2 == 0:
+            break
+        j = text.find('"', j + 1)
+    return len(text) if j < 0 else j
+
+
+def _string_end(text: str, i: int) -> int:
+    """text[i] 是开始的引号，返回结束的引号之后的位置"""
+    j = string_body_end(text, i + 1)
+    if j == len(text):
+        raise ValueError(f"位置 {i} 处的字符串未结束")
+    return j + 1
+
+
+def skip_value(text: str, i: int) -> int:
+    """返回 text[i] 处的值之后的位置；字符串和字符串数组只扫描不解码"""
+    char = text[i:i + 1]
+    if char == '"':
+        return _string_end(text, i)
+    if char == "[":
+        j = skip_ws(text, i + 1)
+        while text[j:j + 1] == '"':
+            j = skip_ws(text, _string_end(text, j))
+            char = text[j:j + 1]
+            if char == "]":
+                return j + 1
+            if char != ",":
+                break
+            j = skip_ws(text, j + 1)
+    # 其他值（含混合类型的数组）在 C 中解码比 Python 逐字符扫描快
+    return _decoder.raw_decode(text, i)[1]
+
+
+def iter_members(text: str, i: int) -> Generator[Tuple[str, int], Optional[int], int]:
+    """
+    逐个产出对象成员 (键, 值的位置)
+
+    调用方通过 send() 传回值之后的位置；没有传回时跳过该值。
+    生成器的返回值（StopIteration.value）是对象之后的位置。
+    """
+    if text[i:i + 1] != "{":
+        raise ValueError(f"位置 {i} 处应为对象")
+    i = skip_ws(text, i + 1)
+    if text[i:i + 1] == "}":
+        return i + 1
+    while True:
+        match = _KEY.match(text, i)
+        if match is not None:
+            key, start = match.group(1), match.end()
+        else:
+            if text[i:i + 1] != '"':
+                raise ValueError(f"位置 {i} 处应为对象键")
+            key, i = scanstring(text, i + 1)
+            i = skip_ws(text, i)
+            if text[i:i + 1] != ":":
+                raise ValueError(f"位置 {i} 处应为 ':'")
+            start = skip_ws(text, i + 1)
+        end = yield key, start
+        if end is None:
+            end = skip_value(text, start)
+        match = _SEPARATOR.match(text, end)
+        if match is None:
+            raise ValueError(f"位置 {end} 处应为 ',' 或 '}}'")
+        if match.group(1) == "}":
+            return match.end(1)
+        i = match.end()
+
+
+def _matches(segment: str, key: Union[str, int]) -> bool:
+    return segment == "*" or segment == str(key)
+
+
+def _resolve(value: Any, segments: Sequence[str]) -> Iterator[Any]:
+    """在已解析的值上匹配剩余路径"""
+    if not segments:
+        yield value
+        return
+    head, rest = segments[0], segments[1:]
+    if head != "*":
+        # 具体的键直接查找，不遍历所有成员
+        if isinstance(value, dict):
+            if head in value:
+                yield from _resolve(value[head], rest)
+        elif isinstance(value, list) and head.isdigit() and str(int(head)) == head and int(head) < len(value):
+            yield from _resolve(value[int(head)], rest)
+        return
+    if isinstance(value, dict):
+        items: Iterable[Tuple[Union[str, int], Any]] = value.items()
+    elif isinstance(value, list):
+        items = enumerate(value)
+    else:
+        return
+    for _, child in items:
+        yield from _resolve(child, rest)
+
+
+def _walk_child(
+    text: str, i: int, key: Union[str, int], paths: _Paths
+) -> Generator[Tuple[int, Any], None, Optional[int]]:
+    """处理容器中的一个子值，返回子值之后的位置（提前停止时为 None）"""
+    matched = []
+    decode = False
+    for pid, rest in paths:
+        if _matches(rest[0], key):
+            matched.append((pid, rest[1:]))
+            # 需要完整的值，或者 "*" 匹配了大量子值（例如每条记录）时整个解码
+            decode = decode or len(rest) == 1 or rest[0] == "*"
+    i = skip_ws(text, i)
+    if not matched:
+        return skip_value(text, i)
+    if decode:
+        value, end = _decoder.raw_decode(text, i)
+        for pid, rest in matched:
+            for found in _resolve(value, rest):
+                yield pid, found
+        return end
+    return (yield from _walk(text, i, matched))
+
+
+def _walk(text: str, i: int, paths: _Paths) -> Generator[Tuple[int, Any], None, Optional[int]]:
+    """
+    扫描 text[i:] 处的值，产出 (路径序号, 命中的值)，返回值之后的位置
+
+    路径都是具体的键或下标时，全部处理完就停止并返回 None；
+    需要继续扫描后面兄弟节点的调用方自己跳过这个值。
+    """
+    i = skip_ws(text, i)
+    heads = {rest[0] for _, rest in paths}
+    char = text[i:i + 1]
+    if char == "{":
+        wanted = None if "*" in heads else heads
+        members = iter_members(text, i)
+        try:
+            key, at = next(members)
+            while True:
+                end = yield from _walk_child(text, at, key, paths)
+                if wanted is not None:
+                    wanted.discard(key)
+                    if not wanted:
+                        members.close()
+                        return None
+                if end is None:
+                    end = skip_value(text, at)
+                key, at = members.send(end)
+        except StopIteration as stop:
+            return stop.value
+    if char == "[":
+        last = None if "*" in heads else max((int(head) for head in heads if head.isdigit()), default=-1)
+        if last == -1:
+            return None
+        i = skip_ws(text, i + 1)
+        if text[i:i + 1] == "]":
+            return i + 1
+        # 常见情况（results.*...）：每个元素都整个解码，省去逐个元素的匹配
+        every = [(pid, rest[1:]) for pid, rest in paths] if heads == {"*"} else None
+        index = 0
+        while True:
+            if every is not None:
+                value, end = _decoder.raw_decode(text, i)
+                for pid, rest in every:
+                    for found in _resolve(value, rest):
+                        yield pid, found
+            else:
+                end = yield from _walk_child(text, i, index, paths)
+            if last is not None and index >= last:
+                return None
+            if end is None:
+                end = skip_value(text, i)
+            i = skip_ws(text, end)
+            char = text[i:i + 1]
+            if char == "]":
+                return i + 1
+            if char != ",":
+                raise ValueError(f"位置 {i} 处应为 ',' 或 ']'")
+            i = skip_ws(text, i + 1)
+            index += 1
+    # 标量值无法继续沿路径深入
+    return skip_value(text, i)
+
+
+def iter_path(source: Source, path: str) -> Iterator[Any]:
+    """按文档顺序逐个产出匹配 path 的值"""
+    text = result_text(source)
+    segments = _split(path)
+    if not segments:
+        yield json.loads(text)
+        return
+    for _, value in _walk(text, 0, [(0, segments)]):
+        yield value
+
+
+def extract(source: Source, paths: Sequence[str]) -> Dict[str, List[Any]]:
+    """
+    一次扫描取出多个路径的值
+
+    Returns:
+        {路径: 按文档顺序排列的匹配值列表}
+    """
+    text = result_text(source)
+    found: Dict[str, List[Any]] = {path: [] for path in paths}
+    whole = [path for path in paths if not _split(path)]
+    if whole:
+        value = json.loads(text)
+        for path in whole:
+            found[path].append(value)
+    indexed = [(pid, _split(path)) for pid, path in enumerate(paths) if _split(path)]
+    if indexed:
+        for pid, value in _walk(text, 0, indexed):
+            found[paths[pid]].append(value)
+    return found
+
+
+def iter_records(source: Source, array_path: str = "results") -> Iterator[Any]:
+    """逐条产出数组中的记录，停止迭代后不再解析剩余部分"""
+    return iter_path(source, f"{array_path}.*" if array_path else "*")
+
+
+def first_record(source: Source, array_path: str = "results") -> Optional[Any]:
+    """只解析数组中的第一条记录，数组为空或不存在时返回 None"""
+    return next(iter_records(source, array_path), None)
@@ -0,0 +1,241 @@
+"""
+多服务器客户端
+
+同一套 FDA 工具部署在 SSE 和 StreamableHTTP 两个服务器上。
+MultiServerClient 把各服务器的工具合并成一个注册表，每次调用路由到
+观测延迟最低的副本；当前副本超过自身 p95 延迟仍未返回时，向次优副本
+发送一个对冲请求，取先完成的结果。调用失败时自动切换到其他副本。
+连接失败的副本不参与路由，每隔 reconnect_interval 秒在调用时后台重连一次，
+成功后重新加入注册表。
+"""
+
+import asyncio
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+
+from mcp.types import CallToolResult, Tool
+
+from .catalog import TOOLS, discover
+from .session_pool import SessionPool
+from .transports import ServerConfig
+
+# 失败调用按该延迟（秒）计入 EWMA，使故障副本排到后面
+_ERROR_PENALTY = 30.0
+
+
+class Replica:
+    """单个服务器副本的工具集和延迟统计"""
+
+    def __init__(self, config: ServerConfig, window: int = 200, alpha: float = 0.2):
+        self.config = config
+        self.tools: Dict[str, Tool] = {}
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self.ewma: Optional[float] = None
+        self.calls = 0
+        self.errors = 0
+        self.hedged = 0
+        self.connected = False
+        self.next_retry = 0.0
+        self._alpha = alpha
+
+    def record(self, elapsed: float, ok: bool = True) -> None:
+        self.calls += 1
+        if ok:
+            self.latencies.append(elapsed)
+        else:
+            self.errors += 1
+            elapsed = max(elapsed, _ERROR_PENALTY)
+        self.record_ewma(elapsed)
+
+    def record_cancelled(self, elapsed: float) -> None:
+        """被对冲取消的请求：实际延迟至少为 elapsed，只用于抬高 EWMA"""
+        if self.ewma is None or elapsed > self.ewma:
+            self.record_ewma(elapsed)
+
+    def record_ewma(self, elapsed: float) -> None:
+        if self.ewma is None:
+            self.ewma = elapsed
+        else:
+            self.ewma += self._alpha * (elapsed - self.ewma)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def score(self) -> float:
+        # 还没有样本的副本优先尝试，以便尽快获得延迟数据
+        return 0.0 if self.ewma is None else self.ewma
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.config.url,
+            "transport": self.config.transport,
+            "connected": self.connected,
+            "calls": self.calls,
+            "errors": self.errors,
+            "hedged": self.hedged,
+            "ewma": self.ewma,
+            "p95": self.percentile(0.95),
+        }
+
+
+class MultiServerClient:
+    """
+    跨 SSE / StreamableHTTP 服务器的统一工具调用入口
+
+    用法:
+        async with MultiServerClient([sse_config, http_config]) as client:
+            result = await client.call_tool("get_drug_warnings", {"drug_name": "aspirin"})
+    """
+
+    def __init__(
+        self,
+        configs: Sequence[ServerConfig],
+        pool: Optional[SessionPool] = None,
+        hedge: bool = True,
+        min_hedge_samples: int = 20,
+        reconnect_interval: float = 30.0,
+    ):
+        if not configs:
+            raise ValueError("至少需要一个服务器配置")
+        self.replicas = [Replica(config) for config in configs]
+        self.hedge = hedge
+        self.min_hedge_samples = min_hedge_samples
+        self.reconnect_interval = reconnect_interval
+        self._pool = pool if pool is not None else SessionPool()
+        self._owns_pool = pool is None
+        self._registry: Dict[str, List[Replica]] = {}
+        self._reconnecting: Dict[Replica, asyncio.Task] = {}
+
+    async def _load(self, replica: Replica) -> None:
+        """获取副本的工具列表并加入注册表；失败时记录错误，reconnect_interval 秒后再试"""
+        try:
+            async with self._pool.session(replica.config) as session:
+                catalog = await discover(session, kinds=(TOOLS,))
+            if TOOLS in catalog.errors:
+                raise catalog.errors[TOOLS]
+        except Exception:
+            replica.record(0.0, ok=False)
+            replica.next_retry = time.monotonic() + self.reconnect_interval
+            raise
+        replica.tools = {tool.name: tool for tool in catalog.tools or []}
+        replica.connected = True
+        for name in replica.tools:
+            self._registry.setdefault(name, []).append(replica)
+
+    async def connect(self) -> None:
+        """连接所有副本并建立工具注册表，连接失败的副本暂不参与路由"""
+        self._registry = {}
+        await asyncio.gather(*(self._load(replica) for replica in self.replicas), return_exceptions=True)
+        if not self._registry:
+            raise ConnectionError("所有 MCP 服务器都连接失败")
+
+    async def _reconnect(self, name: str) -> None:
+        """在后台重连到期的失败副本；没有副本提供 name 时等待重连结果"""
+        now = time.monotonic()
+        for replica in self.replicas:
+            if not replica.connected and replica not in self._reconnecting and now >= replica.next_retry:
+                task = asyncio.create_task(self._load(replica))
+                self._reconnecting[replica] = task
+                task.add_done_callback(lambda t, r=replica: self._reconnecting.pop(r, None))
+                # 后台任务的异常已经记录在副本统计中
+                task.add_done_callback(lambda t: t.cancelled() or t.exception())
+        if name not in self._registry and self._reconnecting:
+            await asyncio.wait(set(self._reconnecting.values()))
+
+    @property
+    def tools(self) -> Dict[str, Tool]:
+        """合并后的工具注册表"""
+        return {name: replicas[0].tools[name] for name, replicas in self._registry.items()}
+
+    def _ranked(self, name: str) -> List[Replica]:
+        replicas = self._registry.get(name)
+        if not replicas:
+            raise KeyError(f"没有服务器提供工具: {name}")
+        return sorted(replicas, key=lambda replica: replica.score)
+
+    async def _call(self, replica: Replica, name: str, arguments: Optional[Dict[str, Any]],
+                    kwargs: Dict[str, Any]) -> CallToolResult:
+        start = time.perf_counter()
+        try:
+            async with self._pool.session(replica.config) as session:
+                result = await session.call_tool(name, arguments=arguments, **kwargs)
+        except asyncio.CancelledError:
+            replica.record_cancelled(time.perf_counter() - start)
+            raise
+        except Exception:
+            replica.record(time.perf_counter() - start, ok=False)
+            raise
+        replica.record(time.perf_counter() - start)
+        return result
+
+    def _hedge_delay(self, replica: Replica) -> Optional[float]:
+        if not self.hedge or len(replica.latencies) < self.min_hedge_samples:
+            return None
+        return replica.percentile(0.95)
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                        **kwargs: Any) -> CallToolResult:
+        """
+        调用工具：选择最快的副本，必要时对冲或切换到其他副本
+
+        其他参数（read_timeout_seconds、progress_callback 等）转发给 ClientSession.call_tool。
+        """
+        await self._reconnect(name)
+        ranked = self._ranked(name)
+        primary = asyncio.create_task(self._call(ranked[0], name, arguments, kwargs))
+        tasks = {primary: ranked[0]}
+        backups = ranked[1:]
+        try:
+            delay = self._hedge_delay(ranked[0])
+            if delay is not None and backups:
+                done, _ = await asyncio.wait({primary}, timeout=delay)
+                if not done:
+                    ranked[0].hedged += 1
+                    backup = backups.pop(0)
+                    tasks[asyncio.create_task(self._call(backup, name, arguments, kwargs))] = backup
+
+            last_error: Optional[BaseException] = None
+            while tasks:
+                done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    del tasks[task]
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                if not tasks and backups:
+                    # 故障切换：所有在途请求都失败时尝试下一个副本
+                    backup = backups.pop(0)
+                    tasks[asyncio.create_task(self._call(backup, name, arguments, kwargs))] = backup
+            raise last_error
+        finally:
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> List[Dict[str, Any]]:
+        return [replica.stats() for replica in self.replicas]
+
+    async def close(self) -> None:
+        reconnecting = list(self._reconnecting.values())
+        for task in reconnecting:
+            task.cancel()
+        await asyncio.gather(*reconnecting, return_exceptions=True)
+        if self._owns_pool:
+            await self._pool.close()
+
+    async def __aenter__(self) -> "MultiServerClient":
+        try:
+            await self.connect()
+        except BaseException:
+            await self.close()
+            raise
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
@@ -0,0 +1,196 @@
+"""
+把结果解码和后处理移出事件循环
+
+json.loads、json.dumps(indent=2)、字段提取这些 CPU 密集的操作直接在事件循环里
+运行时，一个几 MB 的结果就会让同一循环上其他会话的 I/O 停顿几十到几百毫秒。
+Offload 把它们交给执行器：
+    - mode="thread": 线程池。解析仍然持有 GIL，但解释器每隔几毫秒切换线程，
+      事件循环不会被整段阻塞；文本对象直接传给线程，不复制
+    - mode="process": 进程池，真正并行。文本写入一块共享内存交给子进程，
+      不经过 pickle 和管道；只有函数的返回值通过 pickle 传回，
+      所以适合提取字段、生成预览这类结果比输入小得多的处理
+    - mode=None: 在事件循环中直接运行（用于对比）
+短于 inline_below（字符数或字节数）的文本直接在事件循环中处理，避免执行器的调度开销。
+
+进程池中运行的函数必须是模块级函数；decode_json、preview_text、
+extract_fields、label_summaries 可以直接使用。
+
+用法:
+    async with Offload("process", metrics=metrics) as offload:
+        preview = await offload.run_text(preview_text, result, 1000)
+        fields = await offload.run_text(extract_fields, result, ["results.*.openfda.brand_name"])
+"""
+
+import asyncio
+import json
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import nullcontext
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Sequence, Union
+
+from .instrumentation import Metrics
+from .lazy_json import Source, extract, result_text
+from .records import RECORD_TYPES, LabelRecord, iter_label_records
+
+THREAD = "thread"
+PROCESS = "process"
+
+
+@dataclass
+class Preview:
+    """结果的显示预览"""
+
+    kind: str  # "json" 或 "text"
+    text: str
+    chars: int  # 原始文本的字符数
+    truncated: bool
+
+
+def decode_json(text: str) -> Any:
+    return json.loads(text)
+
+
+def preview_text(text: str, limit: int = 1000, text_limit: int = 500) -> Preview:
+    """JSON 格式化后截取前 limit 个字符；不是 JSON 时截取前 text_limit 个字符"""
+    try:
+        pretty = json.dumps(json.loads(text), ensure_ascii=False, indent=2)
+    except ValueError:
+        return Preview("text", text[:text_limit], len(text), len(text) > text_limit)
+    return Preview("json", pretty[:limit], len(text), len(pretty) > limit)
+
+
+def extract_fields(text: str, paths: Sequence[str]) -> Dict[str, List[Any]]:
+    """见 lazy_json.extract"""
+    return extract(text, paths)
+
+
+def label_summaries(text: str, tool: Optional[str] = None, excerpt: int = 300) -> List[Dict[str, Any]]:
+    """标签记录的标识字段和主要文本字段的摘录"""
+    record_type = RECORD_TYPES.get(tool or "", LabelRecord)
+    summaries = []
+    for record in iter_label_records(text, record_type):
+        summary = record.to_dict()
+        summary["excerpt"] = record.excerpt(excerpt)
+        summaries.append(summary)
+    return summaries
+
+
+def _call_text(func: Callable[..., Any], raw: Any, args: tuple) -> Any:
+    # bytes 在执行器中解码，不占用事件循环
+    return func(result_text(raw), *args)
+
+
+def _run_shared(name: str, size: int, func: Callable[..., Any], args: tuple) -> Any:
+    """子进程中：从共享内存取出文本后调用 func"""
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        with block.buf[:size] as view:
+            text = str(view, "utf-8")
+    finally:
+        block.close()
+    return func(text, *args)
+
+
+class Offload:
+    """
+    结果解码执行器
+
+    执行器可以传入现成的 Executor；metrics 不为空时每个函数的耗时
+    记入 metrics.latency["offload.<函数名>"]。
+    """
+
+    def __init__(
+        self,
+        mode: Union[str, Executor, None] = THREAD,
+        max_workers: Optional[int] = None,
+        inline_below: int = 64 * 1024,
+        metrics: Optional[Metrics] = None,
+    ):
+        self._owned = False
+        if mode == THREAD:
+            self.executor: Optional[Executor] = ThreadPoolExecutor(max_workers, thread_name_prefix="mcp-offload")
+            self._owned = True
+        elif mode == PROCESS:
+            self.executor = ProcessPoolExecutor(max_workers)
+            self._owned = True
+        elif mode is None or isinstance(mode, Executor):
+            self.executor = mode
+        else:
+            raise ValueError(f"未知的执行器类型: {mode}（可选 {THREAD} / {PROCESS}）")
+        self.processes = isinstance(self.executor, ProcessPoolExecutor)
+        self.inline_below = inline_below
+        self.metrics = metrics
+        self.offloaded = 0
+        self.inline = 0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """在执行器中调用 func(*args)；进程池会 pickle 全部参数"""
+        return await self._submit(func.__name__, func, *args)
+
+    async def run_text(self, func: Callable[..., Any], source: Source, *args: Any) -> Any:
+        """
+        调用 func(文本, *args)
+
+        source 可以是 CallToolResult（取第一个文本内容）、str 或 bytes。
+        """
+        raw = _raw(source)
+        if self.executor is None or len(raw) < self.inline_below:
+            self.inline += 1
+            with self._timer(func.__name__):
+                return _call_text(func, raw, args)
+        if not self.processes:
+            return await self._submit(func.__name__, _call_text, func, raw, args)
+        data = raw.encode("utf-8") if isinstance(raw, str) else raw
+        block = shared_memory.SharedMemory(create=True, size=max(1, len(data)))
+        try:
+            block.buf[:len(data)] = data
+            return await self._submit(func.__name__, _run_shared, block.name, len(data), func, args)
+        finally:
+            block.close()
+            block.unlink()
+
+    async def loads(self, source: Source) -> Any:
+        return await self.run_text(decode_json, source)
+
+    async def preview(self, source: Source, limit: int = 1000, text_limit: int = 500) -> Preview:
+        return await self.run_text(preview_text, source, limit, text_limit)
+
+    async def _submit(self, name: str, func: Callable[..., Any], *args: Any) -> Any:
+        with self._timer(name):
+            if self.executor is None:
+                return func(*args)
+            self.offloaded += 1
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def _timer(self, name: str) -> ContextManager[None]:
+        # 在事件循环一侧计时，包括在执行器中排队的时间
+        return self.metrics.timer(f"offload.{name}") if self.metrics is not None else nullcontext()
+
+    def stats(self) -> Dict[str, int]:
+        return {"offloaded": self.offloaded, "inline": self.inline}
+
+    def close(self) -> None:
+        """关闭自己创建的执行器并等待正在运行的函数结束（会阻塞，事件循环中用 aclose）"""
+        if self._owned and self.executor is not None:
+            executor, self.executor = self.executor, None
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    async def aclose(self) -> None:
+        """同 close，在线程中等待执行器结束，不阻塞事件循环"""
+        if self._owned and self.executor is not None:
+            executor, self.executor = self.executor, None
+            await asyncio.to_thread(executor.shutdown, wait=True, cancel_futures=True)
+
+    async def __aenter__(self) -> "Offload":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+
+def _raw(source: Source) -> Union[str, bytes, bytearray, memoryview]:
+    """不复制地取出结果文本（bytes 不解码）"""
+    if isinstance(source, (str, bytes, bytearray, memoryview)):
+        return source
+    return result_text(source)
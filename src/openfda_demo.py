@@ -5,12 +5,15 @@ OpenFDA MCP 服务器实用示例
 展示如何使用 OpenFDA MCP 服务器查询药品信息
 """
 
-import asyncio
-import json
-
 from mcp import ClientSession
 from mcp.client.sse import sse_client
 
+from .http_pool import run_with_http_pool, shared_client_factory
+from .records import AdverseReactionRecord, IndicationRecord, WarningRecord, iter_label_records
+from .result_cache import CachedSession
+from .semantic_cache import TFIDF, SemanticCache, SemanticCachedSession
+from .tool_batch import call_tools_concurrently
+
 
 async def query_openfda():
     """查询 OpenFDA 药品数据库"""
@@ -26,11 +29,15 @@ async def query_openfda():
     print("=" * 70)
     print()
     
-    async with sse_client(url=server_url, headers=headers) as (read, write):
-        async with ClientSession(read, write) as session:
-            await session.initialize()
+    async with sse_client(url=server_url, headers=headers,
+                          httpx_client_factory=shared_client_factory) as (read, write):
+        async with ClientSession(read, write) as raw_session:
+            await raw_session.initialize()
             print("✅ 已连接到 OpenFDA MCP 服务器\n")
             
+            # 相同参数的标签查询直接复用缓存结果；措辞不同的 RAG 问题按语义复用回答
+            session = SemanticCachedSession(CachedSession(raw_session), SemanticCache(similarity=TFIDF))
+            
             # ==========================================
             # 示例 1: 搜索布洛芬（Ibuprofen）的药品标签
             # ==========================================
@@ -46,27 +53,26 @@ async def query_openfda():
                     }
                 )
                 
-                data = json.loads(result.content[0].text)
-                if 'results' in data and len(data['results']) > 0:
-                    drug = data['results'][0]
-                    
+                # 只解析第一条记录，长文本字段访问时才解码
+                drug = next(iter_label_records(result), None)
+                if drug is not None:
                     print(f"✅ 找到药品信息:")
                     
                     # 品牌名
-                    if 'openfda' in drug and 'brand_name' in drug['openfda']:
-                        print(f"   品牌名: {', '.join(drug['openfda']['brand_name'][:3])}")
+                    if drug.brand_names:
+                        print(f"   品牌名: {', '.join(drug.brand_names[:3])}")
                     
                     # 通用名
-                    if 'openfda' in drug and 'generic_name' in drug['openfda']:
-                        print(f"   通用名: {', '.join(drug['openfda']['generic_name'][:3])}")
+                    if drug.generic_names:
+                        print(f"   通用名: {', '.join(drug.generic_names[:3])}")
                     
                     # 制造商
-                    if 'openfda' in drug and 'manufacturer_name' in drug['openfda']:
-                        print(f"   制造商: {', '.join(drug['openfda']['manufacturer_name'][:2])}")
+                    if drug.manufacturer_names:
+                        print(f"   制造商: {', '.join(drug.manufacturer_names[:2])}")
                     
                     # 适应症（截取前200字）
-                    if 'indications_and_usage' in drug:
-                        indications = drug['indications_and_usage'][0][:200]
+                    indications = drug.excerpt(200)
+                    if indications:
                         print(f"   适应症: {indications}...")
                     
                     print()
@@ -91,12 +97,11 @@ async def query_openfda():
                     }
                 )
                 
-                data = json.loads(result.content[0].text)
-                if 'results' in data and len(data['results']) > 0:
-                    drug = data['results'][0]
-                    
-                    if 'adverse_reactions' in drug:
-                        reactions = drug['adverse_reactions'][0][:300]
+                # 只解析第一条记录，不解析整个结果文档
+                drug = next(iter_label_records(result, AdverseReactionRecord), None)
+                if drug is not None:
+                    reactions = drug.excerpt(300)
+                    if reactions:
                         print(f"✅ 不良反应信息:")
                         print(f"   {reactions}...")
                         print()
@@ -123,12 +128,11 @@ async def query_openfda():
                     }
                 )
                 
-                data = json.loads(result.content[0].text)
-                if 'results' in data and len(data['results']) > 0:
-                    drug = data['results'][0]
-                    
-                    if 'warnings' in drug:
-                        warnings = drug['warnings'][0][:300]
+                # 只解析第一条记录，不解析整个结果文档
+                drug = next(iter_label_records(result, WarningRecord), None)
+                if drug is not None:
+                    warnings = drug.excerpt(300)
+                    if warnings:
                         print(f"✅ 警告信息:")
                         print(f"   {warnings}...")
                         print()
@@ -166,6 +170,20 @@ async def query_openfda():
                     print(f"✅ 分析结果:")
                     print(f"   {response}")
                 print()
+                
+                # 换一种说法再问一次，直接使用缓存的回答
+                result = await session.call_tool(
+                    "ae_pipeline_rag",
+                    arguments={
+                        "query": "What are the heart-related side effects?",
+                        "drug": "ibuprofen",
+                        "top_k": 2
+                    }
+                )
+                hit = (result.meta or {}).get("semantic_cache")
+                if hit:
+                    print(f"♻️  相似问题命中缓存: \"{hit['cached_query']}\" "
+                          f"(相似度 {hit['similarity']:.2f}, top_k {hit['cached_top_k']} -> {hit['requested_top_k']})\n")
                     
             except Exception as e:
                 print(f"   ❌ 分析失败: {e}\n")
@@ -178,24 +196,26 @@ async def query_openfda():
             
             drugs = ["aspirin", "ibuprofen", "naproxen"]
             
-            for drug_name in drugs:
+            # 在同一会话上并发查询，结果按输入顺序返回
+            items = await call_tools_concurrently(
+                session,
+                [
+                    ("get_drug_indications", {"drug_name": drug_name, "limit": 1})
+                    for drug_name in drugs
+                ],
+                max_in_flight=4
+            )
+            
+            for drug_name, item in zip(drugs, items):
+                if not item.ok:
+                    print(f"   • {drug_name.capitalize()}: (查询失败)")
+                    continue
+                
                 try:
-                    result = await session.call_tool(
-                        "get_drug_indications",
-                        arguments={
-                            "drug_name": drug_name,
-                            "limit": 1
-                        }
-                    )
-                    
-                    data = json.loads(result.content[0].text)
-                    if 'results' in data and len(data['results']) > 0:
-                        drug = data['results'][0]
-                        
+                    drug = next(iter_label_records(item.result, IndicationRecord), None)
+                    if drug is not None:
                         # 品牌名
-                        brand_names = "未知"
-                        if 'openfda' in drug and 'brand_name' in drug['openfda']:
-                            brand_names = ', '.join(drug['openfda']['brand_name'][:2])
+                        brand_names = ', '.join(drug.brand_names[:2]) or "未知"
                         
                         print(f"   • {drug_name.capitalize()}: {brand_names}")
                     else:
@@ -205,13 +225,15 @@ async def query_openfda():
                     print(f"   • {drug_name.capitalize()}: (查询失败)")
             
             print()
+            stats = session.cache.stats
+            print(f"🗄️  缓存: 命中 {stats.hits} 次, 未命中 {stats.misses} 次, 合并 {stats.coalesced} 次")
             print("✨ 所有查询完成！")
 
 
 def main():
     """主函数"""
     try:
-        asyncio.run(query_openfda())
+        run_with_http_pool(query_openfda())
     except KeyboardInterrupt:
         print("\n\n⚠️  用户中断")
     except Exception as e:
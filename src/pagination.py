@@ -0,0 +1,130 @@
+"""
+自动分页查询
+
+search_drug_labels 等工具通过 limit / skip 分页。iter_tool_records 在内部
+推进 skip，并让后面的 prefetch 页在调用方处理当前页时就已经在途。
+服务器返回 meta.results.total 时一直读到 total 条为止，skip 按实际收到的
+记录数推进（服务器可能限制每页条数）；没有 total 时读到不足一页的结果为止。
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+from mcp.types import CallToolResult
+
+from .lazy_json import extract, iter_records, result_text
+
+
+async def iter_tool_records(
+    session: Any,
+    tool: str,
+    arguments: Dict[str, Any],
+    page_size: int = 100,
+    prefetch: int = 2,
+    max_records: Optional[int] = None,
+    limit_param: str = "limit",
+    skip_param: str = "skip",
+) -> AsyncIterator[Any]:
+    """
+    逐条产出分页工具的全部结果记录
+
+    Args:
+        session: 已初始化的 ClientSession（或任何提供 call_tool 的对象）
+        tool: 工具名称
+        arguments: 除分页参数以外的调用参数
+        page_size: 每页记录数
+        prefetch: 处理当前页时提前发送的页数
+        max_records: 最多产出的记录数
+        limit_param / skip_param: 工具的分页参数名
+    """
+    if page_size < 1:
+        raise ValueError("page_size 必须大于 0")
+    if prefetch < 0:
+        raise ValueError("prefetch 不能小于 0")
+
+    async def fetch(skip: int) -> CallToolResult:
+        page_args = dict(arguments)
+        page_args[limit_param] = page_size
+        page_args[skip_param] = skip
+        result = await session.call_tool(tool, arguments=page_args)
+        if result.isError:
+            raise RuntimeError(f"{tool} 调用失败 (skip={skip}): {result_text(result)[:200]}")
+        return result
+
+    async def cancel_pending() -> None:
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+        pending.clear()
+
+    first = await fetch(0)
+    found = extract(first, ["meta.results.total", "results.*"])
+    total = found["meta.results.total"][0] if found["meta.results.total"] else None
+    end = float("inf") if total is None else total
+    if max_records is not None:
+        end = min(end, max_records)
+
+    pending: Deque[asyncio.Task] = deque()
+    records = found["results.*"]
+    # 已收到的记录数就是下一页的 skip；step 是服务器实际的每页条数
+    received = len(records)
+    step = page_size
+    next_skip = received
+    yielded = 0
+    try:
+        while True:
+            if total is not None and 0 < len(records) < step and received < end:
+                # 服务器把每页限制在 page_size 以下：已预取的页 skip 不对，按实际页大小重新预取
+                step = len(records)
+                await cancel_pending()
+                next_skip = received
+            while len(pending) < prefetch and next_skip < end:
+                pending.append(asyncio.create_task(fetch(next_skip)))
+                next_skip += step
+
+            for record in records:
+                if yielded >= end:
+                    return
+                yield record
+                yielded += 1
+
+            if yielded >= end or not records:
+                return
+            if total is None and len(records) < page_size:
+                # 没有 total 时，不足一页说明已经是最后一页
+                return
+            if pending:
+                page = await pending.popleft()
+            elif next_skip < end:
+                page = await fetch(next_skip)
+                next_skip += step
+            else:
+                return
+            records = list(iter_records(page))
+            received += len(records)
+    finally:
+        await cancel_pending()
+
+def iter_drug_labels(
+    session: Any,
+    search: str,
+    page_size: int = 100,
+    prefetch: int = 2,
+    max_records: Optional[int] = None,
+) -> AsyncIterator[Any]:
+    """
+    逐条产出 search_drug_labels 的全部药品标签
+
+    用法:
+        async for label in iter_drug_labels(session, "aspirin", page_size=100):
+            ...
+    """
+    return iter_tool_records(
+        session,
+        "search_drug_labels",
+        {"search": search},
+        page_size=page_size,
+        prefetch=prefetch,
+        max_records=max_records,
+    )
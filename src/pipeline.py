@@ -0,0 +1,142 @@
+"""
+单会话流水线请求
+
+ClientSession 给每个请求分配递增的 JSON-RPC id，并按 id 把响应交给
+对应的等待者，所以同一个会话（同一个 mcp-session-id）上可以同时有
+多个请求在途。PipelinedSession 在此基础上：
+    - 发送下一个请求前不等待上一个响应
+    - 限制在途请求数（max_outstanding），达到上限时 submit() 阻塞
+    - imap() 把“已返回但调用方还没取走”的结果也计入上限：调用方处理
+      得慢时不再发送新请求，响应不会在内存中无限堆积
+
+StreamableHTTP 每个请求是一个 POST；HTTP/1.1 下每个在途 POST 占用
+连接池中的一个连接，因此 max_outstanding 同时限制了这个会话使用的连接数。
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, Iterable, Optional, Tuple
+
+from mcp.types import CallToolResult
+
+from .tool_batch import BatchItem, ToolCall
+
+
+class PipelinedSession:
+    """
+    流水线会话包装
+
+    用法:
+        pipeline = PipelinedSession(session, max_outstanding=16)
+        async for item in pipeline.imap(calls):
+            print(item.name, item.ok)
+    """
+
+    def __init__(self, session: Any, max_outstanding: int = 16):
+        if max_outstanding < 1:
+            raise ValueError("max_outstanding 必须大于 0")
+        self.session = session
+        self.max_outstanding = max_outstanding
+        self._slots = asyncio.Semaphore(max_outstanding)
+        self.outstanding = 0
+        self.peak_outstanding = 0
+        self.sent = 0
+        self.completed = 0
+        self.errors = 0
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
+
+    def _finished(self, task: asyncio.Task) -> None:
+        self.outstanding -= 1
+        self.completed += 1
+        if task.cancelled() or task.exception() is not None:
+            self.errors += 1
+
+    async def _start(self, name: str, arguments: Optional[Dict[str, Any]], **kwargs: Any) -> asyncio.Task:
+        """占用一个名额并发出请求；名额由调用方释放"""
+        await self._slots.acquire()
+        self.sent += 1
+        self.outstanding += 1
+        self.peak_outstanding = max(self.peak_outstanding, self.outstanding)
+        task = asyncio.ensure_future(self.session.call_tool(name, arguments=arguments, **kwargs))
+        task.add_done_callback(self._finished)
+        # 让请求写入传输，返回时请求已经在途
+        await asyncio.sleep(0)
+        return task
+
+    async def submit(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                     **kwargs: Any) -> "asyncio.Future[CallToolResult]":
+        """
+        发出请求并立即返回 Future，不等待响应
+
+        在途请求达到 max_outstanding 时等待名额；响应到达后释放名额。
+        """
+        task = await self._start(name, arguments, **kwargs)
+        task.add_done_callback(lambda _: self._slots.release())
+        return task
+
+    async def call_tool(self, name: str, arguments: Optional[Dict[str, Any]] = None,
+                        **kwargs: Any) -> CallToolResult:
+        return await (await self.submit(name, arguments, **kwargs))
+
+    async def imap(self, calls: Iterable[ToolCall], ordered: bool = True) -> AsyncIterator[BatchItem]:
+        """
+        流水线发送 calls，逐个产出 BatchItem
+
+        ordered=True 按输入顺序产出，否则按完成顺序产出。名额在结果被
+        取走时才释放，调用方的处理速度决定发送速度。
+        """
+        window: Deque[Tuple[BatchItem, asyncio.Task]] = deque()
+        calls = iter(calls)
+        exhausted = False
+
+        def collect(item: BatchItem, task: asyncio.Task) -> BatchItem:
+            self._slots.release()
+            if task.cancelled():
+                item.error = asyncio.CancelledError()
+            elif task.exception() is not None:
+                item.error = task.exception()
+            else:
+                item.result = task.result()
+            return item
+
+        try:
+            while True:
+                # 补满窗口；_start 在名额用完时阻塞（与 submit() 共享名额）
+                while not exhausted and len(window) < self.max_outstanding:
+                    try:
+                        name, arguments = next(calls)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    task = await self._start(name, arguments)
+                    window.append((BatchItem(name=name, arguments=arguments), task))
+                if not window:
+                    return
+                if ordered:
+                    item, task = window.popleft()
+                    await asyncio.wait([task])
+                else:
+                    done, _ = await asyncio.wait(
+                        [task for _, task in window], return_when=asyncio.FIRST_COMPLETED
+                    )
+                    index = next(i for i, (_, task) in enumerate(window) if task in done)
+                    item, task = window[index]
+                    del window[index]
+                yield collect(item, task)
+        finally:
+            # 调用方提前退出时取消剩余请求并归还名额
+            for _, task in window:
+                task.cancel()
+                self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "max_outstanding": self.max_outstanding,
+            "outstanding": self.outstanding,
+            "peak_outstanding": self.peak_outstanding,
+            "sent": self.sent,
+            "completed": self.completed,
+            "errors": self.errors,
+        }
@@ -0,0 +1,265 @@
+"""
+紧凑的 FDA 标签记录
+
+json.loads 得到的标签记录是嵌套的 dict 和 list，每条记录的 openfda 部分就有
+十几个列表。需要在内存中保留成千上万条结果做关联时，这里的 __slots__ 记录类
+只保留常用的标识字段：
+    - id、set_id、effective_time 直接保存
+    - 品牌名、通用名、制造商名、给药途径保存为 sys.intern 过的字符串元组，
+      重复的名称在所有记录之间共享
+    - 警告、适应症、不良反应等长文本只记录在原始 JSON 文本中的位置，
+      访问时才解码（不缓存）；同一个结果的所有记录共享一份原始文本，
+      compact=True 时每条记录只复制自己的长文本字段
+raw() 解码整条记录，得到与 json.loads 相同的字典。
+
+用法:
+    for record in records_from_result(result, tool="get_drug_warnings"):
+        print(record.brand_names, record.excerpt(300))
+"""
+
+import json
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+from .lazy_json import Source, iter_members, result_text, skip_value, skip_ws
+
+_decoder = json.JSONDecoder()
+
+# 按需解码的长文本字段
+TEXT_FIELDS = (
+    "indications_and_usage",
+    "warnings",
+    "boxed_warning",
+    "adverse_reactions",
+    "contraindications",
+    "dosage_and_administration",
+)
+# openfda 中保留的字段 -> 记录属性
+OPENFDA_FIELDS = {
+    "brand_name": "brand_names",
+    "generic_name": "generic_names",
+    "manufacturer_name": "manufacturer_names",
+    "route": "routes",
+}
+
+
+def _names(value: Any) -> Tuple[str, ...]:
+    if value is None:
+        return ()
+    if not isinstance(value, list):
+        value = [value]
+    return tuple(sys.intern(str(item)) for item in value)
+
+
+class _Text:
+    """按需解码的文本字段；偏移量保存在同名加下划线的槽中"""
+
+    def __set_name__(self, owner: type, name: str) -> None:
+        self.name = name
+        self.slot = f"_{name}"
+
+    def __get__(self, record: Optional["LabelRecord"], owner: type) -> Any:
+        if record is None:
+            return self
+        offset = getattr(record, self.slot)
+        if offset < 0:
+            return None
+        return _decoder.raw_decode(record._source, offset)[0]
+
+
+class LabelRecord:
+    """药品标签记录（search_drug_labels 的结果）"""
+
+    __slots__ = (
+        "_source",
+        "_start",
+        "id",
+        "set_id",
+        "effective_time",
+        "brand_names",
+        "generic_names",
+        "manufacturer_names",
+        "routes",
+    ) + tuple(f"_{name}" for name in TEXT_FIELDS)
+
+    # excerpt() 使用的主要文本字段
+    primary_field: Optional[str] = "indications_and_usage"
+    _text_fields = frozenset(TEXT_FIELDS)
+
+    indications_and_usage = _Text()
+    warnings = _Text()
+    boxed_warning = _Text()
+    adverse_reactions = _Text()
+    contraindications = _Text()
+    dosage_and_administration = _Text()
+
+    @classmethod
+    def parse(cls, text: str, start: int, compact: bool = False) -> Tuple["LabelRecord", int]:
+        """
+        解析 text[start] 处的记录对象，返回 (记录, 对象之后的位置)
+
+        compact=True 时记录不引用整个结果文本，只复制自己的长文本字段，
+        之后 raw() 只包含标识字段和长文本字段。
+        """
+        record = cls.__new__(cls)
+        record._source = text
+        record._start = start
+        record.id = record.set_id = record.effective_time = None
+        for attribute in OPENFDA_FIELDS.values():
+            setattr(record, attribute, ())
+        for name in TEXT_FIELDS:
+            setattr(record, f"_{name}", -1)
+
+        spans: List[Tuple[str, int, int]] = []
+        members = iter_members(text, start)
+        try:
+            key, at = next(members)
+            while True:
+                end = None
+                if key in ("id", "set_id", "effective_time"):
+                    value, end = _decoder.raw_decode(text, at)
+                    setattr(record, key, value)
+                elif key == "openfda":
+                    openfda, end = _decoder.raw_decode(text, at)
+                    if isinstance(openfda, dict):
+                        for field, attribute in OPENFDA_FIELDS.items():
+                            setattr(record, attribute, _names(openfda.get(field)))
+                elif key in cls._text_fields:
+                    end = skip_value(text, at)
+                    spans.append((key, at, end))
+                    setattr(record, f"_{key}", at)
+                key, at = members.send(end)
+        except StopIteration as stop:
+            if compact:
+                record._compact(text, spans)
+            return record, stop.value
+
+    def _compact(self, text: str, spans: List[Tuple[str, int, int]]) -> None:
+        pieces = []
+        offset = 0
+        for key, start, end in spans:
+            setattr(self, f"_{key}", offset)
+            pieces.append(text[start:end])
+            offset += end - start
+        self._source = "".join(pieces)
+        self._start = -1
+
+    def raw(self) -> Dict[str, Any]:
+        """解码整条记录（compact 记录只有标识字段和长文本字段）"""
+        if self._start >= 0:
+            return _decoder.raw_decode(self._source, self._start)[0]
+        data: Dict[str, Any] = {"id": self.id, "set_id": self.set_id, "effective_time": self.effective_time}
+        for name in TEXT_FIELDS:
+            value = getattr(self, name)
+            if value is not None:
+                data[name] = value
+        data["openfda"] = {field: list(getattr(self, attribute)) for field, attribute in OPENFDA_FIELDS.items()}
+        return data
+
+    def paragraphs(self, field: Optional[str] = None) -> List[str]:
+        """文本字段的段落列表（默认 primary_field）"""
+        field = field or self.primary_field
+        value = getattr(self, field) if field else None
+        if value is None:
+            return []
+        return [str(item) for item in value] if isinstance(value, list) else [str(value)]
+
+    def excerpt(self, limit: int = 300, field: Optional[str] = None) -> str:
+        """文本字段第一段的前 limit 个字符"""
+        paragraphs = self.paragraphs(field)
+        return paragraphs[0][:limit] if paragraphs else ""
+
+    def to_dict(self) -> Dict[str, Any]:
+        """标识字段组成的字典（不含长文本）"""
+        data = {"id": self.id, "set_id": self.set_id, "effective_time": self.effective_time}
+        for attribute in OPENFDA_FIELDS.values():
+            data[attribute] = list(getattr(self, attribute))
+        return data
+
+    def __repr__(self) -> str:
+        brand = self.brand_names[0] if self.brand_names else None
+        return f"{type(self).__name__}(id={self.id!r}, brand={brand!r})"
+
+
+class WarningRecord(LabelRecord):
+    """get_drug_warnings 的结果"""
+
+    __slots__ = ()
+    primary_field = "warnings"
+
+
+class AdverseReactionRecord(LabelRecord):
+    """get_drug_adverse_reactions 的结果"""
+
+    __slots__ = ()
+    primary_field = "adverse_reactions"
+
+
+class IndicationRecord(LabelRecord):
+    """get_drug_indications 的结果"""
+
+    __slots__ = ()
+    primary_field = "indications_and_usage"
+
+
+RECORD_TYPES: Dict[str, Type[LabelRecord]] = {
+    "search_drug_labels": LabelRecord,
+    "get_drug_warnings": WarningRecord,
+    "get_drug_adverse_reactions": AdverseReactionRecord,
+    "get_drug_indications": IndicationRecord,
+}
+
+
+def iter_label_records(
+    source: Source,
+    record_type: Type[LabelRecord] = LabelRecord,
+    array_path: str = "results",
+    compact: bool = False,
+) -> Iterator[LabelRecord]:
+    """
+    逐条产出结果 JSON 中 array_path 数组的记录（非对象元素跳过）
+
+    默认所有记录共享整个结果文本；只保留少数记录或结果中有大量不需要的字段时
+    用 compact=True，每条记录只复制自己的长文本字段。
+    """
+    text = result_text(source)
+    i = skip_ws(text, 0)
+    for key in array_path.split(".") if array_path else ():
+        members = iter_members(text, i)
+        for member, at in members:
+            if member == key:
+                i = at
+                break
+        else:
+            return
+        members.close()
+    if text[i:i + 1] != "[":
+        return
+    i = skip_ws(text, i + 1)
+    if text[i:i + 1] == "]":
+        return
+    while True:
+        if text[i:i + 1] == "{":
+            record, i = record_type.parse(text, i, compact)
+            yield record
+        else:
+            i = skip_value(text, i)
+        i = skip_ws(text, i)
+        char = text[i:i + 1]
+        if char == "]":
+            return
+        if char != ",":
+            raise ValueError(f"位置 {i} 处应为 ',' 或 ']'")
+        i = skip_ws(text, i + 1)
+
+
+def records_from_result(
+    source: Source,
+    tool: Optional[str] = None,
+    record_type: Optional[Type[LabelRecord]] = None,
+    compact: bool = False,
+) -> List[LabelRecord]:
+    """把工具结果转换成记录列表；record_type 默认按工具名选择"""
+    if record_type is None:
+        record_type = RECORD_TYPES.get(tool or "", LabelRecord)
+    return list(iter_label_records(source, record_type, compact=compact))
@@ -0,0 +1,285 @@
+"""
+断线重连
+
+长时间运行的批量任务中，SSE / StreamableHTTP 连接偶尔会中断。
+ResilientSession 在连接断开时按带抖动的指数退避重连：
+    - StreamableHTTP：携带原来的 mcp-session-id 接续服务器端会话，
+      并用最后收到的事件 ID（Last-Event-ID）恢复在途请求的响应流
+    - 无法恢复时，重新发送标记为幂等的在途请求
+    - 每个服务器端点一个熔断器，连续失败后暂停连接尝试
+"""
+
+import asyncio
+import random
+import time
+from dataclasses import replace
+from typing import Any, Dict, FrozenSet, Iterator, Optional
+
+from mcp import types
+from mcp.shared.message import ClientMessageMetadata
+from mcp.types import CallToolResult
+
+from .session_pool import PooledSession, is_connection_error
+from .transports import STREAMABLE_HTTP, ServerConfig
+
+# FDA 工具都是只读查询，重复发送没有副作用
+IDEMPOTENT_TOOLS: FrozenSet[str] = frozenset({
+    "search_drug_labels",
+    "get_drug_warnings",
+    "get_drug_adverse_reactions",
+    "get_drug_indications",
+    "ae_pipeline_rag",
+})
+
+SESSION_ID_HEADER = "mcp-session-id"
+
+class CircuitOpenError(ConnectionError):
+    """熔断器打开，暂停连接该端点"""
+
+
+class CircuitBreaker:
+    """
+    端点熔断器
+
+    连续失败 failure_threshold 次后打开；reset_timeout 秒后进入半开状态，
+    允许一次尝试，成功则关闭，失败则重新打开。
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+
+    @property
+    def state(self) -> str:
+        if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+            self._state = self.HALF_OPEN
+        return self._state
+
+    def allow(self) -> bool:
+        return self.state != self.OPEN
+
+    def record_success(self) -> None:
+        self.failures = 0
+        self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            self._state = self.OPEN
+            self._opened_at = time.monotonic()
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def circuit_breaker(url: str) -> CircuitBreaker:
+    """进程内每个端点共享同一个熔断器"""
+    if url not in _breakers:
+        _breakers[url] = CircuitBreaker()
+    return _breakers[url]
+
+
+def backoff_delays(base: float = 0.5, factor: float = 2.0, max_delay: float = 30.0) -> Iterator[float]:
+    """指数退避延迟序列（full jitter）"""
+    attempt = 0
+    while True:
+        yield random.uniform(0, min(max_delay, base * factor ** attempt))
+        attempt += 1
+
+
+class ResilientSession:
+    """
+    自动重连的会话
+
+    用法:
+        async with ResilientSession(config) as session:
+            result = await session.call_tool("search_drug_labels", {...})
+    """
+
+    def __init__(
+        self,
+        config: ServerConfig,
+        idempotent_tools: FrozenSet[str] = IDEMPOTENT_TOOLS,
+        max_attempts: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        breaker: Optional[CircuitBreaker] = None,
+        heartbeat_interval: float = 5.0,
+    ):
+        self.streamable = config.transport == STREAMABLE_HTTP
+        # 断线后还要接续服务器端会话，关闭旧传输时不能发送 DELETE
+        self.config = replace(config, terminate_on_close=False) if self.streamable else config
+        self.idempotent_tools = idempotent_tools
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.heartbeat_interval = heartbeat_interval
+        self.breaker = breaker if breaker is not None else circuit_breaker(config.url)
+        self.session_id: Optional[str] = None
+        self.reconnects = 0
+        self.resumed = 0
+        self.retried = 0
+        self._conn: Optional[PooledSession] = None
+        self._lock = asyncio.Lock()
+
+    async def _open(self) -> PooledSession:
+        if self.session_id is not None:
+            resumed = PooledSession(
+                self.config.with_headers({SESSION_ID_HEADER: self.session_id}), initialize=False
+            )
+            try:
+                await resumed.start()
+            except Exception:
+                pass
+            if await resumed.ping(self.heartbeat_interval):
+                self.resumed += 1
+                return resumed
+            # 服务器端会话已失效，重新初始化
+            await resumed.close()
+            self.session_id = None
+        fresh = PooledSession(self.config)
+        await fresh.start()
+        if self.streamable:
+            self.session_id = fresh.get_session_id()
+        return fresh
+
+    async def _connection(self, failed: Optional[PooledSession] = None) -> PooledSession:
+        """返回可用连接；failed 是刚刚出错的连接，需要替换"""
+        async with self._lock:
+            if self._conn is not None and self._conn is not failed and not self._conn.broken:
+                return self._conn
+            if self._conn is not None:
+                await self._conn.close()
+                self._conn = None
+                self.reconnects += 1
+            delays = backoff_delays(self.base_delay, max_delay=self.max_delay)
+            last_error: Optional[BaseException] = None
+            for attempt in range(self.max_attempts):
+                if not self.breaker.allow():
+                    raise CircuitOpenError(f"熔断器已打开: {self.config.url}")
+                try:
+                    self._conn = await self._open()
+                    self.breaker.record_success()
+                    return self._conn
+                except Exception as e:
+                    last_error = e
+                    self.breaker.record_failure()
+                    if attempt < self.max_attempts - 1:
+                        await asyncio.sleep(next(delays))
+            raise ConnectionError(f"无法连接 {self.config.url}") from last_error
+
+    async def _watch(self, conn: PooledSession) -> None:
+        """
+        连接断开或心跳失败时返回
+
+        StreamableHTTP 的响应流中断后，如果服务器没有发送事件 ID，
+        SDK 既不会结束在途请求也不会关闭传输，只能靠心跳发现。
+        """
+        while True:
+            try:
+                await asyncio.wait_for(conn.wait_closed(), self.heartbeat_interval)
+                return
+            except asyncio.TimeoutError:
+                if not await conn.ping(self.heartbeat_interval):
+                    return
+
+    async def _send(self, conn: PooledSession, name: str, arguments: Optional[Dict[str, Any]],
+                    metadata: Optional[ClientMessageMetadata]) -> CallToolResult:
+        """发送请求；连接在响应到达前断开时抛出 ConnectionError"""
+        if self.streamable:
+            request = conn.session.send_request(
+                types.ClientRequest(types.CallToolRequest(
+                    method="tools/call",
+                    params=types.CallToolRequestParams(name=name, arguments=arguments),
+                )),
+                CallToolResult,
+                metadata=metadata,
+            )
+        else:
+            request = conn.session.call_tool(name, arguments=arguments)
+        request_task = asyncio.ensure_future(request)
+        watch_task = asyncio.ensure_future(self._watch(conn))
+        try:
+            await asyncio.wait({request_task, watch_task}, return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            watch_task.cancel()
+        if request_task.done():
+            return request_task.result()
+        request_task.cancel()
+        await asyncio.gather(request_task, return_exceptions=True)
+        raise ConnectionError("连接在响应到达前断开")
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        idempotent: Optional[bool] = None,
+    ) -> CallToolResult:
+        """
+        调用工具，连接断开时自动重连
+
+        非幂等的调用只有在能通过 Last-Event-ID 恢复响应流时才会继续，
+        否则直接抛出异常，避免在服务器上重复执行。
+        """
+        if idempotent is None:
+            idempotent = name in self.idempotent_tools
+        token: Optional[str] = None
+
+        async def on_token(new_token: str) -> None:
+            nonlocal token
+            token = new_token
+
+        conn: Optional[PooledSession] = None
+        last_error: Optional[BaseException] = None
+        for _ in range(self.max_attempts):
+            conn = await self._connection(failed=conn)
+            resuming = token is not None
+            metadata = None
+            if self.streamable:
+                metadata = ClientMessageMetadata(resumption_token=token, on_resumption_token_update=on_token)
+            try:
+                result = await self._send(conn, name, arguments, metadata)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                if not is_connection_error(e):
+                    raise
+                last_error = e
+                # 熔断器只统计连接尝试：断开后的重连失败由 _connection 记录，这里再记一次会重复计数
+                conn.broken = True
+                if resuming:
+                    # 恢复失败只尝试一次，之后按幂等性决定是否重新发送
+                    token = None
+                if token is None and not idempotent:
+                    raise
+                if token is None:
+                    self.retried += 1
+        raise ConnectionError(f"{name} 调用在 {self.max_attempts} 次尝试后仍失败") from last_error
+
+    def __getattr__(self, name: str) -> Any:
+        """其他方法直接使用当前连接的会话（不自动重试）"""
+        if self._conn is None or self._conn.session is None:
+            raise AttributeError(name)
+        return getattr(self._conn.session, name)
+
+    async def connect(self) -> None:
+        await self._connection()
+
+    async def close(self) -> None:
+        if self._conn is not None:
+            await self._conn.close()
+            self._conn = None
+
+    async def __aenter__(self) -> "ResilientSession":
+        await self.connect()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
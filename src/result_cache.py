@@ -0,0 +1,257 @@
+"""
+工具调用结果缓存
+
+FDA 标签数据变化很慢，相同参数的查询可以直接复用结果。
+ResultCache 是按字节数限制大小的 TTL + LRU 缓存；CachedSession
+包装 ClientSession.call_tool，并对并发的相同请求做单飞合并
+（同一时刻只向服务器发送一次）。
+"""
+
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Callable, Dict, Optional, Tuple
+
+if TYPE_CHECKING:
+    # 只用于类型注解；命令行从缓存直接输出时不需要加载 mcp
+    from mcp.types import CallToolResult
+
+# 默认可缓存的工具及其 TTL（秒）
+DEFAULT_TOOL_TTLS: Dict[str, float] = {
+    "search_drug_labels": 3600.0,
+    "get_drug_warnings": 3600.0,
+    "get_drug_adverse_reactions": 3600.0,
+    "get_drug_indications": 3600.0,
+}
+
+# 每个条目在内容之外的估算开销（字节）
+_ENTRY_OVERHEAD = 256
+
+
+def cache_key(name: str, arguments: Optional[Dict[str, Any]], server: Optional[str] = None) -> str:
+    """
+    工具名称 + 服务器（可选）+ 规范化 JSON 参数
+
+    缓存在多个服务器之间共享（例如磁盘缓存）时必须传入 server，
+    否则一个服务器的结果会被当成另一个服务器的结果返回。
+    """
+    canonical = json.dumps(
+        arguments or {}, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    )
+    if server is None:
+        return f"{name}\x00{canonical}"
+    return f"{name}\x00{server}\x00{canonical}"
+
+
+def server_identity(transport: str, url: str, headers: Optional[Dict[str, str]] = None) -> str:
+    """
+    缓存键中的服务器标识：传输类型 + URL + 请求头摘要
+
+    不同的请求头（例如不同用户的认证头）可能看到不同的工具和结果；
+    请求头可能包含凭据，缓存文件里只保存摘要。
+    """
+    identity = f"{transport}:{url}"
+    if headers:
+        canonical = json.dumps(sorted(headers.items()), separators=(",", ":"), ensure_ascii=False)
+        identity += "#" + hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+    return identity
+
+
+def server_cache_id(config: Any) -> str:
+    """ServerConfig 在缓存键中的标识（见 server_identity）"""
+    return server_identity(config.transport, config.url, config.header_dict)
+
+
+def result_size(result: "CallToolResult") -> int:
+    """估算结果占用的字节数（只统计文本和二进制内容）"""
+    size = _ENTRY_OVERHEAD
+    for content in result.content:
+        text = getattr(content, "text", None)
+        if text is not None:
+            size += len(text)
+            continue
+        data = getattr(content, "data", None)
+        if data is not None:
+            size += len(data)
+    return size
+
+
+@dataclass
+class CacheStats:
+    """缓存计数器"""
+
+    hits: int = 0
+    misses: int = 0
+    coalesced: int = 0
+    store_hits: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class ResultCache:
+    """
+    TTL + LRU 缓存
+
+    max_bytes 按 result_size 估算的大小限制总容量，超出时从最久未使用的条目开始淘汰。
+    返回的 CallToolResult 是缓存中的同一个对象，调用方不应修改它。
+    """
+
+    def __init__(
+        self,
+        max_bytes: int = 64 * 1024 * 1024,
+        tool_ttls: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.max_bytes = max_bytes
+        self.tool_ttls = dict(DEFAULT_TOOL_TTLS if tool_ttls is None else tool_ttls)
+        self.stats = CacheStats()
+        self._clock = clock
+        # key -> (过期时间, 大小, 结果)
+        self._entries: "OrderedDict[str, Tuple[float, int, CallToolResult]]" = OrderedDict()
+        self._bytes = 0
+
+    def ttl_for(self, name: str) -> float:
+        """工具的 TTL，0 表示不缓存"""
+        return self.tool_ttls.get(name, 0.0)
+
+    def get(self, key: str) -> Optional["CallToolResult"]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, size, result = entry
+        if expires_at <= self._clock():
+            self._remove(key)
+            self.stats.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return result
+
+    def put(self, key: str, result: "CallToolResult", ttl: float) -> None:
+        size = result_size(result)
+        if ttl <= 0 or size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (self._clock() + ttl, size, result)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.stats.evictions += 1
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """清除指定工具（或全部）的缓存"""
+        if name is None:
+            self._entries.clear()
+            self._bytes = 0
+            return
+        prefix = f"{name}\x00"
+        for key in [k for k in self._entries if k.startswith(prefix)]:
+            self._remove(key)
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+
+class CachedSession:
+    """
+    带结果缓存的会话包装
+
+    call_tool 先查缓存；未命中时向服务器发送请求，并让同时到达的
+    相同请求共享这一次调用（发起请求的调用被取消时，由一个等待者重新发送）。
+    isError 的结果不会被缓存。
+    传入 store（例如 DiskCache）时作为内存缓存之下的第二级缓存，
+    进程重启后仍然有效。server 作为缓存键的一部分，缓存或 store
+    被多个服务器的会话共享时用来区分结果（见 server_cache_id）。
+    其他属性和方法直接转发给被包装的会话。
+    """
+
+    def __init__(
+        self,
+        session: Any,
+        cache: Optional[ResultCache] = None,
+        store: Optional[Any] = None,
+        server: Optional[str] = None,
+    ):
+        self.session = session
+        self.cache = cache if cache is not None else ResultCache()
+        self.store = store
+        self.server = server
+        self._in_flight: Dict[str, asyncio.Future] = {}
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> "CallToolResult":
+        ttl = self.cache.ttl_for(name)
+        if ttl <= 0:
+            return await self.session.call_tool(name, arguments=arguments, **kwargs)
+
+        key = cache_key(name, arguments, self.server)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.stats.hits += 1
+            return cached
+
+        if self.store is not None:
+            stored = self.store.get(key)
+            if stored is not None:
+                self.cache.stats.store_hits += 1
+                self.cache.put(key, stored, min(ttl, self.store.remaining_ttl(key)))
+                return stored
+
+        pending = self._in_flight.get(key)
+        if pending is not None:
+            self.cache.stats.coalesced += 1
+        while pending is not None:
+            # 本调用被取消时 asyncio.wait 抛出 CancelledError 且不取消 pending；
+            # pending 被取消时正常返回，两种情况不需要 Task.cancelling（3.11+）区分
+            await asyncio.wait({pending})
+            if not pending.cancelled():
+                return pending.result()
+            # 发起请求的调用被取消了：由第一个醒来的等待者重新发送，其余的等待它
+            pending = self._in_flight.get(key)
+
+        self.cache.stats.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        # 没有等待者时也要取走异常，避免 "exception was never retrieved"
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._in_flight[key] = future
+        try:
+            result = await self.session.call_tool(name, arguments=arguments, **kwargs)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            del self._in_flight[key]
+
+        if not result.isError:
+            self.cache.put(key, result, ttl)
+            if self.store is not None:
+                self.store.put(key, result, ttl)
+        future.set_result(result)
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
@@ -0,0 +1,388 @@
+"""
+ae_pipeline_rag 的语义缓存
+
+ae_pipeline_rag 是最慢的工具，而分析人员经常用不同的措辞问同一个问题，
+例如 "cardiovascular side effects" 和 "heart-related side effects"。
+ResultCache 按参数的 JSON 精确匹配，这里按药品分组，对 query 做规范化：
+    - 小写、分词、去掉停用词（what / the / related ...；why / when / how 等疑问词保留）
+    - 轻量词干化（effects -> effect，increased -> increas）
+    - 同义词和短语归一（heart / cardiovascular -> cardiac，
+      side effect / adverse reaction -> adverse）
+规范化后的词集合相同即视为同一个问题（相似度 1.0）。
+similarity="tfidf" 或 "hashing" 时，词集合不同的问题按余弦相似度匹配，
+超过 threshold 时返回缓存的回答：
+    - tfidf: 以同一药品已缓存的问题为语料计算 IDF
+    - hashing: 词和字符三元组哈希到固定维度，对拼写差异更宽容
+全部在本地计算，不依赖网络模型。
+
+top_k 较大的回答基于更多检索结果，可以用来回答 top_k 较小的同一问题；
+反过来不行。命中时返回的 CallToolResult 是副本，_meta["semantic_cache"]
+中记录相似度、缓存的原始问题和 top_k。
+
+用法:
+    session = SemanticCachedSession(raw_session, SemanticCache(similarity="tfidf"))
+    result = await session.call_tool("ae_pipeline_rag", {"drug": "ibuprofen", "query": "...", "top_k": 3})
+    print((result.meta or {}).get("semantic_cache"))
+"""
+
+import json
+import math
+import re
+import time
+import zlib
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from .result_cache import result_size
+
+if TYPE_CHECKING:
+    from mcp.types import CallToolResult
+
+RAG_TOOL = "ae_pipeline_rag"
+TFIDF = "tfidf"
+HASHING = "hashing"
+
+# 英文单词、数字，或单个汉字
+_TOKEN = re.compile(r"[a-z0-9]+|[一-鿿]")
+
+# why / when / how / which / who（为 / 何 / 怎 / 哪）不是停用词："why does X cause
+# bleeding" 和 "when does X cause bleeding" 是不同的问题，不能共用回答
+STOP_WORDS = frozenset("""
+    a about an and any are as associated at be been being by can concerning could
+    do does drug drugs during for from has have i in into is it its main me
+    medication medications medicine of on or please regarding related should tell
+    that the their there these this to was what while will with would you
+    的 了 吗 呢 是 有 些 什 么 和 与
+""".split())
+
+# 同义词 -> 概念（键按原词书写，构造时词干化）
+SYNONYMS: Dict[str, str] = {
+    "heart": "cardiac",
+    "cardiac": "cardiac",
+    "cardiovascular": "cardiac",
+    "cardio": "cardiac",
+    "liver": "hepatic",
+    "hepatic": "hepatic",
+    "kidney": "renal",
+    "renal": "renal",
+    "stomach": "gastrointestinal",
+    "gastric": "gastrointestinal",
+    "gi": "gastrointestinal",
+    "gastrointestinal": "gastrointestinal",
+    "bleeding": "hemorrhage",
+    "hemorrhage": "hemorrhage",
+    "haemorrhage": "hemorrhage",
+    "pregnant": "pregnancy",
+    "pregnancy": "pregnancy",
+    "child": "pediatric",
+    "children": "pediatric",
+    "pediatric": "pediatric",
+    "paediatric": "pediatric",
+}
+
+# 多词短语 -> 概念
+PHRASES: Dict[Tuple[str, ...], str] = {
+    ("side", "effect"): "adverse",
+    ("adverse", "effect"): "adverse",
+    ("adverse", "reaction"): "adverse",
+    ("adverse", "event"): "adverse",
+    ("heart", "attack"): "infarction",
+    ("myocardial", "infarction"): "infarction",
+}
+
+
+def stem(word: str) -> str:
+    """轻量的后缀剥离；只处理 ASCII 单词，结果至少保留 3 个字符"""
+    if len(word) <= 3 or not word.isascii():
+        return word
+    for suffix, replacement in (("ies", "y"), ("sses", "ss"), ("ing", ""), ("ed", ""), ("ly", "")):
+        if word.endswith(suffix) and len(word) - len(suffix) + len(replacement) >= 3:
+            word = word[:len(word) - len(suffix)] + replacement
+            break
+    else:
+        if word.endswith("s") and not word.endswith(("ss", "us", "is")) and len(word) > 4:
+            word = word[:-1]
+    if word.endswith("e") and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+class QueryNormalizer:
+    """把问题转换成规范化的词序列"""
+
+    def __init__(
+        self,
+        synonyms: Optional[Dict[str, str]] = None,
+        phrases: Optional[Dict[Tuple[str, ...], str]] = None,
+        stop_words: Iterable[str] = STOP_WORDS,
+    ):
+        self.stop_words = frozenset(stop_words)
+        self.synonyms = {stem(word): concept for word, concept in (SYNONYMS if synonyms is None else synonyms).items()}
+        self.phrases = {
+            tuple(stem(word) for word in words): concept
+            for words, concept in (PHRASES if phrases is None else phrases).items()
+        }
+        self._longest = max((len(words) for words in self.phrases), default=1)
+
+    def __call__(self, query: str) -> Tuple[str, ...]:
+        words = [stem(word) for word in _TOKEN.findall(query.lower()) if word not in self.stop_words]
+        tokens: List[str] = []
+        i = 0
+        while i < len(words):
+            for n in range(min(self._longest, len(words) - i), 1, -1):
+                concept = self.phrases.get(tuple(words[i:i + n]))
+                if concept is not None:
+                    tokens.append(concept)
+                    i += n
+                    break
+            else:
+                tokens.append(self.synonyms.get(words[i], words[i]))
+                i += 1
+        return tuple(tokens)
+
+
+def _cosine(a: Dict[Any, float], b: Dict[Any, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    dot = sum(weight * b.get(key, 0.0) for key, weight in a.items())
+    norm = math.sqrt(sum(w * w for w in a.values()) * sum(w * w for w in b.values()))
+    return dot / norm if norm else 0.0
+
+
+def hashing_vector(tokens: Iterable[str], dim: int = 1 << 16) -> Dict[int, float]:
+    """词和字符三元组的哈希向量（crc32，跨进程稳定）"""
+    vector: Dict[int, float] = {}
+    for token in tokens:
+        features = [token] + [f"#{token}#"[i:i + 3] for i in range(len(token))]
+        for feature in features:
+            index = zlib.crc32(feature.encode("utf-8")) % dim
+            vector[index] = vector.get(index, 0.0) + (1.0 if feature == token else 0.5)
+    return vector
+
+
+@dataclass
+class SemanticCacheStats:
+    """语义缓存计数器"""
+
+    exact_hits: int = 0
+    similar_hits: int = 0
+    # 由 top_k 更大的回答提供
+    subsumed_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+
+    @property
+    def hits(self) -> int:
+        return self.exact_hits + self.similar_hits
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+@dataclass
+class _Entry:
+    query: str
+    tokens: Tuple[str, ...]
+    top_k: int
+    expires_at: float
+    size: int
+    result: "CallToolResult"
+    vector: Dict[Any, float] = field(default_factory=dict)
+
+
+# (药品, 其他参数的 JSON)
+_Group = Tuple[str, str]
+# (规范化词集合, top_k)
+_EntryKey = Tuple[Tuple[str, ...], int]
+
+
+class SemanticCache:
+    """
+    按药品分组的 ae_pipeline_rag 回答缓存
+
+    similarity 为 None 时只匹配规范化后相同的问题；max_bytes 按
+    result_size 限制总容量，超出时淘汰最久未使用的回答。
+    """
+
+    def __init__(
+        self,
+        tool: str = RAG_TOOL,
+        similarity: Optional[str] = None,
+        threshold: float = 0.85,
+        ttl: float = 3600.0,
+        max_bytes: int = 16 * 1024 * 1024,
+        default_top_k: int = 3,
+        normalizer: Optional[QueryNormalizer] = None,
+        dim: int = 1 << 16,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        if similarity not in (None, TFIDF, HASHING):
+            raise ValueError(f"未知的相似度类型: {similarity}（可选 {TFIDF} / {HASHING}）")
+        self.tool = tool
+        self.similarity = similarity
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.default_top_k = default_top_k
+        self.normalize = normalizer if normalizer is not None else QueryNormalizer()
+        self.dim = dim
+        self.stats = SemanticCacheStats()
+        self._clock = clock
+        self._groups: Dict[_Group, Dict[_EntryKey, _Entry]] = {}
+        # 每个药品分组中各个词出现在多少个问题里（tfidf 的 IDF）
+        self._df: Dict[_Group, Counter] = {}
+        self._lru: "OrderedDict[Tuple[_Group, _EntryKey], None]" = OrderedDict()
+        self._bytes = 0
+
+    def _parse(self, arguments: Optional[Dict[str, Any]]) -> Tuple[_Group, Tuple[str, ...], int]:
+        arguments = dict(arguments or {})
+        drug = str(arguments.pop("drug", "")).strip().lower()
+        query = str(arguments.pop("query", ""))
+        top_k = int(arguments.pop("top_k", None) or self.default_top_k)
+        others = json.dumps(arguments, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+        return (drug, others), self.normalize(query), top_k
+
+    def _vector(self, group: _Group, tokens: Tuple[str, ...]) -> Dict[Any, float]:
+        if self.similarity == HASHING:
+            return hashing_vector(tokens, self.dim)
+        df = self._df.get(group, Counter())
+        n = len(self._groups.get(group, ()))
+        counts = Counter(tokens)
+        return {token: count * (math.log((1 + n) / (1 + df[token])) + 1.0) for token, count in counts.items()}
+
+    def lookup(self, arguments: Optional[Dict[str, Any]]) -> Optional["CallToolResult"]:
+        """查找能回答这个问题的缓存结果（带 _meta["semantic_cache"]），没有时返回 None"""
+        group, tokens, top_k = self._parse(arguments)
+        entries = self._groups.get(group)
+        if not entries:
+            self.stats.misses += 1
+            return None
+        key = tuple(sorted(set(tokens)))
+        now = self._clock()
+        vector = None
+        best: Optional[Tuple[float, int, _EntryKey]] = None
+        for entry_key, entry in list(entries.items()):
+            if entry.expires_at <= now:
+                self._remove(group, entry_key)
+                self.stats.expirations += 1
+                continue
+            if entry.top_k < top_k:
+                continue
+            if entry_key[0] == key:
+                score = 1.0
+            elif self.similarity is None:
+                continue
+            else:
+                if vector is None:
+                    vector = self._vector(group, tokens)
+                entry_vector = entry.vector if self.similarity == HASHING else self._vector(group, entry.tokens)
+                score = _cosine(vector, entry_vector)
+            # 相似度相同时优先 top_k 最接近的回答
+            if score >= self.threshold and (best is None or (score, -entry.top_k) > (best[0], -best[1])):
+                best = (score, entry.top_k, entry_key)
+        if best is None:
+            self.stats.misses += 1
+            return None
+        score, _, entry_key = best
+        entry = entries[entry_key]
+        self._lru.move_to_end((group, entry_key))
+        if score < 1.0:
+            self.stats.similar_hits += 1
+        else:
+            self.stats.exact_hits += 1
+        if entry.top_k > top_k:
+            self.stats.subsumed_hits += 1
+        meta = dict(entry.result.meta or {})
+        meta["semantic_cache"] = {
+            "similarity": round(score, 4),
+            "cached_query": entry.query,
+            "cached_top_k": entry.top_k,
+            "requested_top_k": top_k,
+        }
+        return entry.result.model_copy(update={"meta": meta})
+
+    def put(self, arguments: Optional[Dict[str, Any]], result: "CallToolResult") -> None:
+        size = result_size(result)
+        if result.isError or self.ttl <= 0 or size > self.max_bytes:
+            return
+        group, tokens, top_k = self._parse(arguments)
+        entry_key = (tuple(sorted(set(tokens))), top_k)
+        if entry_key in self._groups.get(group, {}):
+            self._remove(group, entry_key)
+        entry = _Entry(
+            query=str((arguments or {}).get("query", "")),
+            tokens=tokens,
+            top_k=top_k,
+            expires_at=self._clock() + self.ttl,
+            size=size,
+            result=result,
+        )
+        if self.similarity == HASHING:
+            entry.vector = hashing_vector(tokens, self.dim)
+        self._groups.setdefault(group, {})[entry_key] = entry
+        self._df.setdefault(group, Counter()).update(set(tokens))
+        self._lru[(group, entry_key)] = None
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            oldest_group, oldest_key = next(iter(self._lru))
+            self._remove(oldest_group, oldest_key)
+            self.stats.evictions += 1
+
+    def _remove(self, group: _Group, entry_key: _EntryKey) -> None:
+        entries = self._groups[group]
+        entry = entries.pop(entry_key)
+        del self._lru[(group, entry_key)]
+        self._bytes -= entry.size
+        df = self._df[group]
+        df.subtract(set(entry.tokens))
+        if not entries:
+            del self._groups[group]
+            del self._df[group]
+
+    def invalidate(self, drug: Optional[str] = None) -> None:
+        """清除指定药品（或全部）的缓存"""
+        for group, entry_key in list(self._lru):
+            if drug is None or group[0] == drug.strip().lower():
+                self._remove(group, entry_key)
+
+    def __len__(self) -> int:
+        return len(self._lru)
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+
+class SemanticCachedSession:
+    """
+    带语义缓存的会话包装
+
+    只处理 cache.tool（默认 ae_pipeline_rag）且没有额外参数的调用；
+    其他调用和属性直接转发给被包装的会话。isError 的结果不会被缓存。
+    """
+
+    def __init__(self, session: Any, cache: Optional[SemanticCache] = None):
+        self.session = session
+        self.cache = cache if cache is not None else SemanticCache()
+
+    async def call_tool(
+        self,
+        name: str,
+        arguments: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> "CallToolResult":
+        if name != self.cache.tool or kwargs:
+            return await self.session.call_tool(name, arguments=arguments, **kwargs)
+        cached = self.cache.lookup(arguments)
+        if cached is not None:
+            return cached
+        result = await self.session.call_tool(name, arguments=arguments)
+        self.cache.put(arguments, result)
+        return result
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.session, name)
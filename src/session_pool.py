@@ -0,0 +1,235 @@
+"""
+MCP 会话池
+
+为每个 (url, headers, 传输类型) 保持若干个已完成 initialize 握手的会话，
+通过异步上下文管理器借出和归还，避免每次调用都重新建立
+TCP/TLS 连接并重复握手。空闲会话在借出前做健康检查（ping），
+损坏的会话会被丢弃并按需重建。
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Optional
+
+import anyio
+import httpx
+from mcp import ClientSession
+from mcp.shared.exceptions import McpError
+from mcp.types import InitializeResult
+
+from .transports import ServerConfig, open_transport
+
+# 新版本 SDK 在连接断开时以该错误码结束在途请求（mcp.types.CONNECTION_CLOSED）
+_CONNECTION_CLOSED = -32000
+
+
+# 传输层的异常；其他异常（服务器返回的错误、结果校验失败、程序错误）重连也不会成功
+_CONNECTION_ERRORS = (
+    httpx.TransportError,
+    anyio.ClosedResourceError,
+    anyio.BrokenResourceError,
+    ConnectionError,
+)
+
+
+def is_connection_error(error: BaseException) -> bool:
+    """连接层面的失败；服务器返回的 JSON-RPC 错误不算"""
+    if isinstance(error, McpError):
+        return error.error.code == _CONNECTION_CLOSED
+    exceptions = getattr(error, "exceptions", None)
+    if isinstance(exceptions, tuple) and exceptions:
+        # 传输的任务组可能把连接错误包在异常组中（Python 3.10 上是 exceptiongroup 的实现）
+        return all(is_connection_error(e) for e in exceptions)
+    return isinstance(error, _CONNECTION_ERRORS)
+
+
+class PooledSession:
+    """
+    池中的单个会话
+
+    传输和 ClientSession 都在独立的后台任务中打开和关闭，
+    因为 anyio 的任务组要求在同一个任务里进入和退出。
+    initialize=False 用于接续服务器上已初始化的 StreamableHTTP 会话。
+    """
+
+    def __init__(self, config: ServerConfig, initialize: bool = True):
+        self.config = config
+        self.initialize = initialize
+        self.session: Optional[ClientSession] = None
+        self.init_result: Optional[InitializeResult] = None
+        self.get_session_id = lambda: None
+        self.last_used = time.monotonic()
+        self.broken = False
+        self._ready = asyncio.Event()
+        self._closing = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._error: Optional[BaseException] = None
+
+    async def start(self) -> None:
+        """打开传输并完成 initialize 握手"""
+        self._task = asyncio.create_task(self._run())
+        await self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    async def _run(self) -> None:
+        try:
+            async with open_transport(self.config) as (read, write, get_session_id):
+                async with ClientSession(read, write) as session:
+                    if self.initialize:
+                        self.init_result = await session.initialize()
+                    self.session = session
+                    self.get_session_id = get_session_id
+                    self._ready.set()
+                    await self._closing.wait()
+        except Exception as e:
+            self._error = e
+        finally:
+            self.broken = True
+            self.session = None
+            self._ready.set()
+
+    async def ping(self, timeout: float) -> bool:
+        """健康检查，失败时把会话标记为损坏"""
+        if self.broken or self.session is None:
+            return False
+        try:
+            await asyncio.wait_for(self.session.send_ping(), timeout)
+            return True
+        except Exception:
+            self.broken = True
+            return False
+
+    async def wait_closed(self) -> None:
+        """等待连接结束（断开或被关闭）"""
+        if self._task is not None:
+            await asyncio.shield(self._task)
+
+    async def close(self) -> None:
+        self._closing.set()
+        if self._task is not None:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+
+class _Slot:
+    """单个服务器配置的空闲会话列表和并发上限"""
+
+    def __init__(self, max_size: int):
+        self.idle: List[PooledSession] = []
+        self.limit = asyncio.Semaphore(max_size)
+        self.created = 0
+        self.replaced = 0
+
+
+class SessionPool:
+    """
+    按服务器配置复用已初始化的 MCP 会话
+
+    用法:
+        async with SessionPool(max_size=4) as pool:
+            async with pool.session(config) as session:
+                await session.call_tool(...)
+    """
+
+    def __init__(
+        self,
+        max_size: int = 4,
+        health_check_interval: float = 30.0,
+        ping_timeout: float = 5.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size 必须大于 0")
+        self.max_size = max_size
+        self.health_check_interval = health_check_interval
+        self.ping_timeout = ping_timeout
+        self._slots: Dict[ServerConfig, _Slot] = {}
+        self._leased: List[PooledSession] = []
+        self._closed = False
+
+    def _slot(self, config: ServerConfig) -> _Slot:
+        if config not in self._slots:
+            self._slots[config] = _Slot(self.max_size)
+        return self._slots[config]
+
+    async def _connect(self, config: ServerConfig) -> PooledSession:
+        pooled = PooledSession(config)
+        await pooled.start()
+        self._slot(config).created += 1
+        return pooled
+
+    async def warm(self, config: ServerConfig, count: Optional[int] = None) -> None:
+        """预先建立 count 个会话（默认填满 max_size）"""
+        slot = self._slot(config)
+        count = self.max_size if count is None else min(count, self.max_size)
+        missing = count - len(slot.idle)
+        if missing > 0:
+            sessions = await asyncio.gather(*(self._connect(config) for _ in range(missing)))
+            slot.idle.extend(sessions)
+
+    async def _checkout(self, config: ServerConfig) -> PooledSession:
+        slot = self._slot(config)
+        while slot.idle:
+            pooled = slot.idle.pop()
+            if pooled.broken:
+                slot.replaced += 1
+                await pooled.close()
+                continue
+            idle_for = time.monotonic() - pooled.last_used
+            if idle_for > self.health_check_interval and not await pooled.ping(self.ping_timeout):
+                slot.replaced += 1
+                await pooled.close()
+                continue
+            return pooled
+        return await self._connect(config)
+
+    @asynccontextmanager
+    async def session(self, config: ServerConfig) -> AsyncIterator[ClientSession]:
+        """借出一个已初始化的会话，退出时归还"""
+        if self._closed:
+            raise RuntimeError("SessionPool 已关闭")
+        slot = self._slot(config)
+        async with slot.limit:
+            pooled = await self._checkout(config)
+            self._leased.append(pooled)
+            try:
+                yield pooled.session
+            except BaseException as e:
+                # 只有连接层面的失败才丢弃会话；服务器返回的 JSON-RPC 错误、调用超过截止时间、
+                # 调用方取消请求或调用方自己的异常都不影响会话。
+                # 超时的请求已由 DeadlineSession 在这个会话上通知服务器取消
+                if is_connection_error(e):
+                    pooled.broken = True
+                raise
+            finally:
+                self._leased.remove(pooled)
+                pooled.last_used = time.monotonic()
+                if pooled.broken or self._closed:
+                    await pooled.close()
+                else:
+                    slot.idle.append(pooled)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        """每个服务器的空闲、新建和替换会话数"""
+        return {
+            f"{config.transport}:{config.url}": {
+                "idle": len(slot.idle),
+                "created": slot.created,
+                "replaced": slot.replaced,
+            }
+            for config, slot in self._slots.items()
+        }
+
+    async def close(self) -> None:
+        """关闭所有空闲会话；借出中的会话在归还时关闭"""
+        self._closed = True
+        idle = [pooled for slot in self._slots.values() for pooled in slot.idle]
+        for slot in self._slots.values():
+            slot.idle.clear()
+        await asyncio.gather(*(pooled.close() for pooled in idle))
+
+    async def __aenter__(self) -> "SessionPool":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
@@ -5,12 +5,14 @@ SSE MCP 客户端示例
 演示如何连接 SSE 类型的 MCP 服务器（通过 HTTP）
 """
 
-import asyncio
 import json
 
 from mcp import ClientSession
 from mcp.client.sse import sse_client
 
+from .catalog import DEFAULT_CATALOG_PATH, CatalogCache
+from .http_pool import run_with_http_pool, shared_client_factory
+
 
 async def connect_openfda_mcp():
     """连接 OpenFDA MCP 服务器"""
@@ -27,19 +29,34 @@ async def connect_openfda_mcp():
     print(f"📡 正在连接到: {server_url}")
     print()
     
+    # 目录缓存：只有服务器通知 list_changed 或超过 TTL 时才重新获取列表
+    catalog_cache = CatalogCache(path=DEFAULT_CATALOG_PATH)
+    
     try:
         # 连接 SSE MCP 服务器
         async with sse_client(
             url=server_url,
             headers=headers,
             timeout=10.0,  # HTTP 超时（秒）
-            sse_read_timeout=300.0  # SSE 读取超时（秒）
+            sse_read_timeout=300.0,  # SSE 读取超时（秒）
+            httpx_client_factory=shared_client_factory  # 共享连接池
         ) as (read, write):
-            async with ClientSession(read, write) as session:
+            async with ClientSession(
+                read,
+                write,
+                message_handler=catalog_cache.message_handler(server_url)
+            ) as session:
                 # 初始化会话
                 init_result = await session.initialize()
                 print("✅ 已连接到 OpenFDA MCP 服务器\n")
                 
+                catalog = await catalog_cache.get(session, server_url, init_result)
+                if catalog.timings:
+                    timings = ", ".join(f"{kind} {elapsed:.2f}s" for kind, elapsed in catalog.timings.items())
+                    print(f"⏱️  目录获取耗时: {timings}\n")
+                for kind, error in catalog.errors.items():
+                    print(f"⚠️  获取 {kind} 列表失败: {type(error).__name__}: {error}\n")
+                
                 # ==========================================
                 # 1. 获取服务器信息
                 # ==========================================
@@ -54,10 +71,8 @@ async def connect_openfda_mcp():
                 # 2. 列出可用的工具
                 # ==========================================
                 print("🔧 可用工具列表:")
-                tools_list = await session.list_tools()
-                
-                if tools_list.tools:
-                    for i, tool in enumerate(tools_list.tools, 1):
+                if catalog.tools:
+                    for i, tool in enumerate(catalog.tools, 1):
                         print(f"\n{i}. {tool.name}")
                         if tool.description:
                             print(f"   描述: {tool.description}")
@@ -83,20 +98,17 @@ async def connect_openfda_mcp():
                 # 3. 列出可用的资源（如果服务器支持）
                 # ==========================================
                 print("📦 可用资源列表:")
-                try:
-                    resources_list = await session.list_resources()
-                    
-                    if resources_list.resources:
-                        for i, resource in enumerate(resources_list.resources, 1):
-                            print(f"   {i}. {resource.uri}")
-                            if hasattr(resource, 'name') and resource.name:
-                                print(f"      名称: {resource.name}")
-                            if hasattr(resource, 'description') and resource.description:
-                                print(f"      描述: {resource.description}")
-                    else:
-                        print("   (没有可用资源)")
-                except Exception as e:
-                    print(f"   (服务器不支持资源功能: {e})")
+                if catalog.resources is None:
+                    print("   (服务器不支持资源功能)")
+                elif catalog.resources:
+                    for i, resource in enumerate(catalog.resources, 1):
+                        print(f"   {i}. {resource.uri}")
+                        if hasattr(resource, 'name') and resource.name:
+                            print(f"      名称: {resource.name}")
+                        if hasattr(resource, 'description') and resource.description:
+                            print(f"      描述: {resource.description}")
+                else:
+                    print("   (没有可用资源)")
                 
                 print()
                 
@@ -104,25 +116,22 @@ async def connect_openfda_mcp():
                 # 4. 列出可用的提示词（如果服务器支持）
                 # ==========================================
                 print("💬 可用提示词列表:")
-                try:
-                    prompts_list = await session.list_prompts()
-                    
-                    if prompts_list.prompts:
-                        for i, prompt in enumerate(prompts_list.prompts, 1):
-                            print(f"   {i}. {prompt.name}")
-                            if hasattr(prompt, 'description') and prompt.description:
-                                print(f"      描述: {prompt.description}")
-                    else:
-                        print("   (没有可用提示词)")
-                except Exception as e:
-                    print(f"   (服务器不支持提示词功能: {e})")
+                if catalog.prompts is None:
+                    print("   (服务器不支持提示词功能)")
+                elif catalog.prompts:
+                    for i, prompt in enumerate(catalog.prompts, 1):
+                        print(f"   {i}. {prompt.name}")
+                        if hasattr(prompt, 'description') and prompt.description:
+                            print(f"      描述: {prompt.description}")
+                else:
+                    print("   (没有可用提示词)")
                 
                 print()
                 
                 # ==========================================
                 # 5. 演示调用工具：搜索阿司匹林的药品标签
                 # ==========================================
-                if tools_list.tools:
+                if catalog.tools:
                     print("🎯 演示：调用工具搜索阿司匹林（aspirin）")
                     print()
                     
@@ -164,7 +173,7 @@ async def connect_openfda_mcp():
 def main():
     """主函数"""
     try:
-        asyncio.run(connect_openfda_mcp())
+        run_with_http_pool(connect_openfda_mcp())
     except KeyboardInterrupt:
         print("\n\n⚠️  用户中断")
     except Exception as e:
@@ -6,13 +6,41 @@ StreamableHTTP MCP 客户端示例
 使用用户提供的 FDA MCP 服务器配置
 """
 
-import asyncio
 import json
+from contextlib import AsyncExitStack
 from typing import Dict, Any, Optional
 
 from mcp import ClientSession
 from mcp.client.streamable_http import streamablehttp_client
 
+from .arg_schema import tool_arguments
+from .catalog import DEFAULT_CATALOG_PATH, CatalogCache
+from .http_pool import run_with_http_pool, shared_client_factory
+from .instrumentation import InstrumentedSession, LoopLagMonitor, Metrics
+from .offload import THREAD, Offload
+from .pipeline import PipelinedSession
+from .session_pool import SessionPool
+from .transports import ServerConfig
+
+# FDA StreamableHTTP MCP 服务器（会话池使用）
+FDA_SERVER = ServerConfig.from_dict({
+    "url": "http://fda.sitmcp.kaleido.guru/mcp",
+    "headers": {
+        "emcp-key": "ovgTH2LxJozKlpmGNmeHOOUtYm71NMZJ",
+        "emcp-usercode": "2DebiJQI"
+    },
+    "type": "streamableHttp"
+})
+
+# 已知工具的演示参数；search_drug_labels 只提供必要参数，避免 count 和 skip 冲突
+DEMO_ARGUMENTS: Dict[str, Dict[str, Any]] = {
+    "search_drug_labels": {"search": "aspirin", "limit": 3},
+    "get_drug_adverse_reactions": {"drug_name": "aspirin", "limit": 2},
+    "get_drug_warnings": {"drug_name": "aspirin", "limit": 2},
+    "get_drug_indications": {"drug_name": "aspirin", "limit": 2},
+    "ae_pipeline_rag": {"drug": "aspirin", "query": "What are the main side effects?", "top_k": 3},
+}
+
 
 async def connect_fda_streamable_http():
     """连接 FDA StreamableHTTP MCP 服务器"""
@@ -38,15 +66,30 @@ async def connect_fda_streamable_http():
     print(f"🔑 认证头: emcp-key=***{headers['emcp-key'][-4:]}, emcp-usercode={headers['emcp-usercode']}")
     print()
     
+    # 目录缓存：只有服务器通知 list_changed 或超过 TTL 时才重新获取列表
+    catalog_cache = CatalogCache(path=DEFAULT_CATALOG_PATH)
+    
     try:
         # 连接 StreamableHTTP MCP 服务器
         async with streamablehttp_client(
             url=server_url,
             headers=headers,
             timeout=30.0,  # HTTP 连接超时（秒）
-            sse_read_timeout=300.0  # SSE 读取超时（秒）
+            sse_read_timeout=300.0,  # SSE 读取超时（秒）
+            httpx_client_factory=shared_client_factory  # 共享连接池
         ) as (read, write, get_session_id):
-            async with ClientSession(read, write) as session:
+            async with ClientSession(
+                read,
+                write,
+                message_handler=catalog_cache.message_handler(server_url)
+            ) as raw_session, AsyncExitStack() as cleanup:
+                # 记录每个方法的耗时和返回数据大小
+                metrics = Metrics()
+                session = InstrumentedSession(raw_session, metrics)
+                # 结果解码放到线程池中，同时记录事件循环延迟；出错时由 cleanup 停止监控、关闭线程池
+                offload = await cleanup.enter_async_context(Offload(THREAD, metrics=metrics))
+                lag_monitor = await cleanup.enter_async_context(LoopLagMonitor(metrics))
+                
                 # ==========================================
                 # 1. 初始化会话并获取服务器信息
                 # ==========================================
@@ -72,15 +115,20 @@ async def connect_fda_streamable_http():
                         print(f"   ✓ 日志支持")
                 print()
                 
+                catalog = await catalog_cache.get(session, server_url, init_result)
+                if catalog.timings:
+                    timings = ", ".join(f"{kind} {elapsed:.2f}s" for kind, elapsed in catalog.timings.items())
+                    print(f"⏱️  目录获取耗时: {timings}\n")
+                for kind, error in catalog.errors.items():
+                    print(f"⚠️  获取 {kind} 列表失败: {type(error).__name__}: {error}\n")
+                
                 # ==========================================
                 # 2. 列出可用的工具
                 # ==========================================
                 print("🔧 可用工具列表:")
                 print("-" * 40)
-                tools_list = await session.list_tools()
-                
-                if tools_list.tools:
-                    for i, tool in enumerate(tools_list.tools, 1):
+                if catalog.tools:
+                    for i, tool in enumerate(catalog.tools, 1):
                         print(f"\n{i}. 工具名称: {tool.name}")
                         if tool.description:
                             # 处理多行描述，添加缩进
@@ -118,22 +166,19 @@ async def connect_fda_streamable_http():
                 # ==========================================
                 print("📦 可用资源列表:")
                 print("-" * 40)
-                try:
-                    resources_list = await session.list_resources()
-                    
-                    if resources_list.resources:
-                        for i, resource in enumerate(resources_list.resources, 1):
-                            print(f"{i}. URI: {resource.uri}")
-                            if hasattr(resource, 'name') and resource.name:
-                                print(f"   名称: {resource.name}")
-                            if hasattr(resource, 'description') and resource.description:
-                                print(f"   描述: {resource.description}")
-                            if hasattr(resource, 'mimeType') and resource.mimeType:
-                                print(f"   MIME类型: {resource.mimeType}")
-                    else:
-                        print("   (没有可用资源)")
-                except Exception as e:
-                    print(f"   (服务器不支持资源功能或访问失败: {e})")
+                if catalog.resources is None:
+                    print("   (服务器不支持资源功能或访问失败)")
+                elif catalog.resources:
+                    for i, resource in enumerate(catalog.resources, 1):
+                        print(f"{i}. URI: {resource.uri}")
+                        if hasattr(resource, 'name') and resource.name:
+                            print(f"   名称: {resource.name}")
+                        if hasattr(resource, 'description') and resource.description:
+                            print(f"   描述: {resource.description}")
+                        if hasattr(resource, 'mimeType') and resource.mimeType:
+                            print(f"   MIME类型: {resource.mimeType}")
+                else:
+                    print("   (没有可用资源)")
                 
                 print()
                 
@@ -142,89 +187,48 @@ async def connect_fda_streamable_http():
                 # ==========================================
                 print("💬 可用提示词列表:")
                 print("-" * 40)
-                try:
-                    prompts_list = await session.list_prompts()
-                    
-                    if prompts_list.prompts:
-                        for i, prompt in enumerate(prompts_list.prompts, 1):
-                            print(f"{i}. 名称: {prompt.name}")
-                            if hasattr(prompt, 'description') and prompt.description:
-                                print(f"   描述: {prompt.description}")
-                            if hasattr(prompt, 'arguments') and prompt.arguments:
-                                print(f"   参数:")
-                                for arg in prompt.arguments:
-                                    arg_required = getattr(arg, 'required', False)
-                                    req_mark = " [必填]" if arg_required else " [可选]"
-                                    print(f"     • {arg.name}{req_mark}")
-                                    if hasattr(arg, 'description') and arg.description:
-                                        print(f"       {arg.description}")
-                    else:
-                        print("   (没有可用提示词)")
-                except Exception as e:
-                    print(f"   (服务器不支持提示词功能或访问失败: {e})")
+                if catalog.prompts is None:
+                    print("   (服务器不支持提示词功能或访问失败)")
+                elif catalog.prompts:
+                    for i, prompt in enumerate(catalog.prompts, 1):
+                        print(f"{i}. 名称: {prompt.name}")
+                        if hasattr(prompt, 'description') and prompt.description:
+                            print(f"   描述: {prompt.description}")
+                        if hasattr(prompt, 'arguments') and prompt.arguments:
+                            print(f"   参数:")
+                            for arg in prompt.arguments:
+                                arg_required = getattr(arg, 'required', False)
+                                req_mark = " [必填]" if arg_required else " [可选]"
+                                print(f"     • {arg.name}{req_mark}")
+                                if hasattr(arg, 'description') and arg.description:
+                                    print(f"       {arg.description}")
+                else:
+                    print("   (没有可用提示词)")
                 
                 print()
                 
                 # ==========================================
                 # 5. 演示调用工具（如果有可用工具）
                 # ==========================================
-                if tools_list.tools:
+                if catalog.tools:
                     print("🎯 演示：调用第一个可用工具")
                     print("-" * 40)
                     
                     # 选择第一个工具进行演示
-                    first_tool = tools_list.tools[0]
+                    first_tool = catalog.tools[0]
                     print(f"将演示调用工具: {first_tool.name}")
                     
-                    # 构造示例参数
-                    demo_args = {}
-                    if hasattr(first_tool, 'inputSchema') and first_tool.inputSchema:
-                        schema = first_tool.inputSchema
-                        if isinstance(schema, dict) and 'properties' in schema:
-                            # 根据工具名称提供合适的参数
-                            if first_tool.name == "search_drug_labels":
-                                # 只提供必要的参数，避免 count 和 skip 冲突
-                                demo_args = {
-                                    "search": "aspirin",
-                                    "limit": 3
-                                }
-                            elif first_tool.name in ["get_drug_adverse_reactions", "get_drug_warnings", "get_drug_indications"]:
-                                # 这些工具需要 drug_name 参数
-                                demo_args = {
-                                    "drug_name": "aspirin",
-                                    "limit": 2
-                                }
-                            elif first_tool.name == "ae_pipeline_rag":
-                                # RAG 工具的参数
-                                demo_args = {
-                                    "drug": "aspirin",
-                                    "query": "What are the main side effects?",
-                                    "top_k": 3
-                                }
-                            else:
-                                # 通用参数生成逻辑（只为必填参数提供值）
-                                required_params = schema.get('required', [])
-                                for param_name in required_params:
-                                    param_info = schema['properties'].get(param_name, {})
-                                    param_type = param_info.get('type', 'string')
-                                    
-                                    if 'search' in param_name.lower() or 'query' in param_name.lower():
-                                        demo_args[param_name] = "aspirin"
-                                    elif 'drug' in param_name.lower() or 'name' in param_name.lower():
-                                        demo_args[param_name] = "aspirin"
-                                    elif 'limit' in param_name.lower():
-                                        demo_args[param_name] = 3
-                                    elif param_type == 'string':
-                                        demo_args[param_name] = "示例文本"
-                                    elif param_type == 'number' or param_type == 'integer':
-                                        demo_args[param_name] = 1
-                                    elif param_type == 'boolean':
-                                        demo_args[param_name] = True
+                    # 构造示例参数（schema 只编译一次，已知工具使用预设参数）
+                    spec = tool_arguments(first_tool)
+                    demo_args = spec.sample(DEMO_ARGUMENTS.get(first_tool.name))
                     
                     print(f"调用参数: {json.dumps(demo_args, ensure_ascii=False, indent=2)}")
                     print()
                     
                     try:
+                        # 在本地校验参数，无效时不必等服务器返回错误
+                        spec.validate(demo_args)
+                        
                         # 调用工具
                         print("⏳ 正在调用工具...")
                         result = await session.call_tool(
@@ -239,23 +243,19 @@ async def connect_fda_streamable_http():
                         if result.content:
                             for idx, content in enumerate(result.content):
                                 if hasattr(content, 'text'):
-                                    # 格式化显示文本内容
-                                    text = content.text
-                                    # 尝试解析为 JSON 以美化显示
-                                    try:
-                                        json_data = json.loads(text)
+                                    # 在执行器中解析并格式化，大结果不阻塞事件循环
+                                    preview = await offload.preview(content.text, limit=1000, text_limit=500)
+                                    if preview.kind == "json":
                                         print(f"\n内容 {idx + 1} (JSON):")
-                                        print(json.dumps(json_data, ensure_ascii=False, indent=2)[:1000])
-                                        if len(json.dumps(json_data)) > 1000:
+                                        print(preview.text)
+                                        if preview.truncated:
                                             print("... (结果已截断)")
-                                    except:
+                                    else:
                                         # 非 JSON 格式，直接显示文本
                                         print(f"\n内容 {idx + 1} (文本):")
-                                        if len(text) > 500:
-                                            print(text[:500])
-                                            print(f"... (结果太长，已截断。完整结果有 {len(text)} 字符)")
-                                        else:
-                                            print(text)
+                                        print(preview.text)
+                                        if preview.truncated:
+                                            print(f"... (结果太长，已截断。完整结果有 {preview.chars} 字符)")
                                 elif hasattr(content, 'data'):
                                     print(f"\n内容 {idx + 1} (数据):")
                                     print(content.data)
@@ -268,6 +268,15 @@ async def connect_fda_streamable_http():
                         print("\n错误详情:")
                         traceback.print_exc()
                 
+                print()
+                print("📈 调用统计:")
+                for method, stats in metrics.summary().items():
+                    print(f"   {method}: {stats['count']} 次, 平均 {stats['mean_s'] * 1000:.1f} ms")
+                await cleanup.aclose()
+                lag = metrics.loop_lag_summary()
+                if lag["samples"]:
+                    print(f"   事件循环延迟: 平均 {lag['mean_s'] * 1000:.1f} ms, 最大 {lag_monitor.max_lag * 1000:.1f} ms")
+                
                 print()
                 print("=" * 60)
                 print("✨ StreamableHTTP MCP 连接测试完成！")
@@ -290,47 +299,72 @@ async def connect_fda_streamable_http():
         traceback.print_exc()
 
 
-async def test_specific_tool(tool_name: str, arguments: Dict[str, Any]):
-    """测试特定的工具调用"""
+async def test_specific_tool(
+    tool_name: str,
+    arguments: Dict[str, Any],
+    pool: Optional[SessionPool] = None
+):
+    """
+    测试特定的工具调用
     
-    server_config = {
-        "url": "http://fda.sitmcp.kaleido.guru/mcp",
-        "headers": {
-            "emcp-key": "ovgTH2LxJozKlpmGNmeHOOUtYm71NMZJ",
-            "emcp-usercode": "2DebiJQI"
-        }
-    }
+    传入共享的 SessionPool 时复用池中已初始化的会话，
+    连续测试多个工具不会重复建立连接和握手。
+    """
     
     print(f"\n🔬 测试工具: {tool_name}")
     print(f"   参数: {json.dumps(arguments, ensure_ascii=False, indent=2)}")
     print()
     
     try:
-        async with streamablehttp_client(
-            url=server_config["url"],
-            headers=server_config["headers"],
-            timeout=30.0,
-            sse_read_timeout=300.0
-        ) as (read, write, get_session_id):
-            async with ClientSession(read, write) as session:
-                await session.initialize()
-                
-                # 调用工具
-                result = await session.call_tool(tool_name, arguments=arguments)
-                
-                print("✅ 调用成功！")
-                if result.content:
-                    for content in result.content:
-                        if hasattr(content, 'text'):
-                            print("\n返回内容:")
-                            print(content.text[:1000])
-                            if len(content.text) > 1000:
-                                print("... (已截断)")
+        if pool is None:
+            async with SessionPool(max_size=1) as own_pool:
+                result = await _call_pooled(own_pool, tool_name, arguments)
+        else:
+            result = await _call_pooled(pool, tool_name, arguments)
+        
+        print("✅ 调用成功！")
+        if result.content:
+            for content in result.content:
+                if hasattr(content, 'text'):
+                    print("\n返回内容:")
+                    print(content.text[:1000])
+                    if len(content.text) > 1000:
+                        print("... (已截断)")
                 
     except Exception as e:
         print(f"❌ 错误: {e}")
 
 
+async def _call_pooled(pool: SessionPool, tool_name: str, arguments: Dict[str, Any]):
+    """从会话池借出会话并调用工具"""
+    async with pool.session(FDA_SERVER) as session:
+        return await session.call_tool(tool_name, arguments=arguments)
+
+
+async def test_tools(calls: Dict[str, Dict[str, Any]], max_outstanding: int = 8):
+    """
+    在同一个会话上流水线测试多个工具
+
+    所有请求共用一个 mcp-session-id，不等待前一个响应就发送下一个，
+    只占用一个网关会话。
+    """
+    async with SessionPool(max_size=1) as pool:
+        async with pool.session(FDA_SERVER) as session:
+            pipeline = PipelinedSession(session, max_outstanding=max_outstanding)
+            async for item in pipeline.imap(calls.items()):
+                status = "✅" if item.ok else "❌"
+                detail = item.error if item.error is not None else _first_text(item.result)
+                print(f"{status} {item.name}: {detail}")
+            print(f"\n📊 流水线统计: {pipeline.stats()}")
+
+
+def _first_text(result: Any, limit: int = 200) -> str:
+    for content in result.content or []:
+        if hasattr(content, 'text'):
+            return content.text[:limit]
+    return ""
+
+
 def main():
     """主函数"""
     print("\n" + "=" * 60)
@@ -340,15 +374,21 @@ def main():
     
     try:
         # 运行主要的连接和测试
-        asyncio.run(connect_fda_streamable_http())
+        run_with_http_pool(connect_fda_streamable_http())
         
         # 可选：测试特定工具
         # 取消注释下面的代码来测试特定工具
-        # asyncio.run(test_specific_tool(
+        # run_with_http_pool(test_specific_tool(
         #     tool_name="search_drug_labels",
         #     arguments={"search": "ibuprofen", "limit": 2}
         # ))
         
+        # 可选：在同一个会话上流水线测试多个工具
+        # run_with_http_pool(test_tools({
+        #     "search_drug_labels": {"search": "ibuprofen", "limit": 2},
+        #     "get_drug_warnings": {"drug_name": "aspirin", "limit": 1},
+        # }))
+        
     except KeyboardInterrupt:
         print("\n\n⚠️  用户中断程序")
     except Exception as e:
@@ -0,0 +1,64 @@
+"""
+批量并发工具调用
+
+在同一个 ClientSession 上并发发送多个 call_tool 请求：
+用信号量限制同时在途的请求数，结果按输入顺序返回，
+单个调用的异常被捕获到对应的结果项中，不影响其他调用。
+"""
+
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from mcp.types import CallToolResult
+
+# (工具名称, 调用参数)
+ToolCall = Tuple[str, Dict[str, Any]]
+
+
+@dataclass
+class BatchItem:
+    """单个工具调用的结果"""
+
+    name: str
+    arguments: Dict[str, Any]
+    result: Optional[CallToolResult] = None
+    error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        """调用成功且服务器没有返回 isError"""
+        return self.error is None and self.result is not None and not self.result.isError
+
+
+async def call_tools_concurrently(
+    session: Any,
+    calls: Iterable[ToolCall],
+    max_in_flight: int = 8,
+) -> List[BatchItem]:
+    """
+    在共享会话上并发调用多个工具
+
+    Args:
+        session: 已初始化的 ClientSession（或任何提供 call_tool 的对象）
+        calls: (工具名称, 参数) 序列
+        max_in_flight: 同时在途的最大请求数
+
+    Returns:
+        与 calls 顺序一致的 BatchItem 列表
+    """
+    if max_in_flight < 1:
+        raise ValueError("max_in_flight 必须大于 0")
+
+    semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def run(name: str, arguments: Dict[str, Any]) -> BatchItem:
+        item = BatchItem(name=name, arguments=arguments)
+        async with semaphore:
+            try:
+                item.result = await session.call_tool(name, arguments=arguments)
+            except Exception as e:
+                item.error = e
+        return item
+
+    return await asyncio.gather(*(run(name, arguments) for name, arguments in calls))
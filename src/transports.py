@@ -0,0 +1,107 @@
+"""
+MCP 传输层配置
+
+统一描述 SSE / StreamableHTTP 服务器配置，并提供一个
+打开任意一种传输的异步上下文管理器。
+"""
+
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, replace
+from typing import Any, AsyncIterator, Callable, Dict, Optional, Tuple
+
+from mcp.client.sse import sse_client
+from mcp.client.streamable_http import streamablehttp_client
+
+from .http_pool import shared_client_factory
+
+SSE = "sse"
+STREAMABLE_HTTP = "streamableHttp"
+
+
+@dataclass(frozen=True)
+class ServerConfig:
+    """MCP 服务器配置，可作为字典键使用"""
+
+    url: str
+    headers: Tuple[Tuple[str, str], ...] = ()
+    transport: str = SSE
+    timeout: float = 30.0
+    sse_read_timeout: float = 300.0
+    # StreamableHTTP 关闭时是否发送 DELETE 结束服务器端会话
+    terminate_on_close: bool = True
+
+    @classmethod
+    def from_dict(cls, config: Dict[str, Any]) -> "ServerConfig":
+        """从 Cursor/Claude Desktop 风格的配置字典创建"""
+        transport = config.get("type", SSE)
+        if transport not in (SSE, STREAMABLE_HTTP):
+            raise ValueError(f"不支持的传输类型: {transport}")
+        kwargs = {}
+        for key in ("timeout", "sse_read_timeout"):
+            if key in config:
+                kwargs[key] = float(config[key])
+        return cls(
+            url=config["url"],
+            headers=tuple(sorted(config.get("headers", {}).items())),
+            transport=transport,
+            **kwargs,
+        )
+
+    @property
+    def header_dict(self) -> Dict[str, str]:
+        return dict(self.headers)
+
+    def with_headers(self, headers: Dict[str, str]) -> "ServerConfig":
+        """返回追加（或覆盖）了请求头的新配置"""
+        merged = self.header_dict
+        merged.update(headers)
+        return replace(self, headers=tuple(sorted(merged.items())))
+
+
+def request_headers(
+    config: ServerConfig,
+    session_id: Optional[str] = None,
+    protocol_version: Optional[str] = None,
+) -> Dict[str, str]:
+    """直接向 StreamableHTTP 端点 POST JSON-RPC 消息时使用的请求头"""
+    headers = {
+        **config.header_dict,
+        "accept": "application/json, text/event-stream",
+        "content-type": "application/json",
+    }
+    if session_id:
+        headers["mcp-session-id"] = session_id
+    if protocol_version:
+        headers["mcp-protocol-version"] = protocol_version
+    return headers
+
+
+@asynccontextmanager
+async def open_transport(
+    config: ServerConfig,
+) -> AsyncIterator[Tuple[Any, Any, Callable[[], Optional[str]]]]:
+    """
+    按配置打开传输
+
+    统一返回 (read, write, get_session_id)；SSE 传输没有会话 ID，
+    get_session_id 始终返回 None。两种传输共享 http_pool() 的连接池。
+    """
+    if config.transport == STREAMABLE_HTTP:
+        async with streamablehttp_client(
+            url=config.url,
+            headers=config.header_dict,
+            timeout=config.timeout,
+            sse_read_timeout=config.sse_read_timeout,
+            terminate_on_close=config.terminate_on_close,
+            httpx_client_factory=shared_client_factory,
+        ) as (read, write, get_session_id):
+            yield read, write, get_session_id
+    else:
+        async with sse_client(
+            url=config.url,
+            headers=config.header_dict,
+            timeout=config.timeout,
+            sse_read_timeout=config.sse_read_timeout,
+            httpx_client_factory=shared_client_factory,
+        ) as (read, write):
+            yield read, write, lambda: None
@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+
+from src.adaptive_limit import AdaptiveLimiter, adaptive_limiter
+
+
+def test_limiter_shared_across_event_loops():
+    limiter = adaptive_limiter("http://127.0.0.1:1/test-loops")
+
+    async def main():
+        async def call():
+            async with limiter.acquire():
+                await asyncio.sleep(0.001)
+
+        await asyncio.gather(*(call() for _ in range(8)))
+
+    asyncio.run(main())
+    samples = limiter.samples
+    asyncio.run(main())
+    assert limiter.samples == samples + 8
+    assert limiter.in_flight == 0
+
+
+def test_limit_grows_with_flat_latency():
+    limiter = AdaptiveLimiter(initial_limit=4)
+    for _ in range(50):
+        limiter.on_sample(0.01, limiter.limit)
+    assert limiter.limit > 4
+
+
+def test_limit_shrinks_with_rising_latency():
+    limiter = AdaptiveLimiter(initial_limit=32)
+    for _ in range(5):
+        limiter.on_sample(0.01, 32)
+    for _ in range(20):
+        limiter.on_sample(0.1, limiter.limit)
+    assert limiter.limit < 32
+
+
+async def _fail(limiter, error):
+    try:
+        async with limiter.acquire():
+            raise error
+    except type(error):
+        pass
+
+
+@pytest.mark.parametrize("error", [
+    asyncio.TimeoutError(),
+    httpx.ConnectError("refused"),
+    McpError(ErrorData(code=408, message="Timed out")),
+    httpx.HTTPStatusError(
+        "busy", request=httpx.Request("POST", "http://x"), response=httpx.Response(503)
+    ),
+])
+def test_overload_errors_cut_limit(error):
+    limiter = AdaptiveLimiter(initial_limit=10)
+    asyncio.run(_fail(limiter, error))
+    assert limiter.limit == 7
+    assert limiter.drops == 1
+
+
+@pytest.mark.parametrize("error", [
+    ValueError("caller bug"),
+    McpError(ErrorData(code=-32602, message="Invalid params")),
+    httpx.HTTPStatusError(
+        "missing", request=httpx.Request("POST", "http://x"), response=httpx.Response(404)
+    ),
+])
+def test_other_errors_keep_limit(error):
+    limiter = AdaptiveLimiter(initial_limit=10)
+    asyncio.run(_fail(limiter, error))
+    assert limiter.limit == 10
+    assert limiter.drops == 0
+    assert limiter.in_flight == 0
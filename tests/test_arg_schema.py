@@ -0,0 +1,92 @@
+import pytest
+from mcp.types import Tool
+
+from src import arg_schema
+from src.arg_schema import ArgumentError, ToolArguments, tool_arguments
+
+LABELS = {
+    "type": "object",
+    "properties": {
+        "search": {"type": "string", "minLength": 1},
+        "limit": {"type": "integer", "minimum": 1, "maximum": 100, "default": 10},
+        "skip": {"type": "integer", "default": 0},
+        "fields": {"type": "array", "items": {"type": "string"}, "default": []},
+        "exact": {"type": ["boolean", "null"], "default": None},
+    },
+    "required": ["search"],
+    "additionalProperties": False,
+}
+
+
+def test_build_fills_defaults():
+    spec = ToolArguments("search_drug_labels", LABELS)
+    arguments = spec.build({"search": "aspirin", "limit": 3})
+    assert arguments == {"search": "aspirin", "limit": 3, "skip": 0, "fields": []}
+    # 可变默认值每次复制
+    arguments["fields"].append("x")
+    assert spec.build({"search": "aspirin"})["fields"] == []
+    assert spec.build({"search": "aspirin"}, fill_defaults=False) == {"search": "aspirin"}
+
+
+@pytest.mark.parametrize("arguments, message", [
+    ({}, "arguments.search: 缺少必填参数"),
+    ({"search": ""}, "arguments.search: 长度不能小于 1"),
+    ({"search": "a", "limit": 0}, "arguments.limit: 不能小于 1"),
+    ({"search": "a", "limit": "3"}, "arguments.limit: 期望 integer，实际为 str"),
+    ({"search": "a", "fields": ["x", 1]}, "arguments.fields[1]: 期望 string，实际为 int"),
+    ({"search": "a", "extra": 1}, "arguments.extra: 不允许出现"),
+])
+def test_validation_errors(arguments, message):
+    with pytest.raises(ArgumentError) as info:
+        ToolArguments("search_drug_labels", LABELS).validate(arguments)
+    assert message in info.value.errors
+
+
+def test_enum_distinguishes_bool_and_number():
+    spec = ToolArguments("t", {"properties": {"n": {"enum": [1, "a"]}, "b": {"const": True}}})
+    assert spec.errors({"n": 1.0, "b": True}) == []
+    assert spec.errors({"n": True}) != []
+    assert spec.errors({"b": 1}) != []
+
+
+def test_tuple_items():
+    spec = ToolArguments("t", {"properties": {"pair": {
+        "type": "array",
+        "items": [{"type": "string"}, {"type": "integer"}],
+        "additionalItems": False,
+    }}})
+    assert spec.errors({"pair": ["a", 1]}) == []
+    assert spec.errors({"pair": [1, "a"]}) == [
+        "arguments.pair[0]: 期望 string，实际为 int",
+        "arguments.pair[1]: 期望 integer，实际为 str",
+    ]
+    assert spec.errors({"pair": ["a", 1, 2]}) == ["arguments.pair[2]: 不允许出现"]
+
+
+def test_prefix_items():
+    spec = ToolArguments("t", {"properties": {"row": {
+        "prefixItems": [{"type": "string"}], "items": {"type": "number"},
+    }}})
+    assert spec.errors({"row": ["a", 1, 2.5]}) == []
+    assert spec.errors({"row": ["a", "b"]}) == ["arguments.row[1]: 期望 number，实际为 str"]
+
+
+def test_cache_hashes_each_schema_object_once(monkeypatch):
+    calls = []
+    real_hash = arg_schema.schema_hash
+    monkeypatch.setattr(arg_schema, "schema_hash", lambda schema: calls.append(1) or real_hash(schema))
+    tool = Tool(name="search_drug_labels_cached", inputSchema=dict(LABELS))
+    first = tool_arguments(tool)
+    for _ in range(3):
+        assert tool_arguments(tool) is first
+    assert len(calls) == 1
+    # 内容相同的新对象按哈希复用
+    assert tool_arguments(Tool(name=tool.name, inputSchema=dict(LABELS))) is first
+
+
+def test_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(arg_schema, "MAX_COMPILED", 4)
+    for index in range(10):
+        tool_arguments(f"tool_{index}", {"type": "object", "title": str(index)})
+    assert len(arg_schema._compiled) <= 4
+    assert len(arg_schema._by_identity) <= 4
@@ -0,0 +1,121 @@
+import asyncio
+import json
+
+import pytest
+from mcp.types import CallToolResult, TextContent
+
+from src.batch_runner import BatchRunner, Job, result_record
+from src.session_pool import SessionPool
+from src.transports import ServerConfig
+
+CONFIG = ServerConfig.from_dict({"url": "http://127.0.0.1:1/mcp", "type": "streamableHttp"})
+
+
+def _record(index: int, brand: str) -> dict:
+    text = json.dumps({"results": [{"openfda": {"brand_name": [brand]}}]})
+    return {
+        "id": str(index),
+        "tool": "search_drug_labels",
+        "arguments": {"search": brand},
+        "ok": True,
+        "elapsed_ms": 1.0,
+        "result": {"content": [{"type": "text", "text": text}], "isError": False},
+    }
+
+
+def test_resume_replaces_unclosed_columnar_file(tmp_path):
+    pq = pytest.importorskip("pyarrow.parquet")
+    input_path = tmp_path / "jobs.jsonl"
+    input_path.write_text("", encoding="utf-8")
+    output_path = tmp_path / "out.jsonl"
+    columnar_path = tmp_path / "labels.parquet"
+    runner = BatchRunner(CONFIG, input_path, output_path, columnar_path=columnar_path,
+                         show_progress=False)
+
+    # 第一次运行：第 0 行在已关闭的文件中
+    lines = [json.dumps(_record(i, brand)).encode() + b"\n" for i, brand in enumerate(["A", "B", "C"])]
+    output_path.write_bytes(lines[0])
+    checkpoint = runner.checkpoint
+    checkpoint.output_offset = len(lines[0])
+    runner._close_columnar(runner._open_columnar())
+
+    # 第二次运行在检查点（第 0、1 行）之后崩溃，列式文件没有关闭，已写入第 1、2 行
+    output_path.write_bytes(b"".join(lines))
+    checkpoint.output_offset = len(lines[0]) + len(lines[1])
+    crashed = runner._open_columnar()
+    crashed.add(_record(2, "C")["result"]["content"][0]["text"], tool="search_drug_labels")
+    checkpoint.save(checkpoint.output_offset)
+
+    resumed = BatchRunner(CONFIG, input_path, output_path, columnar_path=columnar_path,
+                          show_progress=False)
+    assert resumed.checkpoint.load()
+    sink = resumed._open_columnar()
+    resumed._close_columnar(sink)
+
+    files = resumed.checkpoint.columnar_files
+    assert resumed.checkpoint.columnar_open is None
+    assert sorted(tmp_path.glob("labels*.parquet")) == sorted(map(type(tmp_path), files))
+    brands = [row for f in files for row in pq.read_table(f).column("openfda_brand_name").to_pylist()]
+    # 第 1 行从 JSONL 输出重放，第 2 行在检查点之后，续跑时重新执行
+    assert brands == [["A"], ["B"]]
+
+
+def _jobs(tmp_path, count: int):
+    input_path = tmp_path / "jobs.jsonl"
+    input_path.write_text(
+        "".join(json.dumps({"tool": "t", "arguments": {"i": i}}) + "\n" for i in range(count)),
+        encoding="utf-8",
+    )
+    return input_path
+
+
+@pytest.mark.parametrize("existing", [None, b"", b"{}\n"])
+def test_resume_refuses_short_output(tmp_path, existing):
+    output_path = tmp_path / "out.jsonl"
+    runner = BatchRunner(CONFIG, _jobs(tmp_path, 1), output_path, show_progress=False)
+    runner.checkpoint.save(100)
+    if existing is not None:
+        output_path.write_bytes(existing)
+
+    with pytest.raises(ValueError, match="无法续传"):
+        asyncio.run(runner.run())
+    assert output_path.exists() == (existing is not None)
+    if existing is not None:
+        assert output_path.read_bytes() == existing
+
+
+def test_worker_error_cancels_other_workers(tmp_path, monkeypatch):
+    runner = BatchRunner(CONFIG, _jobs(tmp_path, 8), tmp_path / "out.jsonl", concurrency=4,
+                         show_progress=False)
+    cancelled = []
+
+    async def warm(self, config, count=None):
+        pass
+
+    async def run_job(pool, job):
+        if job.index == 0:
+            await asyncio.sleep(0.01)
+            raise OSError("disk full")
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(job.index)
+            raise
+
+    monkeypatch.setattr(SessionPool, "warm", warm)
+    monkeypatch.setattr(runner, "_run_job", run_job)
+
+    async def main():
+        with pytest.raises(OSError):
+            await asyncio.wait_for(runner.run(resume=False), 5)
+        # run 返回前其余 worker 已经取消，而不是留给事件循环关闭时清理
+        assert sorted(cancelled) == [1, 2, 3]
+
+    asyncio.run(main())
+
+
+def test_result_record_keeps_meta():
+    result = CallToolResult(content=[TextContent(type="text", text="x")], _meta={"request": "abc"})
+    record = result_record(Job(0, "0", "t", {}), result, None, 0.001)
+    # 续跑时列式导出从 JSONL 重放结果
+    assert CallToolResult.model_validate(record["result"]) == result
@@ -0,0 +1,56 @@
+import asyncio
+
+from mcp.types import (
+    Implementation,
+    InitializeResult,
+    ListPromptsResult,
+    ListResourcesResult,
+    ListToolsResult,
+    ServerCapabilities,
+    Tool,
+)
+
+from src.catalog import CatalogCache
+
+INIT = InitializeResult(
+    protocolVersion="2025-03-26",
+    capabilities=ServerCapabilities(tools={}, resources={}, prompts={}),
+    serverInfo=Implementation(name="fake", version="1"),
+)
+
+
+class _FlakySession:
+    def __init__(self, tool_failures: int):
+        self.tool_failures = tool_failures
+        self.tool_calls = 0
+
+    async def list_tools(self, cursor=None):
+        self.tool_calls += 1
+        if self.tool_calls <= self.tool_failures:
+            raise TimeoutError("list_tools timed out")
+        return ListToolsResult(tools=[Tool(name="search_drug_labels", inputSchema={"type": "object"})])
+
+    async def list_resources(self, cursor=None):
+        return ListResourcesResult(resources=[])
+
+    async def list_prompts(self, cursor=None):
+        return ListPromptsResult(prompts=[])
+
+
+def test_failed_listing_is_not_cached(tmp_path):
+    async def main():
+        session = _FlakySession(tool_failures=1)
+        cache = CatalogCache(path=tmp_path / "catalog.json")
+        first = await cache.get(session, "http://fake/mcp", INIT)
+        assert first.tools is None
+        assert isinstance(first.errors["tools"], TimeoutError)
+        assert first.resources == []
+
+        # 重新加载磁盘缓存：失败的列表没有被当成"不支持"保存
+        cache = CatalogCache(path=tmp_path / "catalog.json")
+        second = await cache.get(session, "http://fake/mcp", INIT)
+        assert [tool.name for tool in second.tools] == ["search_drug_labels"]
+        assert session.tool_calls == 2
+        assert second.errors == {}
+
+    asyncio.run(main())
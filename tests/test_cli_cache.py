@@ -0,0 +1,51 @@
+import argparse
+import json
+import time
+
+from src import cli
+from src.cli import add_server_arguments, cached_tools, server_config, server_id
+from src.result_cache import cache_key, server_cache_id
+
+
+def _args(*argv: str) -> argparse.Namespace:
+    parser = argparse.ArgumentParser()
+    add_server_arguments(parser)
+    return parser.parse_args(list(argv))
+
+
+def test_server_id_matches_config():
+    for argv in ((), ("--url", "http://a/mcp"), ("--url", "http://b/sse", "--transport", "sse"),
+                 ("--url", "http://a/mcp", "--header", "emcp-key=secret"), ("--header", "x=1")):
+        args = _args(*argv)
+        assert server_id(args) == server_cache_id(server_config(args))
+
+
+def test_cache_key_differs_per_server():
+    arguments = {"drug_name": "aspirin"}
+    a = cache_key("get_drug_warnings", arguments, server_id(_args("--url", "http://a/mcp")))
+    b = cache_key("get_drug_warnings", arguments, server_id(_args("--url", "http://b/mcp")))
+    assert a != b
+    assert a.split("\x00", 1)[0] == "get_drug_warnings"
+
+
+def test_server_id_keeps_credentials_out():
+    args = _args("--url", "http://a/mcp", "--header", "emcp-key=secret")
+    assert "secret" not in server_id(args)
+    assert server_id(args) != server_id(_args("--url", "http://a/mcp"))
+
+
+def test_default_server_without_demo_module():
+    config = server_config(_args())
+    assert config.url == cli.DEFAULT_SERVER_URL
+    assert config.header_dict == cli.DEFAULT_SERVER_HEADERS
+
+
+def test_cached_tools_keyed_by_server_id(tmp_path, monkeypatch):
+    path = tmp_path / "catalog.json"
+    monkeypatch.setattr(cli, "DEFAULT_CATALOG_PATH", path)
+    sse = server_id(_args("--url", "http://a/mcp", "--transport", "sse"))
+    slot = {"items": [{"name": "sse_only"}], "fetched_at": time.time()}
+    path.write_text(json.dumps({f"{sse}|fda|1.0": {"tools": slot}}), encoding="utf-8")
+
+    assert cached_tools(sse, 3600) == [{"name": "sse_only"}]
+    assert cached_tools(server_id(_args("--url", "http://a/mcp")), 3600) is None
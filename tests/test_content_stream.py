@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from src.content_stream import ContentTooLarge, StreamingJsonDecoder, classify_content_path
+
+TEXT = 'say "hi" \\ back\\slash\n tab\t é 😀 end'
+MESSAGE = json.dumps({
+    "jsonrpc": "2.0",
+    "id": 7,
+    "result": {
+        "content": [{"type": "text", "text": TEXT}],
+        "structuredContent": {"result": TEXT},
+        "isError": False,
+    },
+})
+
+
+def _decode(pieces, max_buffer=1 << 20):
+    decoder = StreamingJsonDecoder(classify_content_path, max_buffer=max_buffer)
+    streamed = []
+    for piece in pieces:
+        for path, chunk in decoder.feed(piece):
+            if chunk is not None:
+                streamed.append(chunk)
+    return "".join(streamed), decoder.close()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 7, 13, len(MESSAGE)])
+def test_split_escapes_and_surrogate_pairs(size):
+    # ensure_ascii 把 é 和 😀 写成 é 与代理对 😀，任意位置切开都要正确拼接
+    assert "\\ud83d\\ude00" in MESSAGE
+    text, document = _decode(MESSAGE[i:i + size] for i in range(0, len(MESSAGE), size))
+    assert text == TEXT
+    assert document["id"] == 7
+    assert document["result"]["content"] == [{"type": "text"}]
+    assert "structuredContent" not in document["result"]
+    assert document["result"]["isError"] is False
+
+
+def test_buffered_field_too_large():
+    message = json.dumps({"result": {"content": [], "note": "x" * 100}})
+    with pytest.raises(ContentTooLarge):
+        _decode([message], max_buffer=50)
+
+
+def test_streamed_text_not_limited():
+    message = json.dumps({"result": {"content": [{"type": "text", "text": "y" * 1000}]}})
+    text, _ = _decode([message[i:i + 64] for i in range(0, len(message), 64)], max_buffer=50)
+    assert text == "y" * 1000
+
+
+def test_incomplete_document():
+    decoder = StreamingJsonDecoder(classify_content_path)
+    decoder.feed(MESSAGE[:-3])
+    with pytest.raises(ValueError):
+        decoder.close()
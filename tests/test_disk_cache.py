@@ -0,0 +1,58 @@
+from mcp.types import CallToolResult, TextContent
+
+from src.disk_cache import DiskCache
+from src.result_cache import cache_key
+
+
+def _result(text: str) -> CallToolResult:
+    return CallToolResult(content=[TextContent(type="text", text=text)])
+
+
+def test_recovers_from_partial_record_without_index(tmp_path):
+    with DiskCache(tmp_path) as cache:
+        cache.put(cache_key("t", {"n": 1}), _result("one"), 3600)
+        cache.put(cache_key("t", {"n": 2}), _result("two"), 3600)
+    segment = tmp_path / "segment.dat"
+    size = segment.stat().st_size
+    # 崩溃时留下的不完整记录，索引也丢失
+    with open(segment, "ab") as f:
+        f.write(b"MCPR\x05")
+    (tmp_path / "index.json").unlink()
+
+    with DiskCache(tmp_path) as cache:
+        assert segment.stat().st_size == size
+        assert cache.get(cache_key("t", {"n": 1})).content[0].text == "one"
+        cache.put(cache_key("t", {"n": 3}), _result("three"), 3600)
+        assert cache.get(cache_key("t", {"n": 3})).content[0].text == "three"
+        assert cache.get(cache_key("t", {"n": 2})).content[0].text == "two"
+
+    with DiskCache(tmp_path) as cache:
+        assert cache.get(cache_key("t", {"n": 3})).content[0].text == "three"
+
+
+def test_recovers_from_record_with_truncated_value(tmp_path):
+    with DiskCache(tmp_path) as cache:
+        cache.put(cache_key("t", {"n": 1}), _result("one"), 3600)
+        cache.put(cache_key("t", {"n": 2}), _result("two" * 100), 3600)
+    segment = tmp_path / "segment.dat"
+    with open(segment, "r+b") as f:
+        f.truncate(segment.stat().st_size - 10)
+    (tmp_path / "index.json").unlink()
+
+    with DiskCache(tmp_path) as cache:
+        assert cache.get(cache_key("t", {"n": 2})) is None
+        cache.put(cache_key("t", {"n": 4}), _result("four"), 3600)
+        assert cache.get(cache_key("t", {"n": 4})).content[0].text == "four"
+        assert cache.get(cache_key("t", {"n": 1})).content[0].text == "one"
+
+
+def test_round_trip_keeps_meta(tmp_path):
+    result = CallToolResult(
+        content=[TextContent(type="text", text="one", _meta={"page": 1})],
+        structuredContent={"total": 1},
+        _meta={"request": "abc"},
+    )
+    with DiskCache(tmp_path) as cache:
+        cache.put(cache_key("t", {}), result, 3600)
+    with DiskCache(tmp_path) as cache:
+        assert cache.get(cache_key("t", {})) == result
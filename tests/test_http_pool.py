@@ -0,0 +1,97 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src import http_pool as http_pool_module
+from src.http_pool import HttpPool, close_http_pool, http_pool
+
+
+async def _serve(requests):
+    """最简单的 HTTP/1.1 服务器：记录请求行，返回 ok"""
+
+    async def handle(reader, writer):
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            requests.append(head.split(b"\r\n", 1)[0].decode())
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\nok")
+            await writer.drain()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def _unused_port():
+    import socket
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def no_proxy(monkeypatch):
+    for name in ("HTTP_PROXY", "HTTPS_PROXY", "ALL_PROXY", "http_proxy", "https_proxy", "all_proxy"):
+        monkeypatch.delenv(name, raising=False)
+
+
+def test_clients_share_connection(no_proxy):
+    async def main():
+        requests = []
+        server, port = await _serve(requests)
+        pool = HttpPool(http2=False)
+        try:
+            for _ in range(2):
+                async with pool.client() as client:
+                    response = await client.get(f"http://127.0.0.1:{port}/mcp")
+                    assert response.text == "ok"
+            host = pool.stats()["hosts"][f"http://127.0.0.1:{port}"]
+            assert host == {"connections": 1, "idle": 1, "http2": 0}
+        finally:
+            await pool.aclose()
+            server.close()
+        assert pool.stats()["hosts"] == {}
+        assert requests == ["GET /mcp HTTP/1.1"] * 2
+
+    asyncio.run(main())
+
+
+def test_connect_error_is_httpx_error(no_proxy):
+    async def main():
+        pool = HttpPool(http2=False)
+        try:
+            async with pool.client() as client:
+                with pytest.raises(httpx.ConnectError):
+                    await client.get(f"http://127.0.0.1:{_unused_port()}/mcp")
+        finally:
+            await pool.aclose()
+
+    asyncio.run(main())
+
+
+def test_environment_proxy_is_used(no_proxy, monkeypatch):
+    async def main():
+        requests = []
+        server, port = await _serve(requests)
+        monkeypatch.setenv("HTTP_PROXY", f"http://127.0.0.1:{port}")
+        try:
+            async with http_pool().client() as client:
+                response = await client.get("http://fda.example.invalid/mcp")
+        finally:
+            await close_http_pool()
+            server.close()
+        assert response.text == "ok"
+        assert requests == ["GET http://fda.example.invalid/mcp HTTP/1.1"]
+
+    asyncio.run(main())
+
+
+def test_close_http_pool_forgets_loop_pool(no_proxy):
+    async def main():
+        pool = http_pool()
+        await close_http_pool()
+        assert http_pool() is not pool
+        await close_http_pool()
+        assert asyncio.get_running_loop() not in http_pool_module._pools
+
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+import asyncio
+
+import pytest
+from mcp.types import CallToolResult, TextContent
+
+from src.jsonrpc_batch import BatchingSession
+from src.transports import ServerConfig
+
+CONFIG = ServerConfig.from_dict({"url": "http://127.0.0.1:1/mcp", "type": "streamableHttp"})
+
+
+class _Session:
+    def __init__(self):
+        self.calls = []
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        self.calls.append(name)
+        if name == "bad":
+            raise TypeError("not JSON serializable")
+        return CallToolResult(content=[TextContent(type="text", text=name)])
+
+
+@pytest.mark.parametrize("error", [TypeError("Object of type set is not JSON serializable"), RuntimeError("boom")])
+def test_unexpected_post_error_falls_back(monkeypatch, error):
+    async def main():
+        session = _Session()
+        batching = BatchingSession(session, CONFIG, lambda: "sid", "2025-03-26", window=0.001)
+
+        async def post(requests):
+            raise error
+
+        monkeypatch.setattr(batching, "_post", post)
+        results = await asyncio.wait_for(
+            asyncio.gather(batching.call_tool("a"), batching.call_tool("b")), timeout=2
+        )
+        assert [r.content[0].text for r in results] == ["a", "b"]
+        assert sorted(session.calls) == ["a", "b"]
+        await batching.aclose()
+
+    asyncio.run(main())
+
+
+def test_malformed_batch_response_fails_waiters(monkeypatch):
+    async def main():
+        batching = BatchingSession(_Session(), CONFIG, lambda: "sid", "2025-03-26", window=0.001)
+
+        async def post(requests):
+            return ["not a message"]
+
+        async def individually(pending):
+            raise RuntimeError("fallback failed")
+
+        monkeypatch.setattr(batching, "_post", post)
+        monkeypatch.setattr(batching, "_send_individually", individually)
+        calls = asyncio.gather(batching.call_tool("a"), batching.call_tool("b"), return_exceptions=True)
+        results = await asyncio.wait_for(calls, timeout=2)
+        assert all(isinstance(r, Exception) for r in results)
+        await batching.aclose()
+
+    asyncio.run(main())
+
+
+def test_for_connection_warns_when_protocol_has_no_batching():
+    class _Conn:
+        session = _Session()
+        config = CONFIG
+        init_result = type("_Init", (), {"protocolVersion": "2025-06-18"})()
+
+        @staticmethod
+        def get_session_id():
+            return "sid"
+
+    async def main():
+        with pytest.warns(RuntimeWarning):
+            batching = BatchingSession.for_connection(_Conn(), window=0.001)
+        assert not batching.supported
+        await asyncio.gather(batching.call_tool("a"), batching.call_tool("b"))
+        assert batching.stats.single_calls == 2
+        assert batching.stats.batches == 0
+
+    asyncio.run(main())
@@ -0,0 +1,90 @@
+import json
+import tracemalloc
+
+import pytest
+
+from src.lazy_json import extract, first_record, iter_path, iter_records, skip_value, string_body_end
+
+DOC = {
+    "meta": {"results": {"skip": 0, "limit": 3, "total": 42}},
+    "results": [
+        {"id": "a", "openfda": {"brand_name": ["Advil", "Motrin"]}, "warnings": ['say "no" \\ then', "é日本"]},
+        {"id": "b", "openfda": {}, "nested": [[1, {"x": [2.5e3, None, True]}], {}], "warnings": []},
+        {"id": "c", "openfda": {"brand_name": ["Aleve"]}, "tail\\\\": "\\\\"},
+    ],
+}
+TEXT = json.dumps(DOC, ensure_ascii=False, indent=1)
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("meta.results.total", [42]),
+    ("results.*.id", ["a", "b", "c"]),
+    ("results.1.id", ["b"]),
+    ("results.*.openfda.brand_name", [["Advil", "Motrin"], ["Aleve"]]),
+    ("results.*.openfda.brand_name.0", ["Advil", "Aleve"]),
+    ("results.0.openfda.*", [["Advil", "Motrin"]]),
+    ("*.results.total", [42]),
+    ("results.1.nested.0.1.x.2", [True]),
+    ("results.5.id", []),
+    ("meta.missing", []),
+    ("results.id", []),
+    ("", [DOC]),
+])
+def test_path_grammar(path, expected):
+    assert extract(TEXT, [path]) == {path: expected}
+    assert list(iter_path(TEXT, path)) == expected
+
+
+def test_extract_several_paths_in_one_scan():
+    paths = ["results.*.id", "meta.results.total", "results.2.tail\\\\"]
+    assert extract(TEXT, paths) == {
+        "results.*.id": ["a", "b", "c"],
+        "meta.results.total": [42],
+        "results.2.tail\\\\": ["\\\\"],
+    }
+
+
+def test_records():
+    assert [record["id"] for record in iter_records(TEXT)] == ["a", "b", "c"]
+    assert first_record(TEXT) == DOC["results"][0]
+    assert first_record('{"results": []}') is None
+
+
+def test_literal_paths_stop_early():
+    # 找到 meta 后不再扫描后面的内容，即使后面不是合法的 JSON
+    assert extract('{"meta": {"total": 7}, "results": [oops', ["meta.total"]) == {"meta.total": [7]}
+
+
+def test_skip_value_matches_raw_decode():
+    decoder = json.JSONDecoder()
+    for value in [DOC, 'a"b', ["x", "y\\", '\\"', 'a\\\\"b'], [1, "x"], [], {}, -1.5e-3, None, ""]:
+        text = json.dumps(value) + " ,"
+        assert skip_value(text, 0) == decoder.raw_decode(text, 0)[1]
+
+
+@pytest.mark.parametrize("body, end", [
+    ('abc"', 3),
+    ('a\\"b"', 4),
+    ('a\\\\"', 3),
+    ('\\\\\\"x"', 5),
+    ('"', 0),
+    ("no quote", 8),
+    ('ends with \\"', 12),
+])
+def test_string_body_end(body, end):
+    assert string_body_end("x" + body, 1) == end + 1
+
+
+def test_peak_memory_is_one_record():
+    record = {"id": "x", "openfda": {"brand_name": ["Advil"]}, "warnings": ["w" * 20000]}
+    text = json.dumps({"meta": {}, "results": [record] * 200})
+    tracemalloc.start()
+    try:
+        json.loads(text)
+        loads_peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.reset_peak()
+        assert len(extract(text, ["results.*.openfda.brand_name"])["results.*.openfda.brand_name"]) == 200
+        extract_peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    assert extract_peak * 20 < loads_peak
@@ -0,0 +1,94 @@
+import asyncio
+from contextlib import asynccontextmanager
+
+from mcp.types import CallToolResult, ListToolsResult, TextContent, Tool
+
+from src.multi_server import MultiServerClient
+from src.transports import ServerConfig
+
+FAST = ServerConfig.from_dict({"url": "http://127.0.0.1:1/fast", "type": "streamableHttp"})
+SLOW = ServerConfig.from_dict({"url": "http://127.0.0.1:1/slow", "type": "sse"})
+TOOL = Tool(name="get_drug_warnings", inputSchema={"type": "object"})
+
+
+class _Session:
+    def __init__(self, url, delay, pool):
+        self.url = url
+        self.delay = delay
+        self.pool = pool
+
+    def get_server_capabilities(self):
+        return None
+
+    async def list_tools(self, *args, **kwargs):
+        return ListToolsResult(tools=[TOOL])
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        self.pool.calls.append((self.url, kwargs))
+        await asyncio.sleep(self.delay)
+        return CallToolResult(content=[TextContent(type="text", text=self.url)])
+
+
+class _Pool:
+    """按 URL 模拟延迟；down 中的服务器连接失败"""
+
+    def __init__(self, delays):
+        self.delays = delays
+        self.down = set()
+        self.calls = []
+
+    @asynccontextmanager
+    async def session(self, config):
+        if config.url in self.down:
+            raise ConnectionError(config.url)
+        yield _Session(config.url, self.delays[config.url], self)
+
+    async def close(self):
+        pass
+
+
+def test_routes_to_fastest_replica_and_forwards_kwargs():
+    async def main():
+        pool = _Pool({FAST.url: 0.001, SLOW.url: 0.02})
+        async with MultiServerClient([SLOW, FAST], pool=pool, hedge=False) as client:
+            for _ in range(5):
+                await client.call_tool(TOOL.name, {}, read_timeout_seconds=None)
+            result = await client.call_tool(TOOL.name, {}, progress_callback=print)
+        assert result.content[0].text == FAST.url
+        assert pool.calls[-1] == (FAST.url, {"progress_callback": print})
+
+    asyncio.run(main())
+
+
+def test_hedges_when_primary_exceeds_p95():
+    async def main():
+        pool = _Pool({FAST.url: 0.001, SLOW.url: 0.01})
+        async with MultiServerClient([FAST, SLOW], pool=pool, min_hedge_samples=5) as client:
+            for _ in range(10):
+                await client.call_tool(TOOL.name, {})
+            primary = client.replicas[0]
+            assert len(primary.latencies) >= 5
+            pool.delays[FAST.url] = 1.0
+            result = await asyncio.wait_for(client.call_tool(TOOL.name, {}), 0.5)
+        assert result.content[0].text == SLOW.url
+        assert primary.hedged == 1
+
+    asyncio.run(main())
+
+
+def test_failed_replica_reconnects():
+    async def main():
+        pool = _Pool({FAST.url: 0.001, SLOW.url: 0.001})
+        pool.down.add(FAST.url)
+        async with MultiServerClient([SLOW, FAST], pool=pool, hedge=False,
+                                     reconnect_interval=0.01) as client:
+            assert [r.connected for r in client.replicas] == [True, False]
+            await client.call_tool(TOOL.name, {})
+            pool.down.clear()
+            await asyncio.sleep(0.02)
+            await client.call_tool(TOOL.name, {})
+            await asyncio.sleep(0)
+            assert client.replicas[1].connected
+            assert len(client._registry[TOOL.name]) == 2
+
+    asyncio.run(main())
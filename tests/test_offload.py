@@ -0,0 +1,27 @@
+import asyncio
+import time
+
+from src.offload import THREAD, Offload
+
+
+def test_aclose_does_not_block_event_loop():
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        async with Offload(THREAD) as offload:
+            job = asyncio.ensure_future(offload.run(time.sleep, 0.3))
+            await asyncio.sleep(0.01)
+            ticker = asyncio.ensure_future(tick())
+        # 退出时等待正在运行的函数结束，期间事件循环仍在运行
+        ticker.cancel()
+        assert ticks >= 10
+        assert offload.executor is None
+        await job
+
+    asyncio.run(main())
@@ -0,0 +1,56 @@
+import asyncio
+import json
+
+from mcp.types import CallToolResult, TextContent
+
+from src.pagination import iter_tool_records
+
+
+class _PagedSession:
+    """按 skip / limit 返回 count 条记录；max_page 模拟服务器限制每页条数"""
+
+    def __init__(self, count, total=True, max_page=None):
+        self.count = count
+        self.total = total
+        self.max_page = max_page
+        self.skips = []
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        skip, limit = arguments["skip"], arguments["limit"]
+        self.skips.append(skip)
+        if self.max_page is not None:
+            limit = min(limit, self.max_page)
+        await asyncio.sleep(0)
+        payload = {"results": [{"i": i} for i in range(skip, min(skip + limit, self.count))]}
+        if self.total:
+            payload["meta"] = {"results": {"total": self.count}}
+        return CallToolResult(content=[TextContent(type="text", text=json.dumps(payload))])
+
+
+def _collect(session, **kwargs):
+    async def main():
+        return [record["i"] async for record in iter_tool_records(session, "search", {}, **kwargs)]
+
+    return asyncio.run(main())
+
+
+def test_stops_at_total():
+    session = _PagedSession(12)
+    assert _collect(session, page_size=5) == list(range(12))
+    assert sorted(session.skips) == [0, 5, 10]
+
+
+def test_short_pages_continue_until_total():
+    session = _PagedSession(10, max_page=3)
+    assert _collect(session, page_size=5, prefetch=2) == list(range(10))
+
+
+def test_short_page_ends_without_total():
+    session = _PagedSession(7, total=False)
+    assert _collect(session, page_size=5, prefetch=0) == list(range(7))
+    assert session.skips == [0, 5]
+
+
+def test_max_records():
+    session = _PagedSession(100)
+    assert _collect(session, page_size=10, prefetch=1, max_records=15) == list(range(15))
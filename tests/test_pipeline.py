@@ -0,0 +1,75 @@
+import asyncio
+from contextlib import aclosing
+
+from mcp.types import CallToolResult, TextContent
+
+from src.pipeline import PipelinedSession
+
+
+class _Session:
+    def __init__(self):
+        self.started = []
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        self.started.append(arguments["n"])
+        # 先发出的请求后返回
+        await asyncio.sleep(0.005 * (8 - arguments["n"] % 8))
+        if name == "boom":
+            raise RuntimeError("boom")
+        return CallToolResult(content=[TextContent(type="text", text=str(arguments["n"]))])
+
+
+def _calls(count, name="ok"):
+    return [(name, {"n": n}) for n in range(count)]
+
+
+def test_imap_ordered():
+    async def main():
+        pipeline = PipelinedSession(_Session(), max_outstanding=4)
+        calls = _calls(6) + _calls(1, "boom")
+        items = [item async for item in pipeline.imap(calls)]
+        assert [item.arguments["n"] for item in items] == [0, 1, 2, 3, 4, 5, 0]
+        assert [item.ok for item in items] == [True] * 6 + [False]
+        assert pipeline.peak_outstanding == 4
+
+    asyncio.run(main())
+
+
+def test_imap_unordered_yields_completion_order():
+    async def main():
+        pipeline = PipelinedSession(_Session(), max_outstanding=4)
+        items = [item.arguments["n"] async for item in pipeline.imap(_calls(4), ordered=False)]
+        assert items == [3, 2, 1, 0]
+
+    asyncio.run(main())
+
+
+def test_untaken_results_count_against_cap():
+    async def main():
+        session = _Session()
+        pipeline = PipelinedSession(session, max_outstanding=3)
+        taken = 0
+        async for _ in pipeline.imap(_calls(10)):
+            taken += 1
+            # 调用方处理得慢：已返回未取走的结果也占名额，发送数不超过取走数 + 上限
+            await asyncio.sleep(0.02)
+            assert len(session.started) <= taken + 3
+        assert taken == 10
+
+    asyncio.run(main())
+
+
+def test_early_exit_cancels_and_releases_slots():
+    async def main():
+        pipeline = PipelinedSession(_Session(), max_outstanding=3)
+        async with aclosing(pipeline.imap(_calls(10))) as items:
+            async for _ in items:
+                break
+        await asyncio.sleep(0)
+        assert pipeline.outstanding == 0
+        assert pipeline._slots._value == 3
+        # 名额全部归还，submit 不会阻塞
+        futures = [await pipeline.submit("ok", {"n": n}) for n in range(3)]
+        assert [(await f).content[0].text for f in futures] == ["0", "1", "2"]
+
+    asyncio.run(main())
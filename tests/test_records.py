@@ -0,0 +1,63 @@
+import json
+
+import pytest
+from mcp.types import CallToolResult, TextContent
+
+from src.records import WarningRecord, iter_label_records, records_from_result
+
+LABELS = {
+    "meta": {"results": {"total": 3}},
+    "results": [
+        {
+            "id": "a",
+            "set_id": "s-a",
+            "effective_time": "20240101",
+            "warnings": ['Reye\'s syndrome: "children" \\ teens', "第二段 😀"],
+            "indications_and_usage": ["pain"],
+            "openfda": {"brand_name": ["Bayer"], "generic_name": ["ASPIRIN"], "route": ["ORAL"]},
+            "spl_unclassified_section": [{"nested": [1, 2.5, None, True]}],
+        },
+        {"id": "b", "openfda": {}, "warnings": []},
+        "not a record",
+        {"id": "c", "warnings": "single string", "openfda": {"brand_name": "Ecotrin"}},
+    ],
+}
+TEXT = json.dumps(LABELS)
+
+
+def test_raw_matches_json_loads():
+    records = list(iter_label_records(TEXT))
+    objects = [record for record in LABELS["results"] if isinstance(record, dict)]
+    assert [record.raw() for record in records] == objects
+    # 非 ASCII 字符原样写出时同样一致
+    unescaped = json.dumps(LABELS, ensure_ascii=False, indent=2)
+    assert [record.raw() for record in iter_label_records(unescaped)] == objects
+
+
+def test_fields():
+    a, b, c = records_from_result(
+        CallToolResult(content=[TextContent(type="text", text=TEXT)]), tool="get_drug_warnings"
+    )
+    assert isinstance(a, WarningRecord)
+    assert (a.id, a.set_id, a.effective_time) == ("a", "s-a", "20240101")
+    assert a.brand_names == ("Bayer",) and a.routes == ("ORAL",) and a.manufacturer_names == ()
+    assert a.warnings == LABELS["results"][0]["warnings"]
+    assert a.excerpt(6) == "Reye's"
+    assert b.paragraphs() == [] and b.indications_and_usage is None
+    assert c.brand_names == ("Ecotrin",) and c.paragraphs() == ["single string"]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_compact_keeps_text_fields(compact):
+    record = next(iter_label_records(TEXT, compact=compact))
+    assert record.warnings == LABELS["results"][0]["warnings"]
+    raw = record.raw()
+    assert raw["warnings"] == LABELS["results"][0]["warnings"]
+    assert raw["openfda"]["brand_name"] == ["Bayer"]
+    assert ("spl_unclassified_section" in raw) is not compact
+
+
+def test_nested_array_path_and_missing_path():
+    text = json.dumps({"data": {"items": [{"id": "x"}]}})
+    assert [record.id for record in iter_label_records(text, array_path="data.items")] == ["x"]
+    assert list(iter_label_records(text, array_path="data.missing")) == []
@@ -0,0 +1,88 @@
+import asyncio
+import sys
+
+import anyio
+import httpx
+import pydantic
+import pytest
+from mcp.shared.exceptions import McpError
+from mcp.types import ErrorData
+
+from src import resilient
+from src.resilient import CircuitBreaker, CircuitOpenError, ResilientSession, is_connection_error
+from src.transports import ServerConfig
+
+if sys.version_info < (3, 11):
+    from exceptiongroup import ExceptionGroup
+
+
+@pytest.mark.parametrize("error", [
+    httpx.ConnectError("refused"),
+    httpx.RemoteProtocolError("peer closed connection"),
+    anyio.ClosedResourceError(),
+    anyio.BrokenResourceError(),
+    ConnectionResetError(),
+    CircuitOpenError("open"),
+    McpError(ErrorData(code=-32000, message="Connection closed")),
+    ExceptionGroup("transport", [httpx.ReadError("reset")]),
+])
+def test_connection_errors(error):
+    assert is_connection_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    McpError(ErrorData(code=-32602, message="Invalid params")),
+    ValueError("bad json"),
+    KeyError("content"),
+    pydantic.ValidationError.from_exception_data("CallToolResult", []),
+    ExceptionGroup("mixed", [httpx.ReadError("reset"), TypeError()]),
+])
+def test_other_errors(error):
+    assert not is_connection_error(error)
+
+
+class _Conn:
+    broken = False
+
+    async def close(self):
+        pass
+
+
+def _failing_session(monkeypatch, delays):
+    config = ServerConfig.from_dict({"url": "http://127.0.0.1:1/mcp", "type": "streamableHttp"})
+    session = ResilientSession(config, max_attempts=3, breaker=CircuitBreaker(failure_threshold=10))
+
+    async def open_():
+        raise httpx.ConnectError("refused")
+
+    async def send(conn, name, arguments, metadata):
+        raise httpx.ReadError("reset")
+
+    def backoff(*args, **kwargs):
+        while True:
+            delays.append(0.0)
+            yield 0.0
+
+    monkeypatch.setattr(session, "_open", open_)
+    monkeypatch.setattr(session, "_send", send)
+    monkeypatch.setattr(resilient, "backoff_delays", backoff)
+    return session
+
+
+def test_connect_failures_counted_once_without_final_sleep(monkeypatch):
+    delays = []
+    session = _failing_session(monkeypatch, delays)
+    with pytest.raises(ConnectionError):
+        asyncio.run(session.connect())
+    assert session.breaker.failures == 3
+    assert len(delays) == 2
+
+
+def test_dropped_call_not_counted_twice(monkeypatch):
+    delays = []
+    session = _failing_session(monkeypatch, delays)
+    session._conn = _Conn()
+    with pytest.raises(ConnectionError):
+        asyncio.run(session.call_tool("search_drug_labels", {}))
+    # 调用断开后重连 3 次都失败：每次连接尝试记一次
+    assert session.breaker.failures == 3
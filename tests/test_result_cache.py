@@ -0,0 +1,76 @@
+import asyncio
+
+import pytest
+from mcp.types import CallToolResult, TextContent
+
+from src.result_cache import CachedSession
+
+
+class _Session:
+    def __init__(self):
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        self.calls += 1
+        await self.release.wait()
+        return CallToolResult(content=[TextContent(type="text", text=f"call {self.calls}")])
+
+
+def test_cancelled_leader_hands_over_to_waiter():
+    async def main():
+        session = _Session()
+        cached = CachedSession(session)
+        arguments = {"drug_name": "aspirin"}
+        leader = asyncio.create_task(cached.call_tool("get_drug_warnings", arguments))
+        await asyncio.sleep(0)
+        waiters = [asyncio.create_task(cached.call_tool("get_drug_warnings", arguments)) for _ in range(3)]
+        await asyncio.sleep(0)
+        leader.cancel()
+        await asyncio.sleep(0.01)
+        session.release.set()
+        results = await asyncio.gather(*waiters)
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        # 只有一个等待者重新发送请求
+        assert session.calls == 2
+        assert [result.content[0].text for result in results] == ["call 2"] * 3
+        assert cached.cache.stats.coalesced == 3
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_leader_running():
+    async def main():
+        session = _Session()
+        cached = CachedSession(session)
+        leader = asyncio.create_task(cached.call_tool("get_drug_warnings", {"drug_name": "aspirin"}))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cached.call_tool("get_drug_warnings", {"drug_name": "aspirin"}))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        session.release.set()
+        assert (await leader).content[0].text == "call 1"
+        assert session.calls == 1
+
+    asyncio.run(main())
+
+
+def test_waiter_cancelled_with_leader_does_not_resend():
+    async def main():
+        session = _Session()
+        cached = CachedSession(session)
+        leader = asyncio.create_task(cached.call_tool("get_drug_warnings", {"drug_name": "aspirin"}))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cached.call_tool("get_drug_warnings", {"drug_name": "aspirin"}))
+        await asyncio.sleep(0)
+        leader.cancel()
+        waiter.cancel()
+        for task in (leader, waiter):
+            with pytest.raises(asyncio.CancelledError):
+                await task
+        assert session.calls == 1
+
+    asyncio.run(main())
@@ -0,0 +1,23 @@
+import pytest
+from mcp.types import CallToolResult, TextContent
+
+from src.semantic_cache import HASHING, TFIDF, QueryNormalizer, SemanticCache
+
+
+def _arguments(query):
+    return {"drug": "aspirin", "query": query, "top_k": 3}
+
+
+def test_question_words_are_kept():
+    normalize = QueryNormalizer()
+    assert normalize("Why does aspirin cause bleeding") != normalize("When does aspirin cause bleeding")
+    assert normalize("What are the cardiovascular side effects") == normalize("heart-related side effects")
+
+
+@pytest.mark.parametrize("similarity", [None, TFIDF, HASHING])
+def test_different_questions_do_not_share_answer(similarity):
+    cache = SemanticCache(similarity=similarity)
+    cache.put(_arguments("Why does aspirin cause bleeding"), CallToolResult(content=[TextContent(type="text", text="why")]))
+    assert cache.lookup(_arguments("When does aspirin cause bleeding")) is None
+    assert cache.lookup(_arguments("How does aspirin cause bleeding")) is None
+    assert cache.lookup(_arguments("why does aspirin cause bleeding?")) is not None
@@ -0,0 +1,95 @@
+import asyncio
+
+import httpx
+import pytest
+
+from src.deadline import DeadlineExceeded, DeadlineSession
+from src.session_pool import SessionPool
+from src.transports import ServerConfig
+
+CONFIG = ServerConfig.from_dict({"url": "http://127.0.0.1:1/mcp", "type": "streamableHttp"})
+
+
+class _SlowSession:
+    def __init__(self):
+        self._request_id = 0
+        self.cancelled = []
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        # 与 ClientSession.send_request 相同：先使用当前 id 再递增
+        self._request_id += 1
+        await asyncio.sleep(10)
+
+    async def send_notification(self, notification):
+        self.cancelled.append(notification.root.params.requestId)
+
+
+class _FakePooled:
+    def __init__(self):
+        self.session = _SlowSession()
+        self.broken = False
+        self.last_used = 0.0
+        self.closed = False
+
+    async def ping(self, timeout):
+        return True
+
+    async def close(self):
+        self.closed = True
+
+
+def _fake_pool(monkeypatch) -> SessionPool:
+    pool = SessionPool(max_size=2)
+
+    async def connect(config):
+        pool._slot(config).created += 1
+        return _FakePooled()
+
+    monkeypatch.setattr(pool, "_connect", connect)
+    return pool
+
+
+def test_deadline_exceeded_keeps_session(monkeypatch):
+    async def main():
+        pool = _fake_pool(monkeypatch)
+        for _ in range(3):
+            with pytest.raises(DeadlineExceeded):
+                async with pool.session(CONFIG) as session:
+                    await DeadlineSession(session).call_tool("slow", {}, timeout=0.01)
+        await asyncio.sleep(0)
+        stats = pool.stats()["streamableHttp:http://127.0.0.1:1/mcp"]
+        assert stats["created"] == 1
+        assert stats["idle"] == 1
+        assert pool._slot(CONFIG).idle[0].session.cancelled == [0, 1, 2]
+
+    asyncio.run(main())
+
+
+def test_caller_errors_keep_session(monkeypatch):
+    async def main():
+        pool = _fake_pool(monkeypatch)
+        for _ in range(2):
+            with pytest.raises(KeyError):
+                async with pool.session(CONFIG):
+                    raise KeyError("content")
+        stats = pool.stats()["streamableHttp:http://127.0.0.1:1/mcp"]
+        assert stats["created"] == 1
+        assert stats["idle"] == 1
+
+    asyncio.run(main())
+
+
+def test_connection_errors_discard_session(monkeypatch):
+    async def main():
+        pool = _fake_pool(monkeypatch)
+        with pytest.raises(httpx.ReadError):
+            async with pool.session(CONFIG):
+                raise httpx.ReadError("reset")
+        assert pool.stats()["streamableHttp:http://127.0.0.1:1/mcp"]["idle"] == 0
+
+    asyncio.run(main())
+
+
+def test_deadline_session_requires_client_session():
+    with pytest.raises(TypeError):
+        DeadlineSession(_FakePooled())
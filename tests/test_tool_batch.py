@@ -0,0 +1,45 @@
+import asyncio
+
+import pytest
+from mcp.types import CallToolResult, TextContent
+
+from src.tool_batch import call_tools_concurrently
+
+
+class _Session:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+
+    async def call_tool(self, name, arguments=None, **kwargs):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            # 先发出的请求后返回
+            await asyncio.sleep(0.001 * (10 - arguments["n"]))
+            if name == "boom":
+                raise RuntimeError(f"boom {arguments['n']}")
+            return CallToolResult(
+                content=[TextContent(type="text", text=str(arguments["n"]))], isError=name == "bad"
+            )
+        finally:
+            self.in_flight -= 1
+
+
+def test_results_in_input_order_with_per_item_errors():
+    calls = [("ok", {"n": 0}), ("boom", {"n": 1}), ("ok", {"n": 2}), ("bad", {"n": 3}), ("ok", {"n": 4})]
+    session = _Session()
+    items = asyncio.run(call_tools_concurrently(session, calls, max_in_flight=2))
+
+    assert [(item.name, item.arguments) for item in items] == calls
+    assert [item.ok for item in items] == [True, False, True, False, True]
+    assert str(items[1].error) == "boom 1"
+    assert items[1].result is None
+    assert items[3].error is None and items[3].result.isError
+    assert [item.result.content[0].text for item in items if item.ok] == ["0", "2", "4"]
+    assert session.peak == 2
+
+
+def test_rejects_zero_in_flight():
+    with pytest.raises(ValueError):
+        asyncio.run(call_tools_concurrently(_Session(), [], max_in_flight=0))